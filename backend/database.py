@@ -7,7 +7,7 @@ import os
 from datetime import datetime, date
 from sqlalchemy import (
     create_engine, Column, Integer, String, Float, Boolean,
-    Date, DateTime, ForeignKey, Text, JSON, Enum as SQLEnum
+    Date, DateTime, ForeignKey, Text, JSON, Index, Enum as SQLEnum
 )
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker, relationship
@@ -74,6 +74,10 @@ class Student(Base):
 
 class DailyLog(Base):
     __tablename__ = "daily_logs"
+    __table_args__ = (
+        # Serves "last N logs per student" window queries
+        Index("ix_daily_logs_student_date", "student_id", "date"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     student_id = Column(Integer, ForeignKey("students.id", ondelete="CASCADE"), nullable=False, index=True)
@@ -10,6 +10,7 @@ from loguru import logger
 from dotenv import load_dotenv
 
 from database import init_db
+from models.worker_pool import get_pool
 from routes import logs, prediction, roadmap, assistant as assistant_route, auth, admin
 
 load_dotenv()
@@ -26,7 +27,11 @@ async def lifespan(app: FastAPI):
     os.makedirs("logs", exist_ok=True)
     init_db()
     logger.info("✅ Database initialized")
+    pool = get_pool()
+    if pool.enabled:
+        pool.start()
     yield
+    pool.shutdown()
     logger.info("🛑 Shutting down NeuroGrowth AI Backend")
 
 
@@ -0,0 +1,112 @@
+"""
+NeuroGrowth AI - Gradient Attribution with Caching
+Batched input-gradient attributions and an LRU cache keyed on window + model version
+"""
+
+import os
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Optional
+
+import numpy as np
+import torch
+
+from models.dl_model import StudentGrowthLSTM
+
+ATTRIBUTION_OFF = "off"
+ATTRIBUTION_CACHED = "cached"
+ATTRIBUTION_COMPUTED = "computed"
+ATTRIBUTION_MODES = (ATTRIBUTION_OFF, ATTRIBUTION_CACHED, ATTRIBUTION_COMPUTED)
+
+DEFAULT_ATTRIBUTION_MODE = os.getenv("ATTRIBUTION_MODE", ATTRIBUTION_CACHED)
+ATTRIBUTION_CACHE_SIZE = int(os.getenv("ATTRIBUTION_CACHE_SIZE", "10000"))
+
+
+def window_digest(seq: np.ndarray, model_version: str) -> str:
+    """Stable cache key for one input window under one set of weights."""
+    h = hashlib.sha1(np.ascontiguousarray(seq, dtype=np.float32).tobytes())
+    h.update(model_version.encode())
+    return h.hexdigest()
+
+
+def gradient_attributions(
+    model: StudentGrowthLSTM, x: torch.Tensor, lengths: Optional[torch.Tensor] = None
+) -> np.ndarray:
+    """
+    Normalized |d score / d input| averaged over time, for a whole batch.
+
+    In eval mode every sample's score depends only on its own input, so one
+    backward pass of the summed scores yields each sample's own gradient.
+    Padding days get no gradient, so they do not dilute a short window.
+
+    Args:
+        x: (batch, seq_len, n_features)
+        lengths: (batch,) real days per right-aligned window, None if all full
+
+    Returns:
+        (batch, n_features) array whose rows sum to 1 (or are all zero)
+    """
+    x_grad = x.detach().clone().requires_grad_(True)
+
+    with torch.enable_grad():
+        outputs = model(x_grad, lengths)
+        outputs["predicted_score"].sum().backward()
+
+    if x_grad.grad is None:
+        return np.zeros((x.shape[0], x.shape[2]), dtype=np.float32)
+
+    importance = x_grad.grad.abs().mean(dim=1).cpu().numpy()
+    totals = importance.sum(axis=1, keepdims=True)
+    return np.divide(importance, totals, out=np.zeros_like(importance), where=totals > 0)
+
+
+class AttributionCache:
+    """Thread-safe LRU of attribution vectors keyed by `window_digest`."""
+
+    def __init__(self, max_size: int = ATTRIBUTION_CACHE_SIZE):
+        self.max_size = max_size
+        self._data: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: str) -> Optional[np.ndarray]:
+        with self._lock:
+            value = self._data.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key: str, value: np.ndarray):
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "size": len(self._data),
+                "max_size": self.max_size,
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+
+# Singleton instance
+_cache: Optional[AttributionCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_attribution_cache() -> AttributionCache:
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = AttributionCache()
+    return _cache
@@ -0,0 +1,210 @@
+"""
+NeuroGrowth AI - Dynamic Micro-Batching Inference Queue
+Coalesces concurrent single-student forward passes into one batched pass
+"""
+
+import os
+import time
+import queue
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Optional
+
+import numpy as np
+import torch
+from loguru import logger
+
+from models.dl_model import OUTPUT_KEYS
+from models.registry import get_registry
+from models.train import SEQUENCE_LENGTH
+from models.worker_pool import get_pool
+
+MAX_BATCH_SIZE = int(os.getenv("INFERENCE_MAX_BATCH_SIZE", "64"))
+MAX_WAIT_US = int(os.getenv("INFERENCE_MAX_WAIT_US", "2000"))
+BATCHING_ENABLED = os.getenv("INFERENCE_BATCHING", "1") == "1"
+
+
+class InferenceBatcher:
+    """
+    Background scheduler in front of the shared model.
+
+    Request threads call `infer(seq)` with an (n_days, n_features) array of
+    at most SEQUENCE_LENGTH days; shorter histories are zero-padded at the
+    front and scored through the model's packed path. A single worker
+    thread waits for the first pending item, keeps collecting until
+    `max_batch_size` items are queued or `max_wait_us` has elapsed, runs one
+    forward pass and resolves each caller's future with its own row.
+    """
+
+    def __init__(
+        self,
+        max_batch_size: int = MAX_BATCH_SIZE,
+        max_wait_us: int = MAX_WAIT_US,
+        enabled: bool = BATCHING_ENABLED,
+    ):
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait_us = max(0, max_wait_us)
+        self.enabled = enabled
+        self._queue: "queue.Queue[tuple[np.ndarray, int, Future, float]]" = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+        self._dispatch: Optional[ThreadPoolExecutor] = None
+        self._start_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._batch_hist: dict[int, int] = {}
+        self._requests = 0
+        self._batches = 0
+        self._wait_ms_total = 0.0
+        self._max_queue_depth = 0
+
+    # ─── Public API ──────────────────────────────────────────────────────────
+
+    def submit(self, seq: np.ndarray) -> Future:
+        """Queue one sequence; the future resolves to (outputs, model_version)."""
+        seq = np.asarray(seq, dtype=np.float32)
+        if seq.ndim == 3:
+            seq = seq[0]
+        n_days = len(seq)
+        if n_days < SEQUENCE_LENGTH:
+            window = np.zeros((SEQUENCE_LENGTH, seq.shape[1]), dtype=np.float32)
+            window[SEQUENCE_LENGTH - n_days:] = seq
+            seq = window
+
+        future: Future = Future()
+        if not self.enabled:
+            try:
+                outputs, version = self._forward(seq[None], np.array([n_days]))
+                future.set_result((outputs[0], version))
+            except Exception as e:
+                future.set_exception(e)
+            return future
+
+        self._ensure_worker()
+        self._queue.put((seq, n_days, future, time.perf_counter()))
+        depth = self._queue.qsize()
+        if depth > self._max_queue_depth:
+            self._max_queue_depth = depth
+        return future
+
+    def infer(self, seq: np.ndarray, timeout: Optional[float] = 30.0) -> tuple[dict, str]:
+        """Blocking helper: run one sequence through the batched model."""
+        return self.submit(seq).result(timeout=timeout)
+
+    def stats(self) -> dict:
+        """Queue depth and batch-size histogram since process start."""
+        with self._stats_lock:
+            hist = dict(sorted(self._batch_hist.items()))
+            return {
+                "enabled": self.enabled,
+                "max_batch_size": self.max_batch_size,
+                "max_wait_us": self.max_wait_us,
+                "queue_depth": self._queue.qsize(),
+                "max_queue_depth": self._max_queue_depth,
+                "requests": self._requests,
+                "batches": self._batches,
+                "avg_batch_size": round(self._requests / self._batches, 2) if self._batches else 0.0,
+                "avg_queue_wait_ms": round(self._wait_ms_total / self._requests, 3) if self._requests else 0.0,
+                "batch_size_histogram": {str(k): v for k, v in hist.items()},
+            }
+
+    # ─── Worker ──────────────────────────────────────────────────────────────
+
+    def _ensure_worker(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._start_lock:
+            if self._thread is None or not self._thread.is_alive():
+                pool = get_pool()
+                if pool.enabled and self._dispatch is None:
+                    self._dispatch = ThreadPoolExecutor(
+                        max_workers=pool.n_workers, thread_name_prefix="inference-dispatch"
+                    )
+                self._thread = threading.Thread(
+                    target=self._run, name="inference-batcher", daemon=True
+                )
+                self._thread.start()
+                logger.info(
+                    f"Inference batcher started (max_batch={self.max_batch_size}, "
+                    f"max_wait={self.max_wait_us}us)"
+                )
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.perf_counter() + self.max_wait_us / 1_000_000
+            while len(batch) < self.max_batch_size:
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            # Drain anything that arrived while we were waiting without blocking
+            while len(batch) < self.max_batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            if self._dispatch is not None:
+                # Worker processes can run several batches at once
+                self._dispatch.submit(self._process, batch)
+            else:
+                self._process(batch)
+
+    def _process(self, batch: list):
+        started = time.perf_counter()
+        try:
+            outputs, version = self._forward(
+                np.stack([item[0] for item in batch]), np.array([item[1] for item in batch])
+            )
+        except Exception as e:
+            logger.error(f"Batched inference failed: {e}")
+            for _, _, future, _ in batch:
+                future.set_exception(e)
+            return
+
+        for row, (_, _, future, _) in zip(outputs, batch):
+            future.set_result((row, version))
+
+        size = len(batch)
+        with self._stats_lock:
+            self._batch_hist[size] = self._batch_hist.get(size, 0) + 1
+            self._requests += size
+            self._batches += 1
+            self._wait_ms_total += sum((started - enq) * 1000 for _, _, _, enq in batch)
+
+    @staticmethod
+    def _forward(x: np.ndarray, lengths: np.ndarray) -> tuple[list[dict], str]:
+        """
+        One forward pass over a (batch, seq_len, n_features) array with each
+        row's real day count, in-process or on the pool.
+        """
+        pool = get_pool()
+        if pool.enabled:
+            columns, version = pool.run(x, lengths)
+        else:
+            registry = get_registry()
+            model = registry.get_serving()
+            version = registry.version
+            with torch.no_grad():
+                out = model(torch.from_numpy(np.ascontiguousarray(x)), torch.from_numpy(lengths))
+            columns = {k: out[k].cpu().numpy() for k in OUTPUT_KEYS}
+        rows = [
+            {k: float(columns[k][i]) for k in OUTPUT_KEYS}
+            for i in range(x.shape[0])
+        ]
+        return rows, version
+
+
+# Singleton instance
+_batcher: Optional[InferenceBatcher] = None
+_batcher_lock = threading.Lock()
+
+
+def get_batcher() -> InferenceBatcher:
+    global _batcher
+    if _batcher is None:
+        with _batcher_lock:
+            if _batcher is None:
+                _batcher = InferenceBatcher()
+    return _batcher
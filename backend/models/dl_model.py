@@ -5,7 +5,15 @@ PyTorch implementation for student performance prediction
 
 import torch
 import torch.nn as nn
+from torch.nn.utils.rnn import pack_padded_sequence, pad_packed_sequence
 import math
+from typing import Dict, Optional
+
+# Keys of the dict returned by StudentGrowthLSTM.forward
+OUTPUT_KEYS = [
+    "predicted_score", "burnout_risk", "improvement_velocity",
+    "confidence_lower", "confidence_upper",
+]
 
 
 class AttentionLayer(nn.Module):
@@ -29,6 +37,32 @@ class AttentionLayer(nn.Module):
         attended = torch.bmm(weights, V)
         return attended
 
+    def attend_last(self, x: torch.Tensor, lengths: Optional[torch.Tensor] = None) -> torch.Tensor:
+        """
+        Attention output for the final timestep only.
+
+        Equivalent to `forward(x)[:, -1, :]` but projects a single query, so
+        the score matrix is (1 x seq_len) instead of (seq_len x seq_len).
+
+        With `lengths`, row i is left-aligned with lengths[i] real steps: the
+        query is its last real step and the padding after it is masked out.
+        """
+        # x: (batch, seq_len, hidden)
+        if lengths is None:
+            Q = self.query(x[:, -1:, :])
+        else:
+            last = (lengths - 1).view(-1, 1, 1).expand(-1, 1, x.shape[2])
+            Q = self.query(torch.gather(x, 1, last))
+        K = self.key(x)
+        V = self.value(x)
+
+        scores = torch.bmm(Q, K.transpose(1, 2)) / self.scale
+        if lengths is not None:
+            padding = torch.arange(x.shape[1], device=x.device)[None, :] >= lengths[:, None]
+            scores = scores.masked_fill(padding.unsqueeze(1), float("-inf"))
+        weights = torch.softmax(scores, dim=-1)
+        return torch.bmm(weights, V).squeeze(1)  # (batch, hidden)
+
 
 class StudentGrowthLSTM(nn.Module):
     """
@@ -93,25 +127,75 @@ class StudentGrowthLSTM(nn.Module):
         self.velocity_head = nn.Linear(output_size, 1)     # improvement_velocity
         self.confidence_head = nn.Linear(output_size, 2)   # lower, upper bounds
 
-    def forward(self, x: torch.Tensor) -> dict:
+        # Fewest days of history the weights were trained on, saved with them
+        # by train_model; 0 means unknown (full windows only)
+        self.register_buffer("min_history", torch.tensor(0, dtype=torch.int64))
+
+    def _load_from_state_dict(self, state_dict, prefix, *args, **kwargs):
+        # Weights saved before min_history was recorded leave it unknown
+        state_dict.setdefault(prefix + "min_history", torch.tensor(0, dtype=torch.int64))
+        super()._load_from_state_dict(state_dict, prefix, *args, **kwargs)
+
+    def forward(self, x: torch.Tensor, lengths: Optional[torch.Tensor] = None) -> Dict[str, torch.Tensor]:
         """
         Args:
-            x: (batch_size, seq_len, input_size)
+            x: (batch_size, seq_len, input_size), right-aligned: the most
+               recent day is last and shorter histories are zero-padded at
+               the front
+            lengths: (batch_size,) number of real days per row; None when
+               every row is a full window
         Returns:
             dict with predicted_score, burnout_risk, improvement_velocity,
                   confidence_lower, confidence_upper
         """
-        # Normalize input
-        x = self.input_norm(x)
+        if lengths is None:
+            lstm_out, _ = self.lstm(self.input_norm(x))  # (batch, seq, hidden)
+            return self.decode(lstm_out)
+
+        # Drop the columns that are padding for every row
+        seq_len = x.shape[1]
+        lengths = lengths.to(x.device).clamp(1, seq_len)
+        longest = int(lengths.max())
+        x = x[:, seq_len - longest:, :]
+        if int(lengths.min()) == longest:
+            # One length (a bucketed batch): nothing left to pad
+            lstm_out, _ = self.lstm(self.input_norm(x))
+            return self.decode(lstm_out)
+
+        # Mixed lengths: left-align each row's real days, run the LSTM on the
+        # packed sequence so padding is never stepped through, then attend
+        # with the padded positions masked
+        steps = torch.arange(longest, device=x.device)
+        src = (steps[None, :] + (longest - lengths)[:, None]).clamp(max=longest - 1)
+        x = torch.gather(x, 1, src.unsqueeze(-1).expand(-1, -1, x.shape[2]))
+        packed = pack_padded_sequence(
+            self.input_norm(x), lengths.cpu(), batch_first=True, enforce_sorted=False
+        )
+        packed_out, _ = self.lstm(packed)
+        lstm_out, _ = pad_packed_sequence(packed_out, batch_first=True, total_length=longest)
+        return self.decode(lstm_out, lengths)
 
-        # LSTM encoding
-        lstm_out, _ = self.lstm(x)  # (batch, seq, hidden)
+    def step(self, x_t: torch.Tensor, state: tuple) -> tuple:
+        """
+        Advance the recurrence by one day.
 
-        # Attention
-        attended = self.attention(lstm_out)  # (batch, seq, hidden)
+        Args:
+            x_t: (batch, 1, input_size) raw features for the new day
+            state: per-layer (h, c), each (num_layers, batch, hidden)
+        Returns:
+            (lstm_out for the new day (batch, 1, hidden), new (h, c))
+        """
+        return self.lstm(self.input_norm(x_t), state)
 
-        # Use last timestep
-        last_hidden = attended[:, -1, :]  # (batch, hidden)
+    def decode(
+        self, lstm_out: torch.Tensor, lengths: Optional[torch.Tensor] = None
+    ) -> Dict[str, torch.Tensor]:
+        """
+        Attention over LSTM outputs (final query only) and output heads.
+        `lengths` marks left-aligned, padded outputs from a packed sequence.
+        """
+        # Attention for the last timestep
+        last_hidden = self.attention.attend_last(lstm_out, lengths)  # (batch, hidden)
 
         # Shared features
         features = self.fc(last_hidden)  # (batch, output_size)
@@ -131,7 +215,32 @@ class StudentGrowthLSTM(nn.Module):
         }
 
 
-def get_model(input_size: int = 8, device: str = "cpu") -> StudentGrowthLSTM:
-    """Factory function to create and return the model."""
-    model = StudentGrowthLSTM(input_size=input_size)
+def get_model(input_size: int = 8, device: str = "cpu", **architecture) -> StudentGrowthLSTM:
+    """
+    Factory function to create and return the model.
+
+    Args:
+        architecture: optional hidden_size / num_layers / dropout overrides
+    """
+    model = StudentGrowthLSTM(input_size=input_size, **architecture)
     return model.to(device)
+
+
+def architecture_of(state_dict: dict) -> dict:
+    """The get_model arguments that produce modules matching a saved state dict."""
+    return {
+        "input_size": state_dict["input_norm.weight"].shape[0],
+        "hidden_size": state_dict["lstm.weight_hh_l0"].shape[1],
+        "num_layers": sum(1 for k in state_dict if k.startswith("lstm.weight_ih_l")),
+    }
+
+
+def load_model_file(path: str, device: str = "cpu") -> StudentGrowthLSTM:
+    """
+    Build a model shaped like the weights at `path` and load them, so weights
+    from a hyperparameter sweep load without a separate config file.
+    """
+    state = torch.load(path, map_location=device, weights_only=True)
+    model = get_model(device=device, **architecture_of(state))
+    model.load_state_dict(state)
+    return model
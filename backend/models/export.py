@@ -0,0 +1,139 @@
+"""
+NeuroGrowth AI - Frozen TorchScript Export
+Scripted, frozen and inference-optimized artifact of StudentGrowthLSTM
+
+Usage (from backend/):
+    python -m models.export            # export + equivalence check + latency table
+"""
+
+import os
+import sys
+import json
+import time
+from typing import Optional
+
+import torch
+from loguru import logger
+
+from models.dl_model import OUTPUT_KEYS, StudentGrowthLSTM, get_model, load_model_file
+from models.registry import MODEL_FILENAME, SCRIPTED_FILENAME, file_version
+from models.train import SAVED_MODEL_DIR, SEQUENCE_LENGTH
+
+BENCH_BATCH_SIZES = (1, 32, 1024)
+
+
+def script_model(model: StudentGrowthLSTM) -> torch.jit.ScriptModule:
+    """Script, freeze and optimize an eval-mode copy of the model."""
+    model.eval()
+    scripted = torch.jit.script(model)
+    frozen = torch.jit.freeze(scripted)
+    return torch.jit.optimize_for_inference(frozen)
+
+
+def check_equivalence(
+    model: StudentGrowthLSTM,
+    scripted: torch.jit.ScriptModule,
+    batch_sizes: tuple = BENCH_BATCH_SIZES,
+    atol: float = 1e-5,
+) -> float:
+    """
+    Compare scripted and eager outputs on random inputs, as full windows and
+    with random history lengths (the packed path).
+
+    Returns:
+        the largest absolute difference across all outputs and batch sizes
+
+    Raises:
+        RuntimeError if any output differs by more than `atol`
+    """
+    model.eval()
+    generator = torch.Generator().manual_seed(0)
+    max_diff = 0.0
+    with torch.no_grad():
+        for b in batch_sizes:
+            x = torch.rand(b, SEQUENCE_LENGTH, model.input_size, generator=generator)
+            lengths = torch.randint(1, SEQUENCE_LENGTH + 1, (b,), generator=generator)
+            for args in ((x,), (x, lengths)):
+                eager = model(*args)
+                traced = scripted(*args)
+                for k in OUTPUT_KEYS:
+                    max_diff = max(max_diff, float((eager[k] - traced[k]).abs().max()))
+    if max_diff > atol:
+        raise RuntimeError(f"Scripted model diverges from eager by {max_diff:.2e} (atol={atol:.0e})")
+    return max_diff
+
+
+def export_torchscript(
+    model: StudentGrowthLSTM,
+    path: Optional[str] = None,
+    version: Optional[str] = None,
+) -> str:
+    """
+    Write the frozen artifact next to the weights, tagged with the weights
+    version so serving can tell whether it is current.
+    """
+    path = path or os.path.join(SAVED_MODEL_DIR, SCRIPTED_FILENAME)
+    if version is None:
+        version = file_version(os.path.join(SAVED_MODEL_DIR, MODEL_FILENAME))
+
+    scripted = script_model(model)
+    max_diff = check_equivalence(model, scripted)
+
+    tmp_path = path + ".tmp"
+    torch.jit.save(scripted, tmp_path, _extra_files={"version": version})
+    os.replace(tmp_path, path)  # atomic swap for processes polling the file
+    logger.info(f"✅ TorchScript artifact saved to {path} (max diff vs eager {max_diff:.1e})")
+    return path
+
+
+def benchmark(
+    model: StudentGrowthLSTM,
+    scripted: torch.jit.ScriptModule,
+    batch_sizes: tuple = BENCH_BATCH_SIZES,
+    iters: int = 50,
+    warmup: int = 5,
+) -> list[dict]:
+    """Median CPU latency of eager vs scripted forward passes per batch size."""
+    model.eval()
+    results = []
+    with torch.no_grad():
+        for b in batch_sizes:
+            x = torch.rand(b, SEQUENCE_LENGTH, model.input_size)
+            row = {"batch_size": b}
+            for name, fn in (("eager", model), ("torchscript", scripted)):
+                for _ in range(warmup):
+                    fn(x)
+                times = []
+                for _ in range(iters):
+                    start = time.perf_counter()
+                    fn(x)
+                    times.append((time.perf_counter() - start) * 1000)
+                times.sort()
+                row[f"{name}_ms"] = round(times[len(times) // 2], 3)
+            row["speedup"] = round(row["eager_ms"] / row["torchscript_ms"], 2) if row["torchscript_ms"] else None
+            results.append(row)
+    return results
+
+
+if __name__ == "__main__":
+    weights = os.path.join(SAVED_MODEL_DIR, MODEL_FILENAME)
+    if os.path.exists(weights):
+        eager = load_model_file(weights)
+    else:
+        eager = get_model()
+        logger.warning("No trained weights found, exporting an untrained model")
+    eager.eval()
+
+    version = file_version(weights) if os.path.exists(weights) else "untrained"
+    out_path = export_torchscript(eager, version=version)
+    scripted = torch.jit.load(out_path)
+
+    report = {
+        "artifact": out_path,
+        "version": version,
+        "max_abs_diff": check_equivalence(eager, scripted),
+        "latency": benchmark(eager, scripted),
+        "threads": torch.get_num_threads(),
+    }
+    json.dump(report, sys.stdout, indent=2)
+    print()
@@ -0,0 +1,153 @@
+"""
+NeuroGrowth AI - Incremental Per-Student LSTM State
+One recurrent step per new daily log instead of replaying the full window
+"""
+
+import os
+import threading
+from collections import OrderedDict
+from typing import Optional
+
+import numpy as np
+import torch
+
+from models.attribution import window_digest
+from models.dl_model import OUTPUT_KEYS, StudentGrowthLSTM
+from models.registry import get_registry
+from models.train import SEQUENCE_LENGTH
+from models.worker_pool import get_pool
+
+INCREMENTAL_ENABLED = os.getenv("INFERENCE_INCREMENTAL", "0") == "1"
+INCREMENTAL_STATE_SIZE = int(os.getenv("INCREMENTAL_STATE_SIZE", "10000"))
+
+
+class StudentStateStore:
+    """
+    LRU of per-student recurrent state for the *next* prediction window.
+
+    The model reads a fixed SEQUENCE_LENGTH window starting from a zero
+    state, so the state left by the previous window cannot simply be carried
+    forward. Instead, after each prediction we run the last
+    SEQUENCE_LENGTH - 1 days (the prefix of tomorrow's window) and store the
+    per-layer (h, c) plus the top-layer outputs that attention needs. When
+    the new day arrives, its window is that prefix plus one step.
+
+    An entry is only used when its prefix digest and model version match the
+    student's current window, so edited history or new weights fall back to
+    the full-window path automatically.
+
+    Steps run on the serving model (the int8 copy when MODEL_FORMAT=quantized).
+    A frozen TorchScript module keeps only `forward`, and the worker pool
+    only runs full windows, so with either of those the path is off.
+    """
+
+    def __init__(self, max_size: int = INCREMENTAL_STATE_SIZE):
+        self.max_size = max_size
+        self._data: "OrderedDict[int, dict]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, student_id: int, prefix_digest: str) -> Optional[dict]:
+        with self._lock:
+            entry = self._data.get(student_id)
+            if entry is None or entry["prefix_digest"] != prefix_digest:
+                self.misses += 1
+                return None
+            self._data.move_to_end(student_id)
+            self.hits += 1
+            return entry
+
+    def put(self, student_id: int, entry: dict):
+        with self._lock:
+            self._data[student_id] = entry
+            self._data.move_to_end(student_id)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+
+    def drop(self, student_id: int):
+        with self._lock:
+            self._data.pop(student_id, None)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "enabled": INCREMENTAL_ENABLED,
+                "size": len(self._data),
+                "max_size": self.max_size,
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+
+def _step_model() -> Optional[tuple[StudentGrowthLSTM, str]]:
+    """(serving model, its version), or None when it cannot run single steps."""
+    if get_pool().enabled:
+        return None
+    registry = get_registry()
+    model = registry.get_serving()
+    if not isinstance(model, StudentGrowthLSTM):
+        return None
+    return model, registry.version
+
+
+def predict_incremental(student_id: int, seq: np.ndarray) -> Optional[tuple[dict, str]]:
+    """
+    Score a full (SEQUENCE_LENGTH, n_features) window from the stored prefix.
+
+    Returns:
+        (raw outputs, model_version), or None when no valid prefix state is
+        stored or the serving model cannot step, and the caller must run the
+        full window
+    """
+    serving = _step_model()
+    if serving is None:
+        return None
+    model, model_version = serving
+
+    entry = get_state_store().get(student_id, window_digest(seq[:-1], model_version))
+    if entry is None:
+        return None
+
+    x_t = torch.from_numpy(np.ascontiguousarray(seq[-1:], dtype=np.float32)).unsqueeze(0)
+    with torch.no_grad():
+        out_t, _ = model.step(x_t, (entry["h"], entry["c"]))
+        outputs = model.decode(torch.cat([entry["outputs"], out_t], dim=1))
+
+    return {k: float(outputs[k][0]) for k in OUTPUT_KEYS}, model_version
+
+
+def refresh_prefix_state(student_id: int, seq: np.ndarray):
+    """
+    Precompute the state for the window that will follow `seq`, i.e. its
+    last SEQUENCE_LENGTH - 1 days. Meant to run after the response is sent.
+    """
+    serving = _step_model() if len(seq) >= SEQUENCE_LENGTH else None
+    if serving is None:
+        return
+    model, model_version = serving
+
+    prefix = np.ascontiguousarray(seq[1:], dtype=np.float32)
+    with torch.no_grad():
+        outputs, (h, c) = model.lstm(model.input_norm(torch.from_numpy(prefix).unsqueeze(0)))
+
+    get_state_store().put(student_id, {
+        "prefix_digest": window_digest(prefix, model_version),
+        "h": h,
+        "c": c,
+        "outputs": outputs,
+    })
+
+
+# Singleton instance
+_store: Optional[StudentStateStore] = None
+_store_lock = threading.Lock()
+
+
+def get_state_store() -> StudentStateStore:
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = StudentStateStore()
+    return _store
@@ -8,14 +8,44 @@ import torch
 from loguru import logger
 from typing import Optional
 
-from models.dl_model import StudentGrowthLSTM, get_model
-from models.train import prepare_features, SEQUENCE_LENGTH, SAVED_MODEL_DIR
+from models.dl_model import OUTPUT_KEYS, StudentGrowthLSTM, get_model, load_model_file
+from models.train import SEQUENCE_LENGTH, SAVED_MODEL_DIR
+from models.registry import get_registry
+from models.batching import get_batcher
+from models.worker_pool import get_pool
+from models.incremental import predict_incremental, INCREMENTAL_ENABLED
+from models.attribution import (
+    gradient_attributions, window_digest, get_attribution_cache,
+    ATTRIBUTION_MODES, ATTRIBUTION_OFF, ATTRIBUTION_CACHED, DEFAULT_ATTRIBUTION_MODE,
+)
 
 FEATURE_NAMES = [
     "study_hours", "topics_completed", "problems_solved", "mock_score",
     "confidence", "mood", "revision_done", "skill_practiced"
 ]
 
+# Column indices into the prepare_features matrix
+_HOURS, _SCORE, _CONF, _MOOD = 0, 3, 4, 5
+HEURISTIC_WINDOW = 7
+
+# Log fields a what-if grid may perturb: feature column -> scale applied by prepare_features
+ADJUSTABLE_FEATURES = {
+    "study_hours": (0, 1.0),
+    "topics_completed": (1, 1.0),
+    "problems_solved": (2, 1.0),
+    "mock_score": (3, 1 / 100.0),
+    "confidence": (4, 1 / 5.0),
+    "mood": (5, 1 / 5.0),
+}
+MAX_GRID_SCENARIOS = 10_000
+
+HEURISTIC_IMPORTANCE = {
+    "study_hours": 0.20, "topics_completed": 0.10,
+    "problems_solved": 0.18, "mock_score": 0.22,
+    "confidence": 0.12, "mood": 0.08,
+    "revision_done": 0.05, "skill_practiced": 0.05,
+}
+
 
 def load_model(device: str = "cpu") -> Optional[StudentGrowthLSTM]:
     """Load the trained model from disk."""
@@ -24,132 +54,396 @@ def load_model(device: str = "cpu") -> Optional[StudentGrowthLSTM]:
         logger.warning("No trained model found, using untrained model")
         return get_model(device=device)
 
-    model = get_model(device=device)
-    model.load_state_dict(torch.load(model_path, map_location=device, weights_only=True))
+    model = load_model_file(model_path, device=device)
     model.eval()
     logger.info("✅ Model loaded from disk")
     return model
 
 
-def predict_performance(logs: list[dict], device: str = "cpu") -> dict:
+def model_min_history() -> int:
+    """
+    Fewest days of history the served model scores: what its weights were
+    trained on (never below MIN_SEQUENCE_LENGTH), or SEQUENCE_LENGTH for
+    weights that do not record it. Shorter histories use the heuristic.
+    """
+    registry = get_registry()
+    registry.get()
+    return registry.min_history
+
+
+def predict_performance(
+    features: np.ndarray,
+    device: str = "cpu",
+    attribution: Optional[str] = None,
+    student_id: Optional[int] = None,
+) -> dict:
     """
     Predict student performance from their daily logs.
 
     Args:
-        logs: list of daily log dicts (at least SEQUENCE_LENGTH days)
+        features: (n_days, n_features) prepare_features matrix, oldest day
+            first; the model reads the last SEQUENCE_LENGTH days, and fewer
+            than `model_min_history()` days uses the heuristic
+        attribution: "off", "cached" or "computed"; defaults to ATTRIBUTION_MODE
+        student_id: enables the incremental one-step path when
+            INFERENCE_INCREMENTAL is on and a prefix state is stored
 
     Returns:
         dict with predicted_score, burnout_risk, improvement_velocity,
-             confidence_lower, confidence_upper, feature_importance
+             confidence_lower, confidence_upper, feature_importance,
+             model_version
     """
-    if len(logs) < SEQUENCE_LENGTH:
-        # Fallback: heuristic-based prediction
-        return _heuristic_prediction(logs)
+    mode = _resolve_attribution_mode(attribution)
 
-    model = load_model(device)
-    features = prepare_features(logs)
+    if len(features) < model_min_history():
+        # Fallback: heuristic-based prediction
+        return _heuristic_prediction(features)
 
-    # Take the last SEQUENCE_LENGTH days
+    # Take the last SEQUENCE_LENGTH days (or all of a shorter history)
     seq = features[-SEQUENCE_LENGTH:]
-    seq_tensor = torch.FloatTensor(seq).unsqueeze(0).to(device)
 
-    model.eval()
-    with torch.no_grad():
-        outputs = model(seq_tensor)
-
-    result = {
-        "predicted_score": round(float(outputs["predicted_score"][0]) * 100, 2),
-        "burnout_risk": round(float(outputs["burnout_risk"][0]), 3),
-        "improvement_velocity": round(float(outputs["improvement_velocity"][0]) * 20, 2),
-        "confidence_lower": round(float(outputs["confidence_lower"][0]) * 100, 2),
-        "confidence_upper": round(float(outputs["confidence_upper"][0]) * 100, 2),
-    }
+    incremental = None
+    if INCREMENTAL_ENABLED and student_id is not None and len(seq) == SEQUENCE_LENGTH:
+        incremental = predict_incremental(student_id, seq)
+
+    if incremental is not None:
+        outputs, model_version = incremental
+    else:
+        # Forward pass is coalesced with concurrent requests by the batcher
+        outputs, model_version = get_batcher().infer(seq)
+    result = _format_outputs(outputs)
 
     # SHAP-like feature importance via gradient-based attribution
-    result["feature_importance"] = _compute_feature_importance(model, seq_tensor, device)
+    window, n_days = _right_aligned(seq)
+    result["feature_importance"] = compute_attributions(
+        window[None], mode, device=device, lengths=np.array([n_days])
+    )[0]
+    result["model_version"] = model_version
 
     return result
 
 
-def simulate_performance(logs: list[dict], adjustments: dict, device: str = "cpu") -> dict:
+def window_key(features: np.ndarray) -> tuple[str, str]:
+    """
+    Digest of the feature window `predict_performance` would see, plus the
+    currently served model version.
+    """
+    registry = get_registry()
+    registry.get()
+    model_version = registry.version
+    window = np.ascontiguousarray(features[-SEQUENCE_LENGTH:], dtype=np.float32)
+    return window_digest(window, model_version), model_version
+
+
+def compute_attributions(
+    windows: np.ndarray,
+    mode: str = ATTRIBUTION_CACHED,
+    chunk_size: int = 1024,
+    device: str = "cpu",
+    lengths: Optional[np.ndarray] = None,
+) -> list[Optional[dict]]:
+    """
+    Gradient-based feature importance for many windows at once.
+
+    Args:
+        windows: (n, SEQUENCE_LENGTH, n_features) right-aligned model inputs
+        mode: "off" returns None per window; "cached" reuses results keyed on
+            the window and model version; "computed" always recomputes
+        chunk_size: windows per backward pass (per slab on the worker pool,
+            where the backward passes run when it is enabled)
+        lengths: (n,) real days per window; None when every window is full
+
+    Returns:
+        one {feature_name: weight} dict (or None) per window
+    """
+    mode = _resolve_attribution_mode(mode)
+    if mode == ATTRIBUTION_OFF or len(windows) == 0:
+        return [None] * len(windows)
+
+    registry = get_registry()
+    model = registry.get()
+    model_version = registry.version
+    cache = get_attribution_cache()
+
+    seq_len = windows.shape[1]
+    if lengths is None:
+        lengths = np.full(len(windows), seq_len)
+    lengths = np.asarray(lengths, dtype=np.int64)
+
+    vectors: list[Optional[np.ndarray]] = [None] * len(windows)
+    # Keyed on the real days only, like window_key
+    keys = [window_digest(w[seq_len - n:], model_version) for w, n in zip(windows, lengths)]
+    if mode == ATTRIBUTION_CACHED:
+        vectors = [cache.get(k) for k in keys]
+
+    missing = [i for i, v in enumerate(vectors) if v is None]
+    pool = get_pool()
+    if missing and pool.enabled:
+        # Backward passes run on the pool too, off the API process's threads
+        computed, version = pool.attribute(windows[missing], lengths[missing])
+        for i, vec in zip(missing, computed):
+            vectors[i] = vec
+            # A worker that already reloaded newer weights must not fill old keys
+            if version == model_version:
+                cache.put(keys[i], vec)
+    else:
+        for start in range(0, len(missing), chunk_size):
+            idx = missing[start : start + chunk_size]
+            x = torch.from_numpy(np.ascontiguousarray(windows[idx], dtype=np.float32)).to(device)
+            for i, vec in zip(idx, gradient_attributions(model, x, torch.from_numpy(lengths[idx]))):
+                vectors[i] = vec
+                cache.put(keys[i], vec)
+
+    return [
+        {name: round(float(val), 4) for name, val in zip(FEATURE_NAMES, vec)}
+        for vec in vectors
+    ]
+
+
+def _resolve_attribution_mode(mode: Optional[str]) -> str:
+    mode = mode or DEFAULT_ATTRIBUTION_MODE
+    if mode not in ATTRIBUTION_MODES:
+        raise ValueError(f"Unknown attribution mode '{mode}', expected one of {ATTRIBUTION_MODES}")
+    return mode
+
+
+def simulate_performance(
+    features: np.ndarray,
+    adjustments: dict,
+    device: str = "cpu",
+    attribution: Optional[str] = None,
+) -> dict:
     """
     Simulate 'what if' scenarios.
 
     Args:
-        logs: student daily logs
-        adjustments: dict of feature adjustments, e.g. {"study_hours": 1.0}
+        features: student's prepare_features matrix, oldest day first
+        adjustments: dict of feature adjustments in raw log units,
+            e.g. {"study_hours": 1.0}; keys outside ADJUSTABLE_FEATURES are ignored
+        attribution: feature importance mode, see `predict_performance`
 
     Returns:
         New prediction with adjusted features
     """
-    if len(logs) < SEQUENCE_LENGTH:
-        return _heuristic_prediction(logs)
+    if len(features) < model_min_history():
+        return _heuristic_prediction(features)
 
-    modified_logs = []
-    for log in logs:
-        new_log = log.copy()
-        for key, delta in adjustments.items():
-            if key in new_log:
-                new_log[key] = new_log[key] + delta
-        modified_logs.append(new_log)
+    modified = features.copy()
+    for key, delta in adjustments.items():
+        if key in ADJUSTABLE_FEATURES:
+            col, scale = ADJUSTABLE_FEATURES[key]
+            modified[:, col] += delta * scale
 
-    return predict_performance(modified_logs, device)
+    return predict_performance(modified, device, attribution)
 
 
-def _compute_feature_importance(model: StudentGrowthLSTM, x: torch.Tensor, device: str) -> dict:
-    """Compute gradient-based feature importance for explainability."""
-    x_grad = x.clone().requires_grad_(True)
+def simulate_grid(
+    features: np.ndarray,
+    feature_keys: list[str],
+    deltas: np.ndarray,
+    device: str = "cpu",
+) -> tuple[list[dict], str]:
+    """
+    Evaluate many 'what if' scenarios for one student in one batched pass.
 
-    model.zero_grad()
-    outputs = model(x_grad)
-    score = outputs["predicted_score"].sum()
-    score.backward()
+    Args:
+        features: student's prepare_features matrix, oldest day first
+        feature_keys: adjustable log fields, one per column of `deltas`
+        deltas: (n_scenarios, len(feature_keys)) additive adjustments in raw
+            log units, as in `simulate_performance`
 
-    if x_grad.grad is not None:
-        # Average absolute gradients across time steps
-        importance = x_grad.grad.abs().mean(dim=1).squeeze(0).cpu().numpy()
-        total = importance.sum()
-        if total > 0:
-            importance = importance / total
+    Returns:
+        (results, model_version), one prediction dict per scenario without
+        feature attribution; like `simulate_performance`, a history shorter
+        than `model_min_history()` gets the unadjusted heuristic prediction
+        for every scenario
+    """
+    if not feature_keys:
+        raise ValueError("No features to adjust")
+    unknown = [k for k in feature_keys if k not in ADJUSTABLE_FEATURES]
+    if unknown:
+        raise ValueError(f"Cannot simulate adjustments to: {', '.join(unknown)}")
+    deltas = np.asarray(deltas, dtype=np.float32).reshape(-1, len(feature_keys))
+    if len(deltas) > MAX_GRID_SCENARIOS:
+        raise ValueError(f"Too many scenarios ({len(deltas)}), limit is {MAX_GRID_SCENARIOS}")
+
+    if len(features) < model_min_history():
+        heuristic = _heuristic_prediction(features)
+        return [dict(heuristic) for _ in range(len(deltas))], get_registry().version
+
+    base, n_days = _right_aligned(features)
+
+    # Map raw deltas onto encoded feature columns, then broadcast over every day
+    offsets = np.zeros((len(deltas), len(FEATURE_NAMES)), dtype=np.float32)
+    for j, key in enumerate(feature_keys):
+        col, scale = ADJUSTABLE_FEATURES[key]
+        offsets[:, col] += deltas[:, j] * scale
+
+    windows = np.repeat(base[None], len(deltas), axis=0)
+    windows[:, SEQUENCE_LENGTH - n_days:, :] += offsets[:, None, :]
+
+    return predict_batch(windows, np.full(len(deltas), n_days), device=device)
+
+
+def predict_batch(
+    windows: np.ndarray,
+    lengths: np.ndarray,
+    chunk_size: int = 1024,
+    device: str = "cpu",
+    attribution: str = ATTRIBUTION_OFF,
+) -> tuple[list[dict], str]:
+    """
+    Score a whole cohort in vectorized passes.
 
-        return {name: round(float(val), 4) for name, val in zip(FEATURE_NAMES, importance)}
+    Args:
+        windows: (n_students, SEQUENCE_LENGTH, n_features) prepare_features
+            encoding, right-aligned so the most recent day is last and
+            missing days are zero-padded at the front
+        lengths: (n_students,) number of real days in each window; windows
+            with fewer than `model_min_history()` days use the heuristic
+        chunk_size: students per forward pass
+        attribution: feature importance mode for model rows; "off" leaves
+            feature_importance as None
+
+    Returns:
+        (results, model_version) where results[i] is the prediction dict for
+        windows[i]
+    """
+    lengths = np.asarray(lengths)
+    results: list[Optional[dict]] = [None] * len(lengths)
+
+    # Model rows ordered by length, so each chunk holds (nearly) one length
+    # and the model pads as little as possible
+    min_history = model_min_history()
+    scored = np.flatnonzero(lengths >= min_history)
+    scored = scored[np.argsort(lengths[scored], kind="stable")]
+    short = np.flatnonzero(lengths < min_history)
+
+    model_version = get_registry().version
+
+    if len(scored):
+        raw, model_version = _forward_columns(windows[scored], lengths[scored], chunk_size, device)
+        scaled = _scale_outputs(raw)
+        importances = compute_attributions(
+            windows[scored], attribution, chunk_size, device, lengths=lengths[scored]
+        )
+        for j, i in enumerate(scored):
+            results[i] = {k: float(v[j]) for k, v in scaled.items()}
+            results[i]["feature_importance"] = importances[j]
+
+    if len(short):
+        for j, row in zip(short, _heuristic_prediction_batch(windows[short], lengths[short])):
+            results[j] = row
+
+    return results, model_version
+
+
+def _forward_columns(
+    windows: np.ndarray, lengths: np.ndarray, chunk_size: int, device: str
+) -> tuple[dict, str]:
+    """Raw model outputs as {key: (n,) array}, on the worker pool when enabled."""
+    lengths = np.asarray(lengths, dtype=np.int64)
+    pool = get_pool()
+    if pool.enabled:
+        return pool.run(windows, lengths)
+
+    registry = get_registry()
+    model = registry.get_serving()
+    columns = {k: [] for k in OUTPUT_KEYS}
+    with torch.no_grad():
+        for start in range(0, len(windows), chunk_size):
+            x = torch.from_numpy(
+                np.ascontiguousarray(windows[start : start + chunk_size], dtype=np.float32)
+            ).to(device)
+            out = model(x, torch.from_numpy(lengths[start : start + chunk_size]))
+            for k in OUTPUT_KEYS:
+                columns[k].append(out[k].cpu().numpy())
+    return {k: np.concatenate(v) for k, v in columns.items()}, registry.version
+
+
+def _right_aligned(features: np.ndarray, seq_len: int = SEQUENCE_LENGTH) -> tuple[np.ndarray, int]:
+    """Last `seq_len` days as a zero-padded (seq_len, n_features) window, plus the real day count."""
+    n_days = min(len(features), seq_len)
+    window = np.zeros((seq_len, len(FEATURE_NAMES)), dtype=np.float32)
+    if n_days:
+        window[seq_len - n_days:] = features[-n_days:]
+    return window, n_days
+
+
+def _heuristic_prediction_batch(windows: np.ndarray, lengths: np.ndarray) -> list[dict]:
+    """Vectorized `_heuristic_prediction` over right-aligned feature windows."""
+    seq_len = windows.shape[1]
+    n_recent = np.minimum(lengths, HEURISTIC_WINDOW)
+    positions = np.arange(seq_len)[None, :]
+    mask = positions >= (seq_len - n_recent)[:, None]
+    denom = np.maximum(n_recent, 1)
+
+    def recent_mean(col: int) -> np.ndarray:
+        return (windows[:, :, col] * mask).sum(axis=1) / denom
+
+    scores = windows[:, :, _SCORE].astype(np.float64) * 100.0
+    avg_score = (scores * mask).sum(axis=1) / denom
+    avg_hours = recent_mean(_HOURS)
+    avg_mood = recent_mean(_MOOD) * 5.0
+    avg_conf = recent_mean(_CONF) * 5.0
+
+    burnout = np.clip((avg_hours / 12.0) * (1 - avg_mood / 5.0) * (1 - avg_conf / 5.0), 0, 1)
+
+    first_idx = np.clip(seq_len - n_recent, 0, seq_len - 1)
+    first_score = scores[np.arange(len(lengths)), first_idx]
+    velocity = np.where(n_recent > 1, (scores[:, -1] - first_score) / denom, 0.0)
+
+    results = []
+    for i in range(len(lengths)):
+        if lengths[i] == 0:
+            results.append(_default_prediction())
+            continue
+        results.append({
+            "predicted_score": round(float(avg_score[i]), 2),
+            "burnout_risk": round(float(burnout[i]), 3),
+            "improvement_velocity": round(float(velocity[i]), 2),
+            "confidence_lower": round(float(avg_score[i] - 8), 2),
+            "confidence_upper": round(float(avg_score[i] + 8), 2),
+            "feature_importance": dict(HEURISTIC_IMPORTANCE),
+        })
+    return results
+
+
+def _scale_outputs(outputs: dict) -> dict:
+    """Vectorized `_format_outputs` over arrays of raw model outputs."""
+    return {
+        "predicted_score": np.round(outputs["predicted_score"].astype(np.float64) * 100, 2),
+        "burnout_risk": np.round(outputs["burnout_risk"].astype(np.float64), 3),
+        "improvement_velocity": np.round(outputs["improvement_velocity"].astype(np.float64) * 20, 2),
+        "confidence_lower": np.round(outputs["confidence_lower"].astype(np.float64) * 100, 2),
+        "confidence_upper": np.round(outputs["confidence_upper"].astype(np.float64) * 100, 2),
+    }
 
-    return {name: 0.0 for name in FEATURE_NAMES}
 
+def _format_outputs(outputs: dict) -> dict:
+    """Scale raw model outputs for a single student to API units."""
+    return {
+        "predicted_score": round(float(outputs["predicted_score"]) * 100, 2),
+        "burnout_risk": round(float(outputs["burnout_risk"]), 3),
+        "improvement_velocity": round(float(outputs["improvement_velocity"]) * 20, 2),
+        "confidence_lower": round(float(outputs["confidence_lower"]) * 100, 2),
+        "confidence_upper": round(float(outputs["confidence_upper"]) * 100, 2),
+    }
 
-def _heuristic_prediction(logs: list[dict]) -> dict:
-    """Fallback heuristic when not enough data for LSTM."""
-    if not logs:
-        return {
-            "predicted_score": 50.0,
-            "burnout_risk": 0.3,
-            "improvement_velocity": 0.0,
-            "confidence_lower": 42.0,
-            "confidence_upper": 58.0,
-            "feature_importance": {n: 1.0 / len(FEATURE_NAMES) for n in FEATURE_NAMES},
-        }
-
-    recent = logs[-min(len(logs), 7):]
-    avg_score = np.mean([l.get("mock_score", 50) for l in recent])
-    avg_mood = np.mean([l.get("mood", 3) for l in recent])
-    avg_conf = np.mean([l.get("confidence", 3) for l in recent])
-    avg_hours = np.mean([l.get("study_hours", 4) for l in recent])
-
-    burnout = max(0, min(1, (avg_hours / 12.0) * (1 - avg_mood / 5.0) * (1 - avg_conf / 5.0)))
-
-    scores = [l.get("mock_score", 50) for l in recent]
-    velocity = (scores[-1] - scores[0]) / max(len(scores), 1) if len(scores) > 1 else 0
 
+def _default_prediction() -> dict:
+    """Prediction for a student with no logs at all."""
     return {
-        "predicted_score": round(float(avg_score), 2),
-        "burnout_risk": round(float(burnout), 3),
-        "improvement_velocity": round(float(velocity), 2),
-        "confidence_lower": round(float(avg_score - 8), 2),
-        "confidence_upper": round(float(avg_score + 8), 2),
-        "feature_importance": {
-            "study_hours": 0.20, "topics_completed": 0.10,
-            "problems_solved": 0.18, "mock_score": 0.22,
-            "confidence": 0.12, "mood": 0.08,
-            "revision_done": 0.05, "skill_practiced": 0.05,
-        },
+        "predicted_score": 50.0,
+        "burnout_risk": 0.3,
+        "improvement_velocity": 0.0,
+        "confidence_lower": 42.0,
+        "confidence_upper": 58.0,
+        "feature_importance": {n: 1.0 / len(FEATURE_NAMES) for n in FEATURE_NAMES},
     }
+
+
+def _heuristic_prediction(features: np.ndarray) -> dict:
+    """Fallback heuristic when not enough data for LSTM."""
+    window, n_days = _right_aligned(features)
+    return _heuristic_prediction_batch(window[None], np.array([n_days]))[0]
@@ -0,0 +1,123 @@
+"""
+NeuroGrowth AI - Int8 Dynamic Quantization
+Opt-in int8 serving mode for the LSTM and Linear layers on CPU nodes
+
+Usage (from backend/):
+    python -m models.quantization      # accuracy + throughput report vs float
+"""
+
+import os
+import sys
+import copy
+import json
+import time
+import random
+
+import numpy as np
+import torch
+import torch.nn as nn
+from loguru import logger
+
+from models.dl_model import OUTPUT_KEYS, StudentGrowthLSTM, get_model, load_model_file
+from models.registry import MODEL_FILENAME
+from models.train import SAVED_MODEL_DIR, SEQUENCE_LENGTH, prepare_features
+
+REPORT_BATCH_SIZES = (1, 32, 1024)
+COHORT_STYLES = ["fast_improver", "consistent", "crammer", "burnout_prone"]
+
+
+def quantize_model(model: StudentGrowthLSTM) -> nn.Module:
+    """Int8 dynamic quantization of nn.LSTM and every nn.Linear (incl. the fc stack)."""
+    model.eval()
+    return torch.ao.quantization.quantize_dynamic(
+        copy.deepcopy(model), {nn.LSTM, nn.Linear}, dtype=torch.qint8
+    )
+
+
+def synthetic_cohort(n_students: int = 2000, days: int = 30, seed: int = 1234) -> np.ndarray:
+    """
+    Held-out cohort from the seed generator, as (n_students, SEQUENCE_LENGTH, 8)
+    windows over each student's last SEQUENCE_LENGTH days.
+    """
+    from utils.seed import generate_student_logs
+
+    random.seed(seed)
+    windows = np.empty((n_students, SEQUENCE_LENGTH, 8), dtype=np.float32)
+    for i in range(n_students):
+        logs = generate_student_logs(COHORT_STYLES[i % len(COHORT_STYLES)], days=days)
+        for log in logs:
+            log["skill_practiced"] = log["skill_practiced"].value
+        windows[i] = prepare_features(logs[-SEQUENCE_LENGTH:])
+    return windows
+
+
+def compare_outputs(model: nn.Module, quantized: nn.Module, windows: np.ndarray) -> dict:
+    """Error of the int8 model against the float model, in API units."""
+    x = torch.from_numpy(windows)
+    with torch.no_grad():
+        ref = model(x)
+        out = quantized(x)
+
+    # Same scaling as inference._format_outputs
+    scales = {
+        "predicted_score": 100.0, "burnout_risk": 1.0, "improvement_velocity": 20.0,
+        "confidence_lower": 100.0, "confidence_upper": 100.0,
+    }
+    report = {}
+    for k in OUTPUT_KEYS:
+        err = (out[k] - ref[k]).abs().numpy() * scales[k]
+        report[k] = {
+            "mae": round(float(err.mean()), 4),
+            "p99": round(float(np.percentile(err, 99)), 4),
+            "max": round(float(err.max()), 4),
+        }
+    return report
+
+
+def throughput(model: nn.Module, windows: np.ndarray, batch_size: int, repeats: int = 3) -> float:
+    """Samples per second for forward passes over `windows` at `batch_size`."""
+    x = torch.from_numpy(windows)
+    with torch.no_grad():
+        model(x[:batch_size])  # warmup
+        best = float("inf")
+        for _ in range(repeats):
+            start = time.perf_counter()
+            for i in range(0, len(x), batch_size):
+                model(x[i : i + batch_size])
+            best = min(best, time.perf_counter() - start)
+    return len(x) / best
+
+
+if __name__ == "__main__":
+    weights = os.path.join(SAVED_MODEL_DIR, MODEL_FILENAME)
+    if os.path.exists(weights):
+        model = load_model_file(weights)
+    else:
+        model = get_model()
+        logger.warning("No trained weights found, reporting on an untrained model")
+    model.eval()
+    quantized = quantize_model(model)
+
+    windows = synthetic_cohort()
+    rows = []
+    for b in REPORT_BATCH_SIZES:
+        # Batch size 1 over the full cohort is slow; a slice is representative
+        sample = windows[: min(len(windows), 200 if b == 1 else len(windows))]
+        fp32 = throughput(model, sample, b)
+        int8 = throughput(quantized, sample, b)
+        rows.append({
+            "batch_size": b,
+            "fp32_samples_per_s": round(fp32, 1),
+            "int8_samples_per_s": round(int8, 1),
+            "speedup": round(int8 / fp32, 2),
+        })
+
+    report = {
+        "engine": torch.backends.quantized.engine,
+        "threads": torch.get_num_threads(),
+        "cohort_size": len(windows),
+        "error_vs_fp32": compare_outputs(model, quantized, windows),
+        "throughput": rows,
+    }
+    json.dump(report, sys.stdout, indent=2)
+    print()
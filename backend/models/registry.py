@@ -0,0 +1,194 @@
+"""
+NeuroGrowth AI - Process-wide Model Registry
+Loads the trained weights once and hot-reloads them when the file changes
+"""
+
+import os
+import time
+import hashlib
+import threading
+from datetime import datetime
+from typing import Optional
+
+import torch
+from loguru import logger
+
+from models.dl_model import StudentGrowthLSTM, get_model, load_model_file
+from models.train import SAVED_MODEL_DIR, SEQUENCE_LENGTH, MIN_SEQUENCE_LENGTH
+
+MODEL_FILENAME = "growth_model.pt"
+SCRIPTED_FILENAME = "growth_model.ts.pt"
+UNTRAINED_VERSION = "untrained"
+
+# "eager" serves the Python module; "torchscript" serves the frozen artifact
+# written by train_model when it matches the current weights; "quantized"
+# serves an int8 dynamic-quantized copy built at load time
+MODEL_FORMAT = os.getenv("MODEL_FORMAT", "eager")
+
+
+def file_version(path: str) -> str:
+    """Short content hash used as the model version id."""
+    with open(path, "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()[:12]
+
+
+class ModelRegistry:
+    """
+    Holds a single shared eval-mode StudentGrowthLSTM per process.
+
+    The weights file is stat'ed on every `get()`; when its mtime or size
+    changes (e.g. after /admin/retrain) the model is reloaded under a lock and
+    swapped in atomically. Callers must treat the returned model as read-only.
+    """
+
+    def __init__(
+        self,
+        model_path: Optional[str] = None,
+        device: str = "cpu",
+        model_format: str = MODEL_FORMAT,
+    ):
+        self.model_path = model_path or os.path.join(SAVED_MODEL_DIR, MODEL_FILENAME)
+        self.scripted_path = os.path.join(os.path.dirname(self.model_path), SCRIPTED_FILENAME)
+        self.device = device
+        self.model_format = model_format
+        self._lock = threading.Lock()
+        self._model: Optional[StudentGrowthLSTM] = None
+        self._serving: Optional[torch.nn.Module] = None
+        self._file_stamp: Optional[tuple] = None
+        self.version: str = UNTRAINED_VERSION
+        self.min_history: int = SEQUENCE_LENGTH
+        self.load_time_ms: float = 0.0
+        self.loaded_at: Optional[datetime] = None
+        self.reload_count: int = 0
+
+    # ─── Public API ──────────────────────────────────────────────────────────
+
+    def get(self) -> StudentGrowthLSTM:
+        """Return the shared model, reloading it first if the weights changed."""
+        stamp = self._stat()
+        if self._model is None or stamp != self._file_stamp:
+            with self._lock:
+                # Re-check inside the lock so concurrent callers load only once
+                stamp = self._stat()
+                if self._model is None or stamp != self._file_stamp:
+                    self._load(stamp)
+        return self._model
+
+    def get_serving(self):
+        """
+        Return the module to use for plain forward passes: the frozen
+        TorchScript artifact when MODEL_FORMAT=torchscript and it matches the
+        current weights, the int8 copy when MODEL_FORMAT=quantized, otherwise
+        the eager model. Use `get()` when you need
+        autograd or the model's helper methods.
+        """
+        model = self.get()
+        return self._serving if self._serving is not None else model
+
+    def invalidate(self):
+        """Force a reload on the next `get()` call."""
+        with self._lock:
+            self._file_stamp = None
+
+    def info(self) -> dict:
+        """Metadata about the currently served weights."""
+        return {
+            "version": self.version,
+            "format": self.model_format if self._serving is not None else "eager",
+            "min_history_days": self.min_history,
+            "model_path": self.model_path,
+            "load_time_ms": round(self.load_time_ms, 2),
+            "loaded_at": self.loaded_at.isoformat() if self.loaded_at else None,
+            "reload_count": self.reload_count,
+        }
+
+    # ─── Internals ───────────────────────────────────────────────────────────
+
+    def _stat(self) -> Optional[tuple]:
+        weights = self._stat_file(self.model_path)
+        if weights is None:
+            return None
+        if self.model_format == "torchscript":
+            return weights + (self._stat_file(self.scripted_path),)
+        return weights
+
+    @staticmethod
+    def _stat_file(path: str) -> Optional[tuple]:
+        try:
+            st = os.stat(path)
+        except FileNotFoundError:
+            return None
+        return (st.st_mtime_ns, st.st_size)
+
+    def _load(self, stamp: Optional[tuple]):
+        start = time.perf_counter()
+
+        if stamp is None:
+            logger.warning("No trained model found, using untrained model")
+            model = get_model(device=self.device)
+            version = UNTRAINED_VERSION
+        else:
+            version = file_version(self.model_path)
+            model = load_model_file(self.model_path, device=self.device)
+
+        model.eval()
+        for p in model.parameters():
+            p.requires_grad_(False)
+
+        serving = None
+        if self.model_format == "torchscript" and stamp is not None:
+            serving = self._load_scripted(version)
+        elif self.model_format == "quantized":
+            from models.quantization import quantize_model
+            serving = quantize_model(model)
+
+        # Weights that do not record the shortest history they were trained on
+        # have only seen full windows
+        trained_min = int(model.min_history)
+        min_history = max(trained_min, MIN_SEQUENCE_LENGTH) if trained_min else SEQUENCE_LENGTH
+
+        # Swap in the fully-built models
+        self._serving = serving
+        self._model = model
+        self._file_stamp = stamp
+        self.version = version
+        self.min_history = min_history
+        self.load_time_ms = (time.perf_counter() - start) * 1000
+        self.loaded_at = datetime.utcnow()
+        self.reload_count += 1
+        logger.info(f"✅ Model {version} loaded in {self.load_time_ms:.1f} ms")
+
+    def _load_scripted(self, version: str) -> Optional[torch.jit.ScriptModule]:
+        if not os.path.exists(self.scripted_path):
+            logger.warning("MODEL_FORMAT=torchscript but no scripted artifact found, serving eager model")
+            return None
+        extra_files = {"version": ""}
+        try:
+            scripted = torch.jit.load(self.scripted_path, map_location=self.device, _extra_files=extra_files)
+        except Exception as e:
+            logger.warning(f"Failed to load scripted artifact: {e}")
+            return None
+        scripted_version = extra_files["version"]
+        if isinstance(scripted_version, bytes):
+            scripted_version = scripted_version.decode()
+        if scripted_version != version:
+            logger.warning(
+                f"Scripted artifact is for weights {scripted_version or 'unknown'}, "
+                f"current weights are {version}; serving eager model"
+            )
+            return None
+        return scripted
+
+
+# Singleton instance
+_registry: Optional[ModelRegistry] = None
+_registry_lock = threading.Lock()
+
+
+def get_registry() -> ModelRegistry:
+    global _registry
+    if _registry is None:
+        with _registry_lock:
+            if _registry is None:
+                _registry = ModelRegistry()
+    return _registry
@@ -0,0 +1,103 @@
+"""
+NeuroGrowth AI - On-disk Training Snapshots
+Memory-mapped features, targets and a per-student offsets index
+"""
+
+import os
+import re
+import json
+from typing import Optional
+
+import numpy as np
+
+# Kept beside the weights (models.train.SAVED_MODEL_DIR, which imports this module)
+SNAPSHOT_DIR = os.path.join("saved_models", "snapshots")
+FEATURES_FILE = "features.npy"
+TARGETS_FILE = "targets.npy"
+LOG_IDS_FILE = "log_ids.npy"
+STUDENTS_FILE = "students.npy"
+OFFSETS_FILE = "offsets.npy"
+META_FILE = "meta.json"
+_SNAPSHOT_ID = re.compile(r"^[0-9a-f]{12}$")
+
+
+class TrainingSnapshot:
+    """
+    A frozen copy of every student's daily logs, ready for training.
+
+    Rows are ordered by (student_id, date, id). Student `i` owns rows
+    offsets[i] .. offsets[i + 1] of the row arrays:
+
+        features  (rows, 8) float32   prepare_features encoding
+        targets   (rows, 5) float32   compute_targets of each student's rows
+        log_ids   (rows,)   int64     DailyLog id behind each row
+
+    The row arrays are memory-mapped copy-on-write, so opening a snapshot
+    reads nothing up front and training pages in only the windows it
+    samples. Snapshots are written by services.training_snapshot.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(os.path.join(path, META_FILE)) as f:
+            self.meta = json.load(f)
+        rows = self.meta["rows"]
+        # Files can be longer than `rows` when logs were deleted mid-export
+        self.features = np.load(os.path.join(path, FEATURES_FILE), mmap_mode="c")[:rows]
+        self.targets = np.load(os.path.join(path, TARGETS_FILE), mmap_mode="c")[:rows]
+        self.log_ids = np.load(os.path.join(path, LOG_IDS_FILE), mmap_mode="r")[:rows]
+        self.student_ids = np.load(os.path.join(path, STUDENTS_FILE))
+        self.offsets = np.load(os.path.join(path, OFFSETS_FILE))
+
+    @property
+    def snapshot_id(self) -> str:
+        return self.meta["snapshot_id"]
+
+    @property
+    def watermark(self) -> int:
+        """Highest DailyLog id included in the snapshot."""
+        return self.meta["watermark_log_id"]
+
+    @property
+    def lengths(self) -> np.ndarray:
+        return np.diff(self.offsets)
+
+    def __len__(self) -> int:
+        return len(self.student_ids)
+
+    def student_features(self) -> dict[int, np.ndarray]:
+        """{student_id: (n_days, 8) view into the features memmap}."""
+        return {
+            int(sid): self.features[a:b]
+            for sid, a, b in zip(self.student_ids, self.offsets[:-1], self.offsets[1:])
+        }
+
+
+def list_snapshots(snapshot_dir: str = SNAPSHOT_DIR) -> list[dict]:
+    """Metadata of every complete snapshot, newest first."""
+    if not os.path.isdir(snapshot_dir):
+        return []
+    metas = []
+    for name in os.listdir(snapshot_dir):
+        if not _SNAPSHOT_ID.match(name):
+            continue  # skips exports still being written (<id>.tmp)
+        try:
+            with open(os.path.join(snapshot_dir, name, META_FILE)) as f:
+                metas.append(json.load(f))
+        except (FileNotFoundError, json.JSONDecodeError):
+            continue
+    return sorted(metas, key=lambda m: m["created_at"], reverse=True)
+
+
+def open_snapshot(snapshot_id: str, snapshot_dir: str = SNAPSHOT_DIR) -> Optional[TrainingSnapshot]:
+    if not _SNAPSHOT_ID.match(snapshot_id):
+        return None
+    path = os.path.join(snapshot_dir, snapshot_id)
+    if not os.path.exists(os.path.join(path, META_FILE)):
+        return None
+    return TrainingSnapshot(path)
+
+
+def latest_snapshot(snapshot_dir: str = SNAPSHOT_DIR) -> Optional[TrainingSnapshot]:
+    metas = list_snapshots(snapshot_dir)
+    return open_snapshot(metas[0]["snapshot_id"], snapshot_dir) if metas else None
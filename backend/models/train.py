@@ -3,18 +3,41 @@ NeuroGrowth AI - Model Training Pipeline
 """
 
 import os
+import copy
 import json
+from datetime import datetime
+from typing import Callable, Optional, Union
+
 import numpy as np
 import torch
 import torch.nn as nn
-from torch.utils.data import Dataset, DataLoader
+from torch.utils.data import Dataset, DataLoader, Sampler
 from sklearn.preprocessing import StandardScaler
 from loguru import logger
 
 from models.dl_model import StudentGrowthLSTM, get_model
+from models.snapshot import TrainingSnapshot
 
 SAVED_MODEL_DIR = "saved_models"
 SEQUENCE_LENGTH = 14  # Look at last 14 days
+# Fewest days of history the model scores (and trains on); below it the heuristic is used
+MIN_SEQUENCE_LENGTH = int(os.getenv("MODEL_MIN_HISTORY_DAYS", "3"))
+OPTIMIZER_FILENAME = "growth_model.optim.pt"
+TRAINING_STATE_FILENAME = "training_state.json"
+
+# Incremental fine-tuning: epochs, learning rate, and how many older windows
+# to replay per new window so the model does not drift towards recent data
+FINETUNE_EPOCHS = int(os.getenv("FINETUNE_EPOCHS", "5"))
+FINETUNE_LR = float(os.getenv("FINETUNE_LR", "0.0003"))
+REPLAY_FRACTION = float(os.getenv("FINETUNE_REPLAY_FRACTION", "0.2"))
+
+# Share of students held out for validation, epochs without a validation
+# improvement before stopping (longer than the LR scheduler's patience of 5,
+# so the rate is halved once before giving up), and checkpoint interval
+VAL_FRACTION = float(os.getenv("TRAIN_VAL_FRACTION", "0.15"))
+EARLY_STOP_PATIENCE = int(os.getenv("TRAIN_EARLY_STOP_PATIENCE", "8"))
+CHECKPOINT_EVERY = int(os.getenv("TRAIN_CHECKPOINT_EVERY", "1"))
+MIN_IMPROVEMENT = 1e-4
 
 # ─── Skill encoding map ──────────────────────────────────────────────────────
 SKILL_MAP = {
@@ -22,19 +45,199 @@ SKILL_MAP = {
     "Web Dev": 5, "Math": 6, "Aptitude": 7, "Soft Skills": 8, "Other": 9
 }
 
+# prepare_features divides each raw column by these (feature matrix -> log units: multiply)
+FEATURE_DIVISORS = np.array([1.0, 1.0, 1.0, 100.0, 5.0, 5.0, 1.0, 9.0])
+
+
+class LengthBucketSampler(Sampler):
+    """
+    Batches of sample ids grouped by window length.
+
+    Ids are sorted by length (shuffled within each length first) and cut
+    into consecutive batches, so almost every batch holds one length and the
+    model runs it without padding; only a batch straddling two lengths goes
+    through the packed path. The batch order is shuffled each epoch.
+    """
+
+    def __init__(self, lengths: torch.Tensor, batch_size: int, shuffle: bool = True):
+        self.lengths = lengths
+        self.batch_size = batch_size
+        self.shuffle = shuffle
+
+    def __len__(self):
+        return (len(self.lengths) + self.batch_size - 1) // self.batch_size
+
+    def __iter__(self):
+        if self.shuffle:
+            perm = torch.randperm(len(self.lengths))
+            order = perm[torch.argsort(self.lengths[perm], stable=True)]
+        else:
+            order = torch.argsort(self.lengths, stable=True)
+        batches = list(torch.split(order, self.batch_size))
+        if self.shuffle:
+            batches = [batches[i] for i in torch.randperm(len(batches))]
+        for batch in batches:
+            yield batch.tolist()
+
 
 class StudentDataset(Dataset):
-    """PyTorch dataset for time-series student logs."""
+    """
+    Sliding-window dataset over time-series student logs.
+
+    Every student's feature matrix is stored once, back to back in one
+    (total_days, n_features) buffer. Each day after a student's first
+    `min_len` is a sample: the target is that day, the input the up to
+    `seq_len` days before it, so short histories train the model too.
+    Samples are addressed by their target row and length, and the
+    overlapping windows are never materialized: indexing with a list of
+    sample ids gathers just that batch, right-aligned and zero-padded like
+    the windows served at inference time.
+
+    `new_rows` optionally flags the rows added since the last training run;
+    `is_new` then marks every window whose inputs or target include such a
+    row.
+    """
 
-    def __init__(self, sequences: np.ndarray, targets: np.ndarray):
-        self.sequences = torch.FloatTensor(sequences)
-        self.targets = torch.FloatTensor(targets)
+    def __init__(
+        self,
+        all_features: list[np.ndarray],
+        seq_len: int = SEQUENCE_LENGTH,
+        new_rows: Optional[list[np.ndarray]] = None,
+        min_len: int = MIN_SEQUENCE_LENGTH,
+    ):
+        """
+        Args:
+            all_features: one (n_days, 8) prepare_features matrix per student
+            new_rows: per-student boolean masks aligned with `all_features`
+            min_len: fewest days of input a window may have
+        """
+        keep = [i for i, f in enumerate(all_features) if len(f) > min_len]
+        students = [all_features[i] for i in keep]
+        if students:
+            features = np.concatenate(students).astype(np.float32, copy=False)
+            targets = np.concatenate([compute_targets(f) for f in students])
+        else:
+            features = np.zeros((0, 8), dtype=np.float32)
+            targets = np.zeros((0, 5), dtype=np.float32)
+        flags = None
+        if new_rows is not None:
+            flags = np.concatenate([new_rows[i] for i in keep] or [np.zeros(0, dtype=bool)])
+        lengths = np.array([len(f) for f in students], dtype=np.int64)
+        self._index(
+            np.ascontiguousarray(features), np.ascontiguousarray(targets), lengths,
+            np.array(keep, dtype=np.int64), seq_len, min_len, flags,
+        )
+
+    @classmethod
+    def from_snapshot(
+        cls,
+        snapshot: TrainingSnapshot,
+        seq_len: int = SEQUENCE_LENGTH,
+        new_rows: Optional[np.ndarray] = None,
+        min_len: int = MIN_SEQUENCE_LENGTH,
+    ) -> "StudentDataset":
+        """
+        Windows over a memory-mapped training snapshot, without copying it.
+
+        Args:
+            new_rows: a boolean mask over the snapshot's rows
+        """
+        dataset = cls.__new__(cls)
+        dataset._index(
+            snapshot.features, snapshot.targets, snapshot.lengths, snapshot.student_ids,
+            seq_len, min_len, new_rows,
+        )
+        return dataset
+
+    def _index(
+        self,
+        features: np.ndarray,
+        targets: np.ndarray,
+        lengths: np.ndarray,
+        student_keys: np.ndarray,
+        seq_len: int,
+        min_len: int,
+        new_rows: Optional[np.ndarray],
+    ):
+        self.seq_len = seq_len
+        min_len = max(1, min(min_len, seq_len))
+        self.min_len = min_len
+        self.features = torch.from_numpy(features)
+        self.targets = torch.from_numpy(targets)
+
+        # Sample i is labelled with row ends[i] and reads the lengths[i] rows
+        # before it, all within one student's rows
+        offsets = np.cumsum(lengths) - lengths
+        ends = [o + np.arange(min_len, n) for o, n in zip(offsets, lengths) if n > min_len]
+        ends = np.concatenate(ends or [np.zeros(0, dtype=np.int64)])
+        per_student = np.maximum(lengths - min_len, 0)
+        day = ends - np.repeat(offsets, per_student)
+        self.ends = torch.from_numpy(ends)
+        self.lengths = torch.from_numpy(np.minimum(day, seq_len))
+        self._steps = torch.arange(seq_len)
+        # Owner of each window: a student id, or the student's list position
+        self.student_key = torch.from_numpy(
+            np.repeat(np.asarray(student_keys, dtype=np.int64), per_student)
+        )
+
+        self.is_new = None
+        if new_rows is not None:
+            # New rows in [end - length, end], the window plus its target
+            csum = np.concatenate([[0], np.cumsum(new_rows, dtype=np.int64)])
+            e, n = self.ends.numpy(), self.lengths.numpy()
+            self.is_new = torch.from_numpy(csum[e + 1] - csum[e - n] > 0)
+
+    def select(self, ids: np.ndarray):
+        """Restrict the dataset to the given sample ids (the buffer is shared)."""
+        ids = torch.as_tensor(ids, dtype=torch.int64)
+        self.ends = self.ends[ids]
+        self.lengths = self.lengths[ids]
+        self.student_key = self.student_key[ids]
+        if self.is_new is not None:
+            self.is_new = self.is_new[ids]
+
+    def split(self, val_fraction: float) -> tuple["StudentDataset", "StudentDataset"]:
+        """
+        Split into (train, validation) datasets by student, never by window,
+        so no student's days leak across the two. A student's side depends
+        only on its key, so the split is stable across runs and snapshots.
+        """
+        keys = self.student_key.numpy().astype(np.uint64)
+        # Knuth multiplicative hash, spreads consecutive ids evenly over [0, 2^32)
+        spread = (keys * np.uint64(2654435761)) % np.uint64(2**32)
+        in_val = spread < np.uint64(int(val_fraction * 2**32))
+        if in_val.all():
+            in_val[:] = False  # too few students to hold any out
+        train, val = copy.copy(self), copy.copy(self)
+        train.select(np.flatnonzero(~in_val))
+        val.select(np.flatnonzero(in_val))
+        return train, val
 
     def __len__(self):
-        return len(self.sequences)
+        return len(self.ends)
 
     def __getitem__(self, idx):
-        return self.sequences[idx], self.targets[idx]
+        """(window, length, target); a list of ids gives a batch of each."""
+        if isinstance(idx, int):
+            end, n = int(self.ends[idx]), int(self.lengths[idx])
+            window = self.features[end - n : end]
+            if n < self.seq_len:
+                window = torch.cat([window.new_zeros(self.seq_len - n, window.shape[1]), window])
+            return window, self.lengths[idx], self.targets[end]
+        idx = torch.as_tensor(idx)
+        ends, lengths = self.ends[idx], self.lengths[idx]
+        # Right-aligned rows end - seq_len .. end - 1; positions before the
+        # student's first day are clamped into range and zeroed
+        rows = ends[:, None] - self.seq_len + self._steps
+        real = self._steps[None, :] >= (self.seq_len - lengths)[:, None]
+        X = self.features[rows.clamp(min=0)] * real.unsqueeze(-1)
+        return X, lengths, self.targets[ends]
+
+    def loader(self, batch_size: int, shuffle: bool = True) -> DataLoader:
+        """Length-bucketed batches gathered lazily from the shared buffer."""
+        return DataLoader(
+            self, sampler=LengthBucketSampler(self.lengths, batch_size, shuffle), batch_size=None
+        )
 
 
 def prepare_features(logs: list[dict]) -> np.ndarray:
@@ -55,106 +258,269 @@ def prepare_features(logs: list[dict]) -> np.ndarray:
     return np.array(features, dtype=np.float32)
 
 
-def create_sequences(features: np.ndarray, targets: np.ndarray, seq_len: int = SEQUENCE_LENGTH):
-    """Create sliding-window sequences for LSTM input."""
-    X, y = [], []
-    for i in range(len(features) - seq_len):
-        X.append(features[i : i + seq_len])
-        y.append(targets[i + seq_len])
-    return np.array(X), np.array(y)
-
-
-def compute_targets(logs: list[dict]) -> np.ndarray:
+def compute_targets(features: np.ndarray) -> np.ndarray:
     """
-    Compute target labels from logs:
+    Compute target labels from a prepare_features matrix:
     [mock_score, burnout_risk, improvement_velocity, conf_lower, conf_upper]
     """
-    targets = []
-    for i, log in enumerate(logs):
-        score = log.get("mock_score", 50.0)
-        # Burnout heuristic: low mood + high hours + low confidence
-        mood = log.get("mood", 3)
-        conf = log.get("confidence", 3)
-        hours = log.get("study_hours", 4)
-        burnout = max(0, min(1, (hours / 12.0) * (1 - mood / 5.0) * (1 - conf / 5.0)))
-
-        # Improvement velocity: score difference from recent average
-        if i >= 3:
-            recent_scores = [logs[j].get("mock_score", 50) for j in range(max(0, i - 3), i)]
-            velocity = score - np.mean(recent_scores)
-        else:
-            velocity = 0.0
-
-        targets.append([
-            score / 100.0,
-            burnout,
-            velocity / 20.0,
-            max(0, (score - 8)) / 100.0,
-            min(100, (score + 8)) / 100.0,
-        ])
-    return np.array(targets, dtype=np.float32)
+    raw = features.astype(np.float64) * FEATURE_DIVISORS
+    score, conf, mood, hours = raw[:, 3], raw[:, 4], raw[:, 5], raw[:, 0]
+
+    # Burnout heuristic: low mood + high hours + low confidence
+    burnout = np.clip((hours / 12.0) * (1 - mood / 5.0) * (1 - conf / 5.0), 0, 1)
+
+    # Improvement velocity: score difference from the previous 3 days' average
+    velocity = np.zeros_like(score)
+    if len(score) > 3:
+        csum = np.concatenate([[0.0], np.cumsum(score)])
+        velocity[3:] = score[3:] - (csum[3:-1] - csum[:-4]) / 3.0
+
+    return np.stack([
+        score / 100.0,
+        burnout,
+        velocity / 20.0,
+        np.maximum(0, score - 8) / 100.0,
+        np.minimum(100, score + 8) / 100.0,
+    ], axis=1).astype(np.float32)
+
+
+def load_training_state() -> Optional[dict]:
+    """Metadata of the last completed training run (watermark, mode, time), if any."""
+    try:
+        with open(os.path.join(SAVED_MODEL_DIR, TRAINING_STATE_FILENAME)) as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+
+
+def save_training_state(**state):
+    """Record a completed training run next to the weights it produced."""
+    state["trained_at"] = datetime.utcnow().isoformat()
+    path = os.path.join(SAVED_MODEL_DIR, TRAINING_STATE_FILENAME)
+    with open(path + ".tmp", "w") as f:
+        json.dump(state, f, indent=2)
+    os.replace(path + ".tmp", path)
+
+
+def select_incremental(
+    dataset: StudentDataset, replay_fraction: float = REPLAY_FRACTION, seed: Optional[int] = None
+) -> tuple[int, int]:
+    """
+    Keep the dataset's new windows plus a random replay sample of older ones,
+    `replay_fraction` older windows per new window.
+
+    Returns:
+        (n_new, n_replay)
+    """
+    is_new = dataset.is_new.numpy()
+    new_ids = np.flatnonzero(is_new)
+    old_ids = np.flatnonzero(~is_new)
+    n_replay = min(len(old_ids), int(np.ceil(len(new_ids) * replay_fraction)))
+    rng = np.random.default_rng(seed)
+    replay_ids = rng.choice(old_ids, size=n_replay, replace=False)
+    dataset.select(np.sort(np.concatenate([new_ids, replay_ids])))
+    return len(new_ids), n_replay
+
+
+def _load_warm_start(
+    model: StudentGrowthLSTM, optimizer, lr: float, device: str, model_dir: str = SAVED_MODEL_DIR
+) -> bool:
+    """
+    Load the saved weights and, when it belongs to them, the AdamW state.
+
+    Returns:
+        False when there are no compatible saved weights to start from
+        (missing, unreadable, or for a different architecture)
+    """
+    from models.registry import MODEL_FILENAME, file_version
+
+    model_path = os.path.join(model_dir, MODEL_FILENAME)
+    try:
+        model.load_state_dict(torch.load(model_path, map_location=device, weights_only=True))
+    except Exception as e:
+        logger.warning(f"Warm start unavailable: {e}")
+        return False
+
+    try:
+        checkpoint = torch.load(
+            os.path.join(model_dir, OPTIMIZER_FILENAME), map_location=device, weights_only=True
+        )
+    except FileNotFoundError:
+        checkpoint = None
+    if checkpoint is not None and checkpoint.get("model_version") == file_version(model_path):
+        optimizer.load_state_dict(checkpoint["optimizer"])
+        # Keep Adam's moment estimates, but fine-tune at the requested rate
+        for group in optimizer.param_groups:
+            group["lr"] = lr
+    else:
+        logger.info("No optimizer state for the current weights, fine-tuning with a fresh AdamW")
+    return True
+
+
+def load_checkpoint(path: str) -> Optional[dict]:
+    """A training checkpoint written by train_model, or None if there is none."""
+    try:
+        return torch.load(path, map_location="cpu", weights_only=True)
+    except FileNotFoundError:
+        return None
+
+
+def _save_checkpoint(path: str, checkpoint: dict):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    torch.save(checkpoint, path + ".tmp")
+    os.replace(path + ".tmp", path)
+
+
+def _batch_loss(model: nn.Module, batch_X, batch_lengths, batch_y, loss_fn, device: str) -> torch.Tensor:
+    outputs = model(batch_X.to(device), batch_lengths)
+    predictions = torch.stack([
+        outputs["predicted_score"],
+        outputs["burnout_risk"],
+        outputs["improvement_velocity"],
+        outputs["confidence_lower"],
+        outputs["confidence_upper"],
+    ], dim=1)
+    return loss_fn(predictions, batch_y.to(device))
+
+
+def evaluate(model: nn.Module, loader: DataLoader, loss_fn, device: str = "cpu") -> float:
+    """Mean loss over `loader` in eval mode (dropout off, no gradients)."""
+    model.eval()
+    total = 0.0
+    with torch.no_grad():
+        for batch_X, batch_lengths, batch_y in loader:
+            total += _batch_loss(model, batch_X, batch_lengths, batch_y, loss_fn, device).item()
+    model.train()
+    return total / len(loader)
+
+
+class TrainingCancelled(Exception):
+    """Raised by train_model when its should_stop callback asks to abort."""
+
+
+class WarmStartUnavailable(RuntimeError):
+    """Raised by train_model when warm_start finds no compatible saved weights."""
 
 
 def train_model(
-    all_logs: list[list[dict]],
+    all_logs: Union[list[np.ndarray], TrainingSnapshot],
     epochs: int = 50,
     batch_size: int = 32,
     lr: float = 0.001,
     device: str = "cpu",
-) -> StudentGrowthLSTM:
+    on_epoch: Optional[Callable[[int, float, Optional[float]], None]] = None,
+    should_stop: Optional[Callable[[], bool]] = None,
+    warm_start: bool = False,
+    new_rows: Optional[Union[list[np.ndarray], np.ndarray]] = None,
+    replay_fraction: float = REPLAY_FRACTION,
+    val_fraction: float = VAL_FRACTION,
+    patience: int = EARLY_STOP_PATIENCE,
+    checkpoint_path: Optional[str] = None,
+    checkpoint_every: int = CHECKPOINT_EVERY,
+    checkpoint_tag: Optional[dict] = None,
+    model_config: Optional[dict] = None,
+    output_dir: str = SAVED_MODEL_DIR,
+) -> Optional[StudentGrowthLSTM]:
     """
     Train the LSTM model on student logs.
 
+    A `val_fraction` share of students is held out. Training stops once the
+    validation loss has not improved for `patience` epochs, and the weights
+    from the best validation epoch are the ones saved.
+
     Args:
-        all_logs: list of student log lists, each list contains dicts per day
-        epochs: training epochs
+        all_logs: one (n_days, 8) prepare_features matrix per student, oldest
+            day first, or a TrainingSnapshot to train from without loading it
+        epochs: maximum training epochs
         batch_size: batch size
         lr: learning rate
         device: 'cpu' or 'cuda'
+        on_epoch: called with (epochs_done, train_loss, val_loss) after every
+            epoch; val_loss is None when no students could be held out
+        should_stop: polled between batches; returning True aborts training
+            with TrainingCancelled before anything is written
+        warm_start: continue from the saved weights and optimizer state
+            instead of a freshly initialised model
+        new_rows: which rows were added since the last run (per-student masks,
+            or one mask over a snapshot's rows); when given, only windows
+            touching them are trained on, plus `replay_fraction` older
+            windows per new one
+        val_fraction: share of students held out for validation (0 disables)
+        patience: epochs without validation improvement before stopping
+        checkpoint_path: where to write a checkpoint every `checkpoint_every`
+            epochs. An existing checkpoint for the same data and epoch count
+            is resumed from; it is removed once the weights are saved.
+        checkpoint_tag: extra JSON-like fields identifying the run, stored in
+            the checkpoint and required to match on resume
+        model_config: hidden_size / num_layers / dropout for get_model
+        output_dir: where the weights, optimizer state and TorchScript
+            artifact are written (the serving directory by default)
+
+    Returns:
+        the trained model, or None when there were no training windows (too
+        few days, or only held-out students' windows were new); nothing is
+        written in that case
+
+    Raises:
+        TrainingCancelled if `should_stop` asked to abort
+        WarmStartUnavailable if `warm_start` found no compatible weights;
+            fine-tuning fresh weights on the new windows alone would replace
+            the model with a worse one, so nothing is trained or written
     """
     logger.info(f"Training model on {len(all_logs)} students, {epochs} epochs")
 
-    all_X, all_y = [], []
-    for student_logs in all_logs:
-        if len(student_logs) <= SEQUENCE_LENGTH:
-            continue
-        features = prepare_features(student_logs)
-        targets = compute_targets(student_logs)
-        X, y = create_sequences(features, targets)
-        all_X.append(X)
-        all_y.append(y)
-
-    if not all_X:
-        logger.warning("Not enough data for training, need > 14 days of logs")
-        return get_model(device=device)
-
-    X_train = np.concatenate(all_X)
-    y_train = np.concatenate(all_y)
-
-    dataset = StudentDataset(X_train, y_train)
-    loader = DataLoader(dataset, batch_size=batch_size, shuffle=True)
-
-    model = get_model(device=device)
+    if isinstance(all_logs, TrainingSnapshot):
+        dataset = StudentDataset.from_snapshot(all_logs, new_rows=new_rows)
+    else:
+        dataset = StudentDataset(all_logs, new_rows=new_rows)
+    train_set, val_set = dataset.split(val_fraction)
+    if new_rows is not None:
+        n_new, n_replay = select_incremental(train_set, replay_fraction, seed=0)
+        select_incremental(val_set, replay_fraction, seed=0)
+        logger.info(f"Incremental training on {n_new} new + {n_replay} replayed windows")
+    if len(train_set) == 0:
+        logger.warning(f"Not enough data for training, need > {MIN_SEQUENCE_LENGTH} days of logs")
+        return None
+    logger.info(f"{len(train_set)} training / {len(val_set)} validation windows")
+
+    loader = train_set.loader(batch_size, shuffle=True)
+    val_loader = val_set.loader(batch_size, shuffle=False) if len(val_set) else None
+
+    model = get_model(device=device, **(model_config or {}))
     optimizer = torch.optim.AdamW(model.parameters(), lr=lr, weight_decay=1e-4)
+    if warm_start and not _load_warm_start(model, optimizer, lr, device, output_dir):
+        raise WarmStartUnavailable(f"No compatible saved weights in {output_dir} to continue from")
     scheduler = torch.optim.lr_scheduler.ReduceLROnPlateau(optimizer, patience=5, factor=0.5)
     loss_fn = nn.MSELoss()
 
+    run = {
+        **(checkpoint_tag or {}),
+        "model_config": model_config or {},
+        "epochs": epochs,
+        "train_windows": len(train_set),
+        "val_windows": len(val_set),
+    }
+    start_epoch, best_loss, best_epoch, best_state, best_optimizer = 0, float("inf"), 0, None, None
+    checkpoint = load_checkpoint(checkpoint_path) if checkpoint_path else None
+    if checkpoint is not None and checkpoint["run"] == run:
+        model.load_state_dict(checkpoint["model"])
+        optimizer.load_state_dict(checkpoint["optimizer"])
+        scheduler.load_state_dict(checkpoint["scheduler"])
+        torch.set_rng_state(checkpoint["rng_state"])
+        start_epoch, best_loss, best_epoch = checkpoint["epoch"], checkpoint["best_loss"], checkpoint["best_epoch"]
+        best_state = checkpoint["best_state"]
+        best_optimizer = checkpoint.get("best_optimizer")
+        logger.info(f"Resuming training from checkpoint after epoch {start_epoch}/{epochs}")
+    elif checkpoint is not None:
+        logger.warning("Ignoring a checkpoint from a different training run")
+
     model.train()
-    for epoch in range(epochs):
+    for epoch in range(start_epoch, epochs):
         total_loss = 0
-        for batch_X, batch_y in loader:
-            batch_X, batch_y = batch_X.to(device), batch_y.to(device)
-
-            outputs = model(batch_X)
-            predictions = torch.stack([
-                outputs["predicted_score"],
-                outputs["burnout_risk"],
-                outputs["improvement_velocity"],
-                outputs["confidence_lower"],
-                outputs["confidence_upper"],
-            ], dim=1)
-
-            loss = loss_fn(predictions, batch_y)
+        for batch_X, batch_lengths, batch_y in loader:
+            if should_stop is not None and should_stop():
+                raise TrainingCancelled(f"Training cancelled during epoch {epoch + 1}/{epochs}")
+            loss = _batch_loss(model, batch_X, batch_lengths, batch_y, loss_fn, device)
             optimizer.zero_grad()
             loss.backward()
             torch.nn.utils.clip_grad_norm_(model.parameters(), max_norm=1.0)
@@ -163,14 +529,80 @@ def train_model(
             total_loss += loss.item()
 
         avg_loss = total_loss / len(loader)
-        scheduler.step(avg_loss)
-
+        val_loss = evaluate(model, val_loader, loss_fn, device) if val_loader else None
+        monitored = avg_loss if val_loss is None else val_loss
+        scheduler.step(monitored)
+
+        if monitored < best_loss - MIN_IMPROVEMENT:
+            best_loss, best_epoch = monitored, epoch + 1
+            best_state = {k: v.detach().clone() for k, v in model.state_dict().items()}
+            # The AdamW moments that go with those weights, for the next warm start
+            best_optimizer = copy.deepcopy(optimizer.state_dict())
+        stop = val_loss is not None and epoch + 1 - best_epoch >= patience
+
+        if checkpoint_path and ((epoch + 1) % checkpoint_every == 0 or stop):
+            _save_checkpoint(checkpoint_path, {
+                "run": run,
+                "epoch": epoch + 1,
+                "model": model.state_dict(),
+                "optimizer": optimizer.state_dict(),
+                "scheduler": scheduler.state_dict(),
+                "rng_state": torch.get_rng_state(),
+                "best_loss": best_loss,
+                "best_epoch": best_epoch,
+                "best_state": best_state,
+                "best_optimizer": best_optimizer,
+            })
+        if on_epoch is not None:
+            on_epoch(epoch + 1, avg_loss, val_loss)
         if (epoch + 1) % 10 == 0:
-            logger.info(f"Epoch {epoch+1}/{epochs} | Loss: {avg_loss:.4f}")
-
-    # Save model
-    os.makedirs(SAVED_MODEL_DIR, exist_ok=True)
-    torch.save(model.state_dict(), os.path.join(SAVED_MODEL_DIR, "growth_model.pt"))
-    logger.info("✅ Model saved to saved_models/growth_model.pt")
+            val_info = "" if val_loss is None else f" | Val: {val_loss:.4f}"
+            logger.info(f"Epoch {epoch+1}/{epochs} | Loss: {avg_loss:.4f}{val_info}")
+        if stop:
+            logger.info(f"Early stopping after epoch {epoch + 1}, best epoch {best_epoch}")
+            break
+
+    optimizer_state = optimizer.state_dict()
+    if val_loader is not None and best_state is not None:
+        model.load_state_dict(best_state)
+        # None when resumed from a checkpoint that predates best_optimizer
+        optimizer_state = best_optimizer
+    # Serving only sends the model histories at least this long
+    model.min_history.fill_(dataset.min_len)
+
+    # Save model; the rename is atomic so serving never reads a partial file
+    os.makedirs(output_dir, exist_ok=True)
+    model_path = os.path.join(output_dir, "growth_model.pt")
+    torch.save(model.state_dict(), model_path + ".tmp")
+    os.replace(model_path + ".tmp", model_path)
+    logger.info(f"✅ Model saved to {model_path}")
+
+    # Optimizer state for the next warm start, tagged with the weights it belongs to
+    from models.registry import file_version
+
+    optim_path = os.path.join(output_dir, OPTIMIZER_FILENAME)
+    if optimizer_state is not None:
+        torch.save(
+            {"model_version": file_version(model_path), "optimizer": optimizer_state},
+            optim_path + ".tmp",
+        )
+        os.replace(optim_path + ".tmp", optim_path)
+    elif os.path.exists(optim_path):
+        # No state matches the restored weights; warm starts use a fresh AdamW
+        os.remove(optim_path)
+    if checkpoint_path and os.path.exists(checkpoint_path):
+        os.remove(checkpoint_path)
+
+    # Frozen TorchScript artifact for serving (MODEL_FORMAT=torchscript)
+    model.eval()
+    try:
+        from models.export import export_torchscript
+        from models.registry import SCRIPTED_FILENAME
+
+        export_torchscript(
+            model, os.path.join(output_dir, SCRIPTED_FILENAME), version=file_version(model_path)
+        )
+    except Exception as e:
+        logger.warning(f"TorchScript export failed, serving will use the eager model: {e}")
 
     return model
@@ -0,0 +1,208 @@
+"""
+NeuroGrowth AI - Training Throughput Benchmark
+Samples/sec, time per epoch and peak RSS of the training loop on a synthetic cohort
+
+Usage (from backend/):
+    python -m models.train_benchmark                              # default grid, JSON to stdout
+    python -m models.train_benchmark --students 5000 --days 90 \\
+        --batch-sizes 32,128,512 --threads 1,4 --seq-lens 14,28 --output bench.json
+    python -m models.train_benchmark --baseline bench.json        # adds ratios vs a previous run
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import platform
+import resource
+import tempfile
+import subprocess
+import multiprocessing as mp
+from datetime import datetime
+from typing import Optional
+
+import numpy as np
+import torch
+import torch.nn as nn
+
+from models.dl_model import get_model
+from models.train import SEQUENCE_LENGTH, StudentDataset, _batch_loss, prepare_features
+
+COHORT_STYLES = ["fast_improver", "consistent", "crammer", "burnout_prone"]
+DEFAULT_BATCH_SIZES = (32, 128, 512)
+DEFAULT_THREADS = (1, 2, 4)
+DEFAULT_SEQ_LENS = (SEQUENCE_LENGTH, 28)
+
+
+def synthetic_histories(n_students: int, days: int, seed: int = 1234) -> list[np.ndarray]:
+    """One (days, 8) prepare_features matrix per student from the seed generator."""
+    from utils.seed import generate_student_logs
+
+    random.seed(seed)
+    histories = []
+    for i in range(n_students):
+        logs = generate_student_logs(COHORT_STYLES[i % len(COHORT_STYLES)], days=days)
+        for log in logs:
+            log["skill_practiced"] = log["skill_practiced"].value
+        histories.append(prepare_features(logs))
+    return histories
+
+
+def _peak_rss_mb() -> float:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return peak / 2**20 if sys.platform == "darwin" else peak / 2**10
+
+
+def _run_config(cohort_path: str, config: dict, epochs: int, results):
+    """
+    One benchmark point, run in a fresh process so thread settings and peak
+    RSS are not shared with other points.
+    """
+    torch.set_num_threads(config["threads"])
+    torch.manual_seed(0)
+    cohort = np.load(os.path.join(cohort_path, "features.npy"), mmap_mode="r")
+    lengths = np.load(os.path.join(cohort_path, "lengths.npy"))
+    histories = np.split(np.asarray(cohort), np.cumsum(lengths)[:-1])
+
+    baseline_rss = _peak_rss_mb()
+    dataset = StudentDataset(histories, seq_len=config["seq_len"])
+    loader = dataset.loader(config["batch_size"], shuffle=True)
+    model = get_model()
+    optimizer = torch.optim.AdamW(model.parameters(), lr=0.001, weight_decay=1e-4)
+    loss_fn = nn.MSELoss()
+    model.train()
+
+    # One untimed warmup epoch (allocator, oneDNN kernels), then `epochs` timed ones
+    epoch_times, forward_s, backward_s, batches = [], 0.0, 0.0, 0
+    for epoch in range(epochs + 1):
+        start = time.perf_counter()
+        for batch_X, batch_lengths, batch_y in loader:
+            t0 = time.perf_counter()
+            loss = _batch_loss(model, batch_X, batch_lengths, batch_y, loss_fn, "cpu")
+            t1 = time.perf_counter()
+            optimizer.zero_grad()
+            loss.backward()
+            torch.nn.utils.clip_grad_norm_(model.parameters(), max_norm=1.0)
+            optimizer.step()
+            t2 = time.perf_counter()
+            if epoch > 0:
+                forward_s += t1 - t0
+                backward_s += t2 - t1
+                batches += 1
+        if epoch > 0:
+            epoch_times.append(time.perf_counter() - start)
+
+    epoch_s = float(np.median(epoch_times))
+    results.put({
+        **config,
+        "windows": len(dataset),
+        "epoch_s": round(epoch_s, 4),
+        "samples_per_s": round(len(dataset) / epoch_s, 1),
+        "forward_ms_per_batch": round(forward_s / batches * 1000, 3),
+        "backward_ms_per_batch": round(backward_s / batches * 1000, 3),
+        "baseline_rss_mb": round(baseline_rss, 1),
+        "peak_rss_mb": round(_peak_rss_mb(), 1),
+    })
+
+
+def run_benchmark(
+    histories: list[np.ndarray],
+    batch_sizes=DEFAULT_BATCH_SIZES,
+    threads=DEFAULT_THREADS,
+    seq_lens=DEFAULT_SEQ_LENS,
+    epochs: int = 2,
+) -> list[dict]:
+    """Measure every (seq_len, threads, batch_size) combination, one process each."""
+    ctx = mp.get_context("spawn")
+    rows = []
+    with tempfile.TemporaryDirectory() as cohort_path:
+        np.save(os.path.join(cohort_path, "features.npy"), np.concatenate(histories))
+        np.save(os.path.join(cohort_path, "lengths.npy"), np.array([len(h) for h in histories]))
+        for seq_len in seq_lens:
+            for n_threads in threads:
+                for batch_size in batch_sizes:
+                    config = {"seq_len": seq_len, "threads": n_threads, "batch_size": batch_size}
+                    results = ctx.Queue()
+                    process = ctx.Process(target=_run_config, args=(cohort_path, config, epochs, results))
+                    process.start()
+                    process.join()
+                    if process.exitcode != 0:
+                        rows.append({**config, "error": f"exit code {process.exitcode}"})
+                    else:
+                        rows.append(results.get())
+                    print(json.dumps(rows[-1]), file=sys.stderr)
+    return rows
+
+
+def environment() -> dict:
+    """Where the numbers came from, so runs can be compared across releases."""
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "timestamp": datetime.utcnow().isoformat(),
+        "git_commit": commit,
+        "torch": torch.__version__,
+        "numpy": np.__version__,
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "processor": platform.processor(),
+        "cpu_count": os.cpu_count(),
+    }
+
+
+def compare(rows: list[dict], baseline: dict) -> None:
+    """Add samples/sec and peak RSS ratios against a previous report, per matching config."""
+    key = lambda r: (r["seq_len"], r["threads"], r["batch_size"])
+    previous = {key(r): r for r in baseline["results"] if "error" not in r}
+    for row in rows:
+        ref = previous.get(key(row))
+        if ref is None or "error" in row:
+            continue
+        row["speedup_vs_baseline"] = round(row["samples_per_s"] / ref["samples_per_s"], 3)
+        row["rss_vs_baseline"] = round(row["peak_rss_mb"] / ref["peak_rss_mb"], 3)
+
+
+def _int_list(value: str) -> list[int]:
+    return [int(v) for v in value.split(",") if v]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawTextHelpFormatter)
+    parser.add_argument("--students", type=int, default=2000)
+    parser.add_argument("--days", type=int, default=60)
+    parser.add_argument("--epochs", type=int, default=2, help="timed epochs per point")
+    parser.add_argument("--batch-sizes", type=_int_list, default=list(DEFAULT_BATCH_SIZES))
+    parser.add_argument("--threads", type=_int_list, default=list(DEFAULT_THREADS))
+    parser.add_argument("--seq-lens", type=_int_list, default=list(DEFAULT_SEQ_LENS))
+    parser.add_argument("--seed", type=int, default=1234)
+    parser.add_argument("--output", help="also write the report to this file")
+    parser.add_argument("--baseline", help="previous report to compare against")
+    args = parser.parse_args()
+
+    histories = synthetic_histories(args.students, args.days, args.seed)
+    rows = run_benchmark(histories, args.batch_sizes, args.threads, args.seq_lens, args.epochs)
+    report: dict = {
+        "environment": environment(),
+        "cohort": {"students": args.students, "days": args.days, "seed": args.seed},
+        "epochs": args.epochs,
+        "results": rows,
+    }
+    baseline: Optional[dict] = None
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        compare(rows, baseline)
+        report["baseline"] = {"file": args.baseline, **baseline["environment"]}
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    json.dump(report, sys.stdout, indent=2)
+    print()
@@ -0,0 +1,313 @@
+"""
+NeuroGrowth AI - Inference Worker Process Pool
+Runs forward passes in dedicated processes, each with a warm model and pinned threads
+"""
+
+import os
+import queue
+import threading
+import multiprocessing as mp
+from multiprocessing import shared_memory
+from typing import Optional
+
+import numpy as np
+from loguru import logger
+
+from models.dl_model import OUTPUT_KEYS
+from models.train import SEQUENCE_LENGTH
+
+INFERENCE_WORKERS = int(os.getenv("INFERENCE_WORKERS", "0"))
+INFERENCE_WORKER_THREADS = int(os.getenv("INFERENCE_WORKER_THREADS", "1"))
+WORKER_SLAB_ROWS = int(os.getenv("INFERENCE_WORKER_SLAB_ROWS", "1024"))
+# Longest a worker may take over one slab before it is treated as hung
+WORKER_TIMEOUT_S = float(os.getenv("INFERENCE_WORKER_TIMEOUT_S", "30"))
+N_FEATURES = 8
+# Output slab columns: model outputs for "run", one weight per feature for "attribute"
+OUTPUT_COLUMNS = max(len(OUTPUT_KEYS), N_FEATURES)
+
+
+def _worker_main(conn, in_name: str, len_name: str, out_name: str, capacity: int, threads: int):
+    """
+    Worker loop: attach to this worker's slabs, keep a warm model, serve
+    'run' (forward pass) and 'attribute' (gradient attribution) calls.
+    """
+    import torch
+    from models.attribution import gradient_attributions
+    from models.registry import get_registry
+
+    torch.set_num_threads(threads)
+    torch.set_num_interop_threads(1)
+
+    shm_in = shared_memory.SharedMemory(name=in_name)
+    shm_len = shared_memory.SharedMemory(name=len_name)
+    shm_out = shared_memory.SharedMemory(name=out_name)
+    inputs = np.ndarray((capacity, SEQUENCE_LENGTH, N_FEATURES), dtype=np.float32, buffer=shm_in.buf)
+    lengths = np.ndarray((capacity,), dtype=np.int64, buffer=shm_len.buf)
+    outputs = np.ndarray((capacity, OUTPUT_COLUMNS), dtype=np.float32, buffer=shm_out.buf)
+
+    registry = get_registry()
+    registry.get()  # warm up before taking traffic
+    conn.send(("ready", registry.version))
+
+    try:
+        while True:
+            msg = conn.recv()
+            if msg[0] == "stop":
+                break
+            op, n = msg
+            try:
+                x, x_lengths = torch.from_numpy(inputs[:n]), torch.from_numpy(lengths[:n])
+                if op == "attribute":
+                    # Gradients need the eager model, not a frozen or int8 copy
+                    outputs[:n, :N_FEATURES] = gradient_attributions(registry.get(), x, x_lengths)
+                else:
+                    model = registry.get_serving()
+                    with torch.no_grad():
+                        out = model(x, x_lengths)
+                    for j, k in enumerate(OUTPUT_KEYS):
+                        outputs[:n, j] = out[k].numpy()
+                conn.send(("ok", registry.version))
+            except Exception as e:
+                conn.send(("error", repr(e)))
+    except (EOFError, KeyboardInterrupt):
+        pass
+    finally:
+        del inputs, lengths, outputs
+        shm_in.close()
+        shm_len.close()
+        shm_out.close()
+
+
+class _Worker:
+    """Parent-side handle: process, pipe and the shared-memory slabs."""
+
+    def __init__(self, ctx, index: int, capacity: int, threads: int):
+        self.index = index
+        self.capacity = capacity
+        self.shm_in = shared_memory.SharedMemory(
+            create=True, size=capacity * SEQUENCE_LENGTH * N_FEATURES * 4
+        )
+        self.shm_len = shared_memory.SharedMemory(create=True, size=capacity * 8)
+        self.shm_out = shared_memory.SharedMemory(create=True, size=capacity * OUTPUT_COLUMNS * 4)
+        self.inputs = np.ndarray(
+            (capacity, SEQUENCE_LENGTH, N_FEATURES), dtype=np.float32, buffer=self.shm_in.buf
+        )
+        self.lengths = np.ndarray((capacity,), dtype=np.int64, buffer=self.shm_len.buf)
+        self.outputs = np.ndarray((capacity, OUTPUT_COLUMNS), dtype=np.float32, buffer=self.shm_out.buf)
+        self.conn, child_conn = ctx.Pipe()
+        self.process = ctx.Process(
+            target=_worker_main,
+            args=(
+                child_conn, self.shm_in.name, self.shm_len.name, self.shm_out.name, capacity, threads,
+            ),
+            name=f"inference-worker-{index}",
+            daemon=True,
+        )
+        self.process.start()
+        status, self.version = self.conn.recv()
+
+    def call(
+        self, op: str, windows: np.ndarray, lengths: np.ndarray, timeout: float
+    ) -> tuple[np.ndarray, str]:
+        n = len(windows)
+        self.inputs[:n] = windows
+        self.lengths[:n] = lengths
+        self.conn.send((op, n))
+        if not self.conn.poll(timeout):
+            raise TimeoutError(f"Inference worker {self.index} did not answer within {timeout}s")
+        status, payload = self.conn.recv()
+        if status != "ok":
+            raise RuntimeError(f"Inference worker {self.index} failed: {payload}")
+        width = N_FEATURES if op == "attribute" else len(OUTPUT_KEYS)
+        return self.outputs[:n, :width].copy(), payload
+
+    def kill(self):
+        self.process.kill()
+        self.process.join(timeout=5)
+
+    def close(self):
+        try:
+            self.conn.send(("stop",))
+        except (BrokenPipeError, OSError):
+            pass
+        self.process.join(timeout=5)
+        if self.process.is_alive():
+            self.process.terminate()
+        del self.inputs, self.lengths, self.outputs
+        for shm in (self.shm_in, self.shm_len, self.shm_out):
+            shm.close()
+            shm.unlink()
+
+
+class InferencePool:
+    """
+    Fixed pool of inference processes fed through shared memory.
+
+    Each worker owns preallocated input slabs (rows x SEQUENCE_LENGTH x 8,
+    plus each row's real day count) and an output slab (rows x 5). A caller
+    borrows an idle worker, copies its windows into the slabs, sends only
+    the row count over a pipe and reads the results back from the output
+    slab, so feature arrays are never pickled.
+
+    Workers also compute gradient attributions (`attribute`), so neither
+    forward nor backward passes run on the API process's threads.
+
+    A worker that has not answered within `timeout_s` is killed and
+    respawned, and that call's windows are handled in-process instead.
+    """
+
+    def __init__(
+        self,
+        n_workers: int = INFERENCE_WORKERS,
+        threads_per_worker: int = INFERENCE_WORKER_THREADS,
+        slab_rows: int = WORKER_SLAB_ROWS,
+        timeout_s: float = WORKER_TIMEOUT_S,
+    ):
+        self.n_workers = n_workers
+        self.threads_per_worker = max(1, threads_per_worker)
+        self.slab_rows = max(1, slab_rows)
+        self.timeout_s = timeout_s
+        self.timeouts = 0
+        self._workers: list[_Worker] = []
+        self._idle: "queue.Queue[_Worker]" = queue.Queue()
+        self._lock = threading.Lock()
+        self._ctx = mp.get_context("spawn")
+
+    @property
+    def enabled(self) -> bool:
+        return self.n_workers > 0
+
+    def start(self):
+        with self._lock:
+            if self._workers or not self.enabled:
+                return
+            for i in range(self.n_workers):
+                worker = _Worker(self._ctx, i, self.slab_rows, self.threads_per_worker)
+                self._workers.append(worker)
+                self._idle.put(worker)
+            logger.info(
+                f"✅ Started {self.n_workers} inference workers "
+                f"({self.threads_per_worker} torch threads each)"
+            )
+
+    def shutdown(self):
+        with self._lock:
+            for worker in self._workers:
+                worker.close()
+            self._workers = []
+            self._idle = queue.Queue()
+
+    def run(self, windows: np.ndarray, lengths: Optional[np.ndarray] = None) -> tuple[dict, str]:
+        """
+        Forward pass for (n, SEQUENCE_LENGTH, 8) right-aligned windows on a
+        pool worker; `lengths` gives each window's real days (default: full).
+
+        Returns:
+            ({output_key: (n,) array}, model_version)
+        """
+        stacked, version = self._dispatch("run", windows, lengths)
+        return {k: stacked[:, j] for j, k in enumerate(OUTPUT_KEYS)}, version
+
+    def attribute(
+        self, windows: np.ndarray, lengths: Optional[np.ndarray] = None
+    ) -> tuple[np.ndarray, str]:
+        """
+        `gradient_attributions` for right-aligned windows on a pool worker.
+
+        Returns:
+            ((n, 8) array of normalized importances, model_version)
+        """
+        return self._dispatch("attribute", windows, lengths)
+
+    def stats(self) -> dict:
+        return {
+            "enabled": self.enabled,
+            "workers": len(self._workers),
+            "idle": self._idle.qsize(),
+            "threads_per_worker": self.threads_per_worker,
+            "slab_rows": self.slab_rows,
+            "timeout_s": self.timeout_s,
+            "timeouts": self.timeouts,
+        }
+
+    def _dispatch(
+        self, op: str, windows: np.ndarray, lengths: Optional[np.ndarray]
+    ) -> tuple[np.ndarray, str]:
+        """Run `op` over every slab-sized chunk on one borrowed worker."""
+        if not self._workers:
+            self.start()
+
+        windows = np.ascontiguousarray(windows, dtype=np.float32)
+        if lengths is None:
+            lengths = np.full(len(windows), SEQUENCE_LENGTH)
+        lengths = np.asarray(lengths, dtype=np.int64)
+        width = N_FEATURES if op == "attribute" else len(OUTPUT_KEYS)
+        chunks, version = [], None
+        worker = self._idle.get()
+        try:
+            for start in range(0, len(windows), self.slab_rows):
+                out, version = self._run_on(
+                    worker,
+                    op,
+                    windows[start : start + self.slab_rows],
+                    lengths[start : start + self.slab_rows],
+                )
+                chunks.append(out)
+        except TimeoutError as e:
+            logger.warning(f"{e}; respawning it and handling these windows in-process")
+            worker.kill()
+            with self._lock:
+                self.timeouts += 1
+            return self._run_in_process(op, windows, lengths)
+        finally:
+            self._idle.put(self._replace_if_dead(worker))
+
+        stacked = np.concatenate(chunks) if chunks else np.zeros((0, width), np.float32)
+        return stacked, version
+
+    def _run_on(
+        self, worker: _Worker, op: str, windows: np.ndarray, lengths: np.ndarray
+    ) -> tuple[np.ndarray, str]:
+        try:
+            return worker.call(op, windows, lengths, self.timeout_s)
+        except (EOFError, BrokenPipeError, ConnectionResetError) as e:
+            raise RuntimeError(f"Inference worker {worker.index} died: {e}")
+
+    @staticmethod
+    def _run_in_process(op: str, windows: np.ndarray, lengths: np.ndarray) -> tuple[np.ndarray, str]:
+        import torch
+        from models.attribution import gradient_attributions
+        from models.registry import get_registry
+
+        registry = get_registry()
+        x, x_lengths = torch.from_numpy(windows), torch.from_numpy(lengths)
+        if op == "attribute":
+            return gradient_attributions(registry.get(), x, x_lengths), registry.version
+        model = registry.get_serving()
+        with torch.no_grad():
+            out = model(x, x_lengths)
+        return np.stack([out[k].numpy() for k in OUTPUT_KEYS], axis=1), registry.version
+
+    def _replace_if_dead(self, worker: _Worker) -> _Worker:
+        if worker.process.is_alive():
+            return worker
+        logger.warning(f"Inference worker {worker.index} exited, respawning")
+        with self._lock:
+            worker.close()
+            fresh = _Worker(self._ctx, worker.index, self.slab_rows, self.threads_per_worker)
+            self._workers[self._workers.index(worker)] = fresh
+        return fresh
+
+
+# Singleton instance
+_pool: Optional[InferencePool] = None
+_pool_lock = threading.Lock()
+
+
+def get_pool() -> InferencePool:
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = InferencePool()
+    return _pool
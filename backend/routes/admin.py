@@ -2,13 +2,25 @@
 NeuroGrowth AI - Admin Routes
 """
 
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.orm import Session
 from sqlalchemy import func
-from typing import List
+from typing import List, Optional
 
 from database import get_db, Student, DailyLog, Prediction
-from services.clustering import cluster_students
+from services.clustering_cache import get_clustering_cache
+from services.cluster_scatter import CLUSTERING_PAGE_POINTS, CLUSTERING_MAX_PAGE_POINTS
+from services.clustering import CLUSTERING_MODE
+from services.batch_prediction import score_cohort
+from services.feature_store import get_feature_store
+from services.retrain_jobs import get_job_runner, RetrainInProgress
+from models.registry import get_registry
+from models.snapshot import list_snapshots, open_snapshot
+from models.batching import get_batcher
+from models.attribution import get_attribution_cache
+from services.prediction_cache import get_prediction_cache
+from models.incremental import get_state_store
+from models.worker_pool import get_pool
 from utils.auth import require_admin, TokenData
 
 router = APIRouter(prefix="/admin", tags=["Admin"])
@@ -45,34 +57,57 @@ def get_all_students(db: Session = Depends(get_db)):
 
 
 @router.get("/clustering")
-def get_clustering(db: Session = Depends(get_db)):
-    """Get student clustering visualization data."""
-    students = db.query(Student).all()
-    all_logs = {}
-    for s in students:
-        logs = db.query(DailyLog).filter(DailyLog.student_id == s.id).order_by(DailyLog.date.asc()).all()
-        if logs:
-            all_logs[s.id] = [
-                {
-                    "study_hours": l.study_hours,
-                    "problems_solved": l.problems_solved,
-                    "mock_score": l.mock_score or 50,
-                    "confidence": l.confidence,
-                    "mood": l.mood,
-                    "revision_done": l.revision_done,
-                    "skill_practiced": l.skill_practiced.value if l.skill_practiced else "Other",
-                }
-                for l in logs
-            ]
-
-    result = cluster_students(all_logs)
-
-    # Add student names to PCA data
-    student_map = {s.id: s.name for s in students}
-    for point in result.get("pca_data", []):
-        point["name"] = student_map.get(point["student_id"], "Unknown")
-
-    return result
+def get_clustering(
+    mode: Optional[str] = Query(default=None, pattern="^(auto|full|minibatch)$"),
+    refit: bool = False,
+    view: str = Query(default="points", pattern="^(points|bins)$"),
+    x_min: Optional[float] = None,
+    x_max: Optional[float] = None,
+    y_min: Optional[float] = None,
+    y_max: Optional[float] = None,
+    offset: int = Query(default=0, ge=0),
+    limit: int = Query(default=CLUSTERING_PAGE_POINTS, ge=1, le=CLUSTERING_MAX_PAGE_POINTS),
+    bins: int = Query(default=64, ge=4, le=512),
+    db: Session = Depends(get_db),
+):
+    """
+    Get student clustering visualization data.
+
+    Profiles are aggregated in SQL. `mode=full` refits KMeans on all of
+    them; `mode=minibatch` streams them and folds new students into the
+    stored mini-batch model; `auto` picks minibatch for large cohorts.
+
+    Results are cached per mode and stamped with the log table's watermark.
+    Once logs change, the last result keeps being served (`cache.stale`)
+    while a refit runs in the background. `refit=true` recomputes now and,
+    for minibatch, starts the stored model over.
+
+    The scatter is limited to the `x_min..y_max` viewport (open where
+    omitted). `view=points` returns `limit` points from `offset`, in a
+    fixed random order, so the first page is a density-preserving sample
+    and later pages fill it in; `view=bins` returns per-cluster counts on a
+    `bins` x `bins` grid instead. Style metadata comes once, in
+    `cluster_info`; points carry the style id.
+    """
+    result, scatter, cache = get_clustering_cache().get(db, mode or CLUSTERING_MODE, refit)
+    viewport = (x_min, x_max, y_min, y_max)
+
+    if view == "bins":
+        return {**result, "pca_bins": scatter.bins(viewport, bins), "cache": cache}
+
+    page = scatter.page(viewport, offset, limit)
+    # Names for this page only
+    ids = [point["student_id"] for point in page["points"]]
+    names = dict(db.query(Student.id, Student.name).filter(Student.id.in_(ids)).all()) if ids else {}
+    for point in page["points"]:
+        point["name"] = names.get(point["student_id"], "Unknown")
+    points = page.pop("points")
+    return {
+        **result,
+        "pca_data": points,
+        "pca_page": {**page, "limit": limit, "decimated": len(points) < page["total"]},
+        "cache": cache,
+    }
 
 
 @router.get("/risk-heatmap")
@@ -127,33 +162,90 @@ def get_performance_distribution(db: Session = Depends(get_db)):
     }
 
 
-@router.post("/retrain")
-def retrain_model(db: Session = Depends(get_db)):
-    """Trigger model retraining pipeline."""
-    from models.train import train_model
+@router.post("/predict-all")
+def predict_all_students(
+    attribution: Optional[str] = Query(default=None, pattern="^(off|cached|computed)$"),
+    db: Session = Depends(get_db),
+):
+    """Refresh predictions for every student in one batched pass."""
+    scored = score_cohort(db, attribution=attribution)
+    return {
+        "students_scored": len(scored["student_ids"]),
+        "model_scored": scored["model_scored"],
+        "heuristic_scored": scored["heuristic_scored"],
+        "model_version": scored["model_version"],
+        "elapsed_ms": scored["elapsed_ms"],
+    }
+
+
+@router.post("/retrain", status_code=202)
+def retrain_model(
+    mode: str = Query(default="full", pattern="^(full|incremental)$"),
+    epochs: Optional[int] = Query(default=None, ge=1, le=500),
+    snapshot_id: Optional[str] = Query(default=None),
+    resume: bool = Query(default=True),
+):
+    """
+    Start the model retraining pipeline as a background job.
+
+    mode=full retrains from scratch on every student's history; mode=incremental
+    fine-tunes the current model on logs written since the last run plus a
+    replay sample of older windows. `epochs` defaults per mode. Each job
+    exports a fresh training snapshot unless `snapshot_id` names one to reuse.
+    With `resume`, a job interrupted mid-training (crash, restart) continues
+    from its last checkpoint.
+    """
+    if snapshot_id is not None and open_snapshot(snapshot_id) is None:
+        raise HTTPException(status_code=404, detail="Training snapshot not found")
+    try:
+        return get_job_runner().start(epochs, mode, snapshot_id, resume)
+    except RetrainInProgress as e:
+        raise HTTPException(
+            status_code=409,
+            detail={"message": "A retraining job is already running", "job_id": e.job_id},
+        )
 
-    students = db.query(Student).all()
-    all_logs = []
-    for s in students:
-        logs = db.query(DailyLog).filter(DailyLog.student_id == s.id).order_by(DailyLog.date.asc()).all()
-        if logs:
-            log_dicts = [
-                {
-                    "study_hours": l.study_hours,
-                    "topics_completed": l.topics_completed,
-                    "problems_solved": l.problems_solved,
-                    "mock_score": l.mock_score or 50,
-                    "confidence": l.confidence,
-                    "mood": l.mood,
-                    "revision_done": l.revision_done,
-                    "skill_practiced": l.skill_practiced.value if l.skill_practiced else "Other",
-                }
-                for l in logs
-            ]
-            all_logs.append(log_dicts)
-
-    if not all_logs:
-        raise HTTPException(status_code=400, detail="No training data available")
-
-    model = train_model(all_logs, epochs=30)
-    return {"message": "Model retrained successfully", "students_used": len(all_logs)}
+
+@router.get("/training-snapshots")
+def get_training_snapshots():
+    """List the on-disk training snapshots, newest first."""
+    return list_snapshots()
+
+
+@router.get("/retrain/{job_id}")
+def get_retrain_job(job_id: str):
+    """Get a retraining job's status, epoch, loss and ETA."""
+    job = get_job_runner().get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Retraining job not found")
+    return job
+
+
+@router.post("/retrain/{job_id}/cancel")
+def cancel_retrain_job(job_id: str):
+    """Cancel a running retraining job; the served model is left untouched."""
+    job = get_job_runner().cancel(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Retraining job not found")
+    return job
+
+
+@router.get("/model-info")
+def get_model_info():
+    """Get metadata about the model weights currently being served."""
+    registry = get_registry()
+    registry.get()
+    return registry.info()
+
+
+@router.get("/inference-stats")
+def get_inference_stats():
+    """Get micro-batching queue depth, batch-size histogram and cache stats."""
+    stats = get_batcher().stats()
+    stats["attribution_cache"] = get_attribution_cache().stats()
+    stats["prediction_cache"] = get_prediction_cache().stats()
+    stats["incremental_state"] = get_state_store().stats()
+    stats["worker_pool"] = get_pool().stats()
+    stats["feature_store"] = get_feature_store().stats()
+    stats["clustering_cache"] = get_clustering_cache().stats()
+    return stats
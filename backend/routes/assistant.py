@@ -43,16 +43,7 @@ def chat(req: ChatRequest, db: Session = Depends(get_db)):
         .first()
     )
 
-    logs = db.query(DailyLog).filter(DailyLog.student_id == req.student_id).all()
-    log_dicts = [
-        {"study_hours": l.study_hours, "mock_score": l.mock_score or 50,
-         "confidence": l.confidence, "mood": l.mood,
-         "problems_solved": l.problems_solved, "revision_done": l.revision_done,
-         "skill_practiced": l.skill_practiced.value if l.skill_practiced else "Other"}
-        for l in logs
-    ]
-
-    cluster_info = get_student_cluster(log_dicts, {})
+    cluster_info = get_student_cluster(db, req.student_id)
 
     context = {
         "predicted_score": latest_pred.predicted_score if latest_pred else 50.0,
@@ -127,14 +118,7 @@ def dashboard(student_id: int, db: Session = Depends(get_db)):
     )
 
     # Get learning style
-    log_dicts = [
-        {"study_hours": l.study_hours, "mock_score": l.mock_score or 50,
-         "confidence": l.confidence, "mood": l.mood,
-         "problems_solved": l.problems_solved, "revision_done": l.revision_done,
-         "skill_practiced": l.skill_practiced.value if l.skill_practiced else "Other"}
-        for l in logs
-    ]
-    cluster_info = get_student_cluster(log_dicts, {})
+    cluster_info = get_student_cluster(db, student_id)
 
     # Calculate streak (consecutive days with logs)
     from datetime import date as dt_date, timedelta
@@ -10,6 +10,9 @@ from datetime import date
 
 from database import get_db, DailyLog, Student, SkillType
 from utils.auth import get_current_user, TokenData
+from services.prediction_cache import get_prediction_cache
+from services.feature_store import get_feature_store
+from services.features import encode_log
 
 router = APIRouter(tags=["Daily Logs"])
 
@@ -77,6 +80,11 @@ def log_daily(req: DailyLogRequest, db: Session = Depends(get_db)):
     db.commit()
     db.refresh(log)
 
+    # Keep the in-memory window current; the cached prediction is stale if
+    # this day is inside its window
+    get_feature_store().append(req.student_id, log.date, encode_log(log), log.id)
+    get_prediction_cache().invalidate(req.student_id, log.date)
+
     return DailyLogResponse(
         id=log.id, student_id=log.student_id, date=log.date,
         study_hours=log.study_hours, topics_completed=log.topics_completed,
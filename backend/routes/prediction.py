@@ -2,17 +2,30 @@
 NeuroGrowth AI - Prediction Routes
 """
 
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Query
 from sqlalchemy.orm import Session
-from pydantic import BaseModel
-from typing import Optional, Dict
-from datetime import datetime
-
-from database import get_db, DailyLog, Prediction, Student
-from models.inference import predict_performance, simulate_performance
+from pydantic import BaseModel, Field
+from typing import Optional, Dict, List
+from datetime import date, datetime
+import math
+import numpy as np
+
+from database import get_db, Prediction, Student
+from models.inference import (
+    predict_performance, simulate_performance, simulate_grid, window_key, MAX_GRID_SCENARIOS,
+)
+from models.attribution import DEFAULT_ATTRIBUTION_MODE
+from models.train import SEQUENCE_LENGTH
+from models.incremental import refresh_prefix_state, INCREMENTAL_ENABLED
+from services.prediction_cache import get_prediction_cache
+from services.batch_prediction import score_cohort
+from services.feature_store import get_feature_store
+from services.features import log_stamp
 
 router = APIRouter(tags=["Predictions"])
 
+ATTRIBUTION_PATTERN = "^(off|cached|computed)$"
+
 
 # ─── Schemas ──────────────────────────────────────────────────────────────────
 
@@ -22,45 +35,100 @@ class PredictionResponse(BaseModel):
     improvement_velocity: float
     confidence_lower: float
     confidence_upper: float
-    feature_importance: Dict[str, float]
+    feature_importance: Optional[Dict[str, float]] = None
+    model_version: Optional[str] = None
+
+
+class BatchPredictRequest(BaseModel):
+    student_ids: List[int] = Field(..., min_length=1, max_length=5000)
+    save: bool = True
+    attribution: Optional[str] = Field(default=None, pattern=ATTRIBUTION_PATTERN)
+
+
+class BatchPredictionItem(BaseModel):
+    student_id: int
+    predicted_score: float
+    burnout_risk: float
+    improvement_velocity: float
+    confidence_lower: float
+    confidence_upper: float
+    feature_importance: Optional[Dict[str, float]] = None
+
+
+class BatchPredictionResponse(BaseModel):
+    predictions: List[BatchPredictionItem]
+    model_version: Optional[str] = None
+    elapsed_ms: float
 
 
 class SimulateRequest(BaseModel):
     student_id: int
     adjustments: Dict[str, float]  # e.g. {"study_hours": 1.0}
+    attribution: Optional[str] = Field(default=None, pattern=ATTRIBUTION_PATTERN)
+
+
+class SweepRange(BaseModel):
+    start: float
+    stop: float
+    step: float = Field(..., gt=0)
+
+
+class SimulateGridRequest(BaseModel):
+    student_id: int
+    # Explicit adjustment vectors, e.g. [{"study_hours": 1.0, "mood": -1}]
+    scenarios: Optional[List[Dict[str, float]]] = None
+    # Per-feature ranges combined as a full grid, e.g. {"study_hours": {"start": -2, "stop": 3, "step": 0.5}}
+    sweeps: Optional[Dict[str, SweepRange]] = None
+
+
+class GridPoint(BaseModel):
+    adjustments: Dict[str, float]
+    predicted_score: float
+    burnout_risk: float
+    improvement_velocity: float
+    confidence_lower: float
+    confidence_upper: float
+
+
+class SimulateGridResponse(BaseModel):
+    features: List[str]
+    grid_shape: Optional[List[int]] = None
+    points: List[GridPoint]
+    model_version: Optional[str] = None
 
 
 # ─── Routes ──────────────────────────────────────────────────────────────────
 
 @router.get("/predict/{student_id}", response_model=PredictionResponse)
-def predict(student_id: int, db: Session = Depends(get_db)):
+def predict(
+    student_id: int,
+    background_tasks: BackgroundTasks,
+    attribution: Optional[str] = Query(default=None, pattern=ATTRIBUTION_PATTERN),
+    db: Session = Depends(get_db),
+):
     """Get performance prediction for a student."""
     student = db.query(Student).filter(Student.id == student_id).first()
     if not student:
         raise HTTPException(status_code=404, detail="Student not found")
 
-    logs = (
-        db.query(DailyLog)
-        .filter(DailyLog.student_id == student_id)
-        .order_by(DailyLog.date.asc())
-        .all()
-    )
+    # Read before the window, so a log written in between misses the cache next time
+    stamp = log_stamp(db, student_id)
+    features, dates = get_feature_store().recent(db, student_id, SEQUENCE_LENGTH, stamp=stamp)
 
-    log_dicts = [
-        {
-            "study_hours": l.study_hours,
-            "topics_completed": l.topics_completed,
-            "problems_solved": l.problems_solved,
-            "mock_score": l.mock_score or 50.0,
-            "confidence": l.confidence,
-            "mood": l.mood,
-            "revision_done": l.revision_done,
-            "skill_practiced": l.skill_practiced.value if l.skill_practiced else "Other",
-        }
-        for l in logs
-    ]
-
-    result = predict_performance(log_dicts)
+    # Unchanged logs + unchanged weights: reuse the last result, no new row
+    mode = attribution or DEFAULT_ATTRIBUTION_MODE
+    cache = get_prediction_cache()
+    digest, model_version = window_key(features)
+    if mode != "computed":
+        cached = cache.get(student_id, stamp, digest, model_version)
+        if cached is not None and (mode == "off" or cached.get("feature_importance") is not None):
+            return PredictionResponse(**cached)
+
+    result = predict_performance(features, attribution=attribution, student_id=student_id)
+
+    # Prepare tomorrow's one-step update once the response has been sent
+    if INCREMENTAL_ENABLED and len(features) >= SEQUENCE_LENGTH:
+        background_tasks.add_task(refresh_prefix_state, student_id, features[-SEQUENCE_LENGTH:])
 
     # Save prediction
     pred = Prediction(
@@ -76,9 +144,30 @@ def predict(student_id: int, db: Session = Depends(get_db)):
     db.add(pred)
     db.commit()
 
+    window_full = len(features) >= SEQUENCE_LENGTH
+    cache.put(
+        student_id, stamp, digest, model_version, result,
+        window_start=date.fromordinal(int(dates[0])) if window_full else None,
+        window_full=window_full,
+    )
+
     return PredictionResponse(**result)
 
 
+@router.post("/predict/batch", response_model=BatchPredictionResponse)
+def predict_many(req: BatchPredictRequest, db: Session = Depends(get_db)):
+    """Get performance predictions for many students in one vectorized pass."""
+    scored = score_cohort(db, req.student_ids, save=req.save, attribution=req.attribution)
+    return BatchPredictionResponse(
+        predictions=[
+            BatchPredictionItem(student_id=sid, **result)
+            for sid, result in zip(scored["student_ids"], scored["results"])
+        ],
+        model_version=scored["model_version"],
+        elapsed_ms=scored["elapsed_ms"],
+    )
+
+
 @router.post("/simulate", response_model=PredictionResponse)
 def simulate(req: SimulateRequest, db: Session = Depends(get_db)):
     """Simulate performance with adjusted parameters."""
@@ -86,26 +175,76 @@ def simulate(req: SimulateRequest, db: Session = Depends(get_db)):
     if not student:
         raise HTTPException(status_code=404, detail="Student not found")
 
-    logs = (
-        db.query(DailyLog)
-        .filter(DailyLog.student_id == req.student_id)
-        .order_by(DailyLog.date.asc())
-        .all()
-    )
+    features, _ = get_feature_store().recent(db, req.student_id, SEQUENCE_LENGTH)
 
-    log_dicts = [
-        {
-            "study_hours": l.study_hours,
-            "topics_completed": l.topics_completed,
-            "problems_solved": l.problems_solved,
-            "mock_score": l.mock_score or 50.0,
-            "confidence": l.confidence,
-            "mood": l.mood,
-            "revision_done": l.revision_done,
-            "skill_practiced": l.skill_practiced.value if l.skill_practiced else "Other",
-        }
-        for l in logs
-    ]
-
-    result = simulate_performance(log_dicts, req.adjustments)
+    result = simulate_performance(features, req.adjustments, attribution=req.attribution)
     return PredictionResponse(**result)
+
+
+@router.post("/simulate/grid", response_model=SimulateGridResponse)
+def simulate_grid_route(req: SimulateGridRequest, db: Session = Depends(get_db)):
+    """Evaluate a whole grid of what-if adjustments in one forward pass."""
+    if req.scenarios is not None and not req.scenarios:
+        raise HTTPException(status_code=400, detail="Provide at least one scenario")
+    if req.sweeps is not None and not req.sweeps:
+        raise HTTPException(status_code=400, detail="Sweeps must cover at least one feature")
+    if bool(req.scenarios) == bool(req.sweeps):
+        raise HTTPException(status_code=400, detail="Provide exactly one of 'scenarios' or 'sweeps'")
+
+    student = db.query(Student).filter(Student.id == req.student_id).first()
+    if not student:
+        raise HTTPException(status_code=404, detail="Student not found")
+
+    grid_shape = None
+    if req.sweeps:
+        features = list(req.sweeps)
+        # Size the grid before allocating anything, so a tiny step is rejected cheaply
+        grid_shape = []
+        for key in features:
+            r = req.sweeps[key]
+            if r.stop < r.start:
+                raise HTTPException(status_code=400, detail=f"Empty sweep range for '{key}'")
+            # Include the stop value, tolerating float drift in the step
+            n_points = (r.stop - r.start) / r.step + 1
+            if not n_points <= MAX_GRID_SCENARIOS:
+                raise HTTPException(
+                    status_code=400, detail=f"Sweep grid too large (limit {MAX_GRID_SCENARIOS} points)"
+                )
+            grid_shape.append(math.floor(n_points + 1e-6))
+        if math.prod(grid_shape) > MAX_GRID_SCENARIOS:
+            raise HTTPException(
+                status_code=400, detail=f"Sweep grid too large (limit {MAX_GRID_SCENARIOS} points)"
+            )
+        axes = [
+            (req.sweeps[key].start + req.sweeps[key].step * np.arange(n)).astype(np.float32)
+            for key, n in zip(features, grid_shape)
+        ]
+        mesh = np.meshgrid(*axes, indexing="ij")
+        deltas = np.stack([m.ravel() for m in mesh], axis=1)
+    else:
+        features = sorted({k for scenario in req.scenarios for k in scenario})
+        if not features:
+            raise HTTPException(status_code=400, detail="Scenarios must adjust at least one feature")
+        deltas = np.array(
+            [[scenario.get(k, 0.0) for k in features] for scenario in req.scenarios],
+            dtype=np.float32,
+        )
+
+    history, _ = get_feature_store().recent(db, req.student_id, SEQUENCE_LENGTH)
+
+    try:
+        results, model_version = simulate_grid(history, features, deltas)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    points = []
+    for row, result in zip(deltas, results):
+        result = {k: v for k, v in result.items() if k != "feature_importance"}
+        points.append(GridPoint(
+            adjustments={k: round(float(v), 4) for k, v in zip(features, row)},
+            **result,
+        ))
+
+    return SimulateGridResponse(
+        features=features, grid_shape=grid_shape, points=points, model_version=model_version,
+    )
@@ -8,7 +8,7 @@ from pydantic import BaseModel
 from typing import Optional, List
 from datetime import datetime
 
-from database import get_db, Student, DailyLog, Roadmap, Prediction
+from database import get_db, Student, Roadmap, Prediction
 from services.roadmap_engine import generate_roadmap
 from services.clustering import get_student_cluster
 
@@ -43,18 +43,7 @@ def create_roadmap(req: RoadmapRequest, db: Session = Depends(get_db)):
     predicted_score = latest_pred.predicted_score if latest_pred else 50.0
 
     # Get learning style cluster
-    logs = db.query(DailyLog).filter(DailyLog.student_id == req.student_id).all()
-    log_dicts = [
-        {
-            "study_hours": l.study_hours, "problems_solved": l.problems_solved,
-            "mock_score": l.mock_score or 50, "confidence": l.confidence,
-            "mood": l.mood, "revision_done": l.revision_done,
-            "skill_practiced": l.skill_practiced.value if l.skill_practiced else "Other"
-        }
-        for l in logs
-    ]
-
-    cluster_info = get_student_cluster(log_dicts, {})
+    cluster_info = get_student_cluster(db, req.student_id)
     learning_style = cluster_info["style"]["name"]
 
     target_gpa = req.target_gpa or student.target_gpa or 3.5
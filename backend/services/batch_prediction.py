@@ -0,0 +1,85 @@
+"""
+NeuroGrowth AI - Cohort Batch Prediction
+Scores many students with one window query, chunked forward passes and a bulk insert
+"""
+
+import time
+from datetime import datetime
+from typing import Optional
+
+from loguru import logger
+from sqlalchemy.orm import Session
+
+from database import Prediction, Student, UserRole
+from models.attribution import DEFAULT_ATTRIBUTION_MODE
+from models.inference import predict_batch, model_min_history
+from services.features import load_recent_windows
+
+
+def score_cohort(
+    db: Session,
+    student_ids: Optional[list[int]] = None,
+    save: bool = True,
+    chunk_size: int = 1024,
+    attribution: Optional[str] = None,
+) -> dict:
+    """
+    Predict for many students at once and optionally bulk-insert Prediction rows.
+
+    Args:
+        student_ids: students to score; defaults to every student account
+        save: write one Prediction row per scored student
+        chunk_size: students per forward pass
+        attribution: "off", "cached" or "computed"; defaults to
+            ATTRIBUTION_MODE, so saved rows carry feature importance like
+            the ones /predict writes. Attributions for the whole cohort are
+            computed in batched backward passes
+    """
+    started = time.perf_counter()
+
+    if student_ids is None:
+        student_ids = [
+            row[0] for row in
+            db.query(Student.id).filter(Student.role == UserRole.STUDENT).order_by(Student.id).all()
+        ]
+    else:
+        known = {row[0] for row in db.query(Student.id).filter(Student.id.in_(student_ids)).all()}
+        student_ids = [sid for sid in dict.fromkeys(student_ids) if sid in known]
+
+    windows, lengths = load_recent_windows(db, student_ids)
+    results, model_version = predict_batch(
+        windows, lengths, chunk_size=chunk_size, attribution=attribution or DEFAULT_ATTRIBUTION_MODE
+    )
+
+    if save and results:
+        now = datetime.utcnow()
+        db.bulk_insert_mappings(Prediction, [
+            {
+                "student_id": sid,
+                "predicted_score": r["predicted_score"],
+                "burnout_risk": r["burnout_risk"],
+                "improvement_velocity": r["improvement_velocity"],
+                "confidence_lower": r["confidence_lower"],
+                "confidence_upper": r["confidence_upper"],
+                "feature_importance": r["feature_importance"],
+                "generated_at": now,
+            }
+            for sid, r in zip(student_ids, results)
+        ])
+        db.commit()
+
+    model_scored = int((lengths >= model_min_history()).sum())
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    logger.info(
+        f"✅ Batch-scored {len(student_ids)} students "
+        f"({model_scored} model, {len(student_ids) - model_scored} heuristic) in {elapsed_ms:.0f} ms"
+    )
+
+    return {
+        "student_ids": student_ids,
+        "results": results,
+        "model_version": model_version,
+        "model_scored": model_scored,
+        "heuristic_scored": len(student_ids) - model_scored,
+        "elapsed_ms": round(elapsed_ms, 1),
+    }
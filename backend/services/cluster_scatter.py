@@ -0,0 +1,103 @@
+"""
+NeuroGrowth AI - Cluster Scatter Views
+Viewport filtering, progressive decimation, paging and binning of PCA points
+"""
+
+import os
+
+import numpy as np
+
+# Points per /admin/clustering page; the first page doubles as the decimated overview
+CLUSTERING_PAGE_POINTS = int(os.getenv("CLUSTERING_PAGE_POINTS", "2000"))
+CLUSTERING_MAX_PAGE_POINTS = int(os.getenv("CLUSTERING_MAX_PAGE_POINTS", "20000"))
+NO_VIEWPORT = (None, None, None, None)
+
+
+class ScatterIndex:
+    """
+    One clustering result's PCA points as columns, in sampling order.
+
+    Points are ordered by a fixed pseudo-random priority hashed from the
+    student id, so any prefix of a viewport's points is a uniform sample of
+    it: the first page keeps every cluster's share and the shape of its
+    density, and each further page refines the same picture rather than
+    adding a new region. The order only depends on the ids, so a student
+    keeps its place across zooms, pages and refits.
+    """
+
+    def __init__(self, pca_data: list[dict]):
+        sid = np.array([p["student_id"] for p in pca_data], dtype=np.int64)
+        # Knuth's multiplicative hash spreads consecutive ids over 32 bits
+        priority = (sid.astype(np.uint64) * np.uint64(2654435761)) & np.uint64(0xFFFFFFFF)
+        order = np.lexsort((sid, priority))
+        self.student_ids = sid[order]
+        self.xy = np.array([(p["x"], p["y"]) for p in pca_data], dtype=np.float64).reshape(-1, 2)[order]
+        self.clusters = np.array([p["cluster"] for p in pca_data], dtype=np.int64)[order]
+
+    def __len__(self) -> int:
+        return len(self.student_ids)
+
+    def select(self, viewport: tuple = NO_VIEWPORT) -> np.ndarray:
+        """Indices, in sampling order, of the points inside (x_min, x_max, y_min, y_max); None bounds are open."""
+        x_min, x_max, y_min, y_max = viewport
+        mask = np.ones(len(self), dtype=bool)
+        for column, low, high in ((0, x_min, x_max), (1, y_min, y_max)):
+            if low is not None:
+                mask &= self.xy[:, column] >= low
+            if high is not None:
+                mask &= self.xy[:, column] <= high
+        return np.flatnonzero(mask)
+
+    def page(self, viewport: tuple = NO_VIEWPORT, offset: int = 0, limit: int = CLUSTERING_PAGE_POINTS) -> dict:
+        """
+        A page of the viewport's points.
+
+        Returns:
+            dict with points (student_id, x, y, cluster), total (points in
+            the viewport), offset and next_offset (None on the last page)
+        """
+        selected = self.select(viewport)
+        chosen = selected[offset : offset + limit]
+        points = [
+            {"student_id": int(sid), "x": float(x), "y": float(y), "cluster": int(c)}
+            for sid, (x, y), c in zip(self.student_ids[chosen], self.xy[chosen], self.clusters[chosen])
+        ]
+        end = offset + len(chosen)
+        return {
+            "points": points,
+            "total": len(selected),
+            "offset": offset,
+            "next_offset": end if end < len(selected) else None,
+        }
+
+    def bins(self, viewport: tuple = NO_VIEWPORT, n_bins: int = 64) -> dict:
+        """
+        Per-cluster counts on an `n_bins` x `n_bins` grid over the viewport
+        (the points' extent where a bound is open). Each non-empty bin is
+        reported at the centroid of its points.
+
+        Returns:
+            dict with bins (cluster, x, y, count), total and the grid extent
+        """
+        selected = self.select(viewport)
+        if not len(selected):
+            return {"bins": [], "total": 0, "extent": None}
+        xy, clusters = self.xy[selected], self.clusters[selected]
+
+        extent = (xy[:, 0].min(), xy[:, 0].max(), xy[:, 1].min(), xy[:, 1].max())
+        x_min, x_max, y_min, y_max = (float(e if b is None else b) for b, e in zip(viewport, extent))
+        scale = np.array([max(x_max - x_min, 1e-9), max(y_max - y_min, 1e-9)])
+        cell = np.clip(((xy - (x_min, y_min)) / scale * n_bins).astype(np.int64), 0, n_bins - 1)
+
+        key = (clusters * n_bins + cell[:, 1]) * n_bins + cell[:, 0]
+        keys, inverse, counts = np.unique(key, return_inverse=True, return_counts=True)
+        cx = np.bincount(inverse, weights=xy[:, 0]) / counts
+        cy = np.bincount(inverse, weights=xy[:, 1]) / counts
+        return {
+            "bins": [
+                {"cluster": int(k // (n_bins * n_bins)), "x": round(float(x), 4), "y": round(float(y), 4), "count": int(n)}
+                for k, x, y, n in zip(keys, cx, cy, counts)
+            ],
+            "total": len(selected),
+            "extent": [round(v, 4) for v in (x_min, x_max, y_min, y_max)],
+        }
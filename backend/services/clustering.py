@@ -1,15 +1,39 @@
 """
 NeuroGrowth AI - Learning Pattern Clustering
 KMeans-based student clustering with PCA visualization
+
+Usage (from backend/):
+    python -m services.clustering       # refit on every student, print the artifact metadata
 """
 
+import os
+import sys
+import json
+import hashlib
+import threading
+from datetime import datetime
+
 import numpy as np
 from sklearn.cluster import KMeans
 from sklearn.decomposition import PCA
 from sklearn.preprocessing import StandardScaler
+from sqlalchemy import select, func
+from sqlalchemy.orm import Session
 from loguru import logger
 from typing import Optional
 
+from database import DailyLog, Student
+from models.train import FEATURE_DIVISORS, SAVED_MODEL_DIR
+from services.features import MAX_IN_CLAUSE, feature_columns, load_student_features
+
+# One artifact per mode, so a mini-batch update never replaces a full fit (or back)
+CLUSTERING_FILENAME = "clustering.json"
+MINIBATCH_CLUSTERING_FILENAME = "clustering_minibatch.json"
+# Clustering served and shown in /admin/clustering: full | minibatch | auto
+# (minibatch above MINIBATCH_MIN_STUDENTS students)
+CLUSTERING_MODE = os.getenv("CLUSTERING_MODE", "auto")
+MINIBATCH_MIN_STUDENTS = int(os.getenv("CLUSTERING_MINIBATCH_MIN_STUDENTS", "5000"))
+
 
 LEARNING_STYLES = {
     0: {"name": "Fast Improver", "description": "Rapidly improving scores with high engagement", "color": "#10B981"},
@@ -18,18 +42,32 @@ LEARNING_STYLES = {
     3: {"name": "Burnout Prone", "description": "High effort but declining mood and performance", "color": "#EF4444"},
 }
 
+# Profile columns (see extract_student_profile) that tell the styles apart
+_HOURS_STD, _SCORE_TREND, _MOOD_MEAN = 1, 5, 7
+
+
+def _log_units(features: np.ndarray) -> np.ndarray:
+    """Undo the prepare_features scaling so profiles are in raw log units."""
+    return features.astype(np.float64) * FEATURE_DIVISORS
 
-def extract_student_profile(logs: list[dict]) -> Optional[np.ndarray]:
-    """Extract aggregate features from a student's daily logs for clustering."""
-    if not logs or len(logs) < 3:
+
+def extract_student_profile(features: np.ndarray) -> Optional[np.ndarray]:
+    """
+    Extract aggregate features from a student's daily logs for clustering.
+
+    Args:
+        features: (n_days, 8) prepare_features matrix, oldest day first
+    """
+    if features is None or len(features) < 3:
         return None
 
-    study_hours = [l.get("study_hours", 0) for l in logs]
-    problems = [l.get("problems_solved", 0) for l in logs]
-    scores = [l.get("mock_score", 50) for l in logs]
-    confidence = [l.get("confidence", 3) for l in logs]
-    mood = [l.get("mood", 3) for l in logs]
-    revision = [1 if l.get("revision_done", False) else 0 for l in logs]
+    raw = _log_units(features)
+    study_hours = raw[:, 0]
+    problems = raw[:, 2]
+    scores = raw[:, 3]
+    confidence = raw[:, 4]
+    mood = raw[:, 5]
+    revision = raw[:, 6]
 
     # Feature engineering for clustering
     profile = [
@@ -51,16 +89,262 @@ def extract_student_profile(logs: list[dict]) -> Optional[np.ndarray]:
     return np.array(profile, dtype=np.float32)
 
 
-def cluster_students(all_logs: dict[int, list[dict]], n_clusters: int = 4) -> dict:
+def profile_query(
+    db: Session, student_ids: Optional[list[int]] = None, since_log_id: Optional[int] = None
+):
     """
-    Cluster students by learning patterns.
+    One grouped aggregate query computing every student's clustering profile
+    in the database, instead of loading each log row into Python. With
+    `since_log_id`, only students with a log above that id are included
+    (their whole history, so the profile is complete).
+
+    An inner select adds first/last-by-date values per student as window
+    functions; the outer GROUP BY takes averages and population variances.
+    PostgreSQL has `var_pop`; SQLite has no variance aggregate, so there the
+    inner select also carries the per-student mean and the variance is the
+    average squared deviation from it. Square roots are taken by
+    `encode_profiles`, since SQLite may lack `sqrt` too.
+
+    Returns:
+        a select of (student_id, n_days, 12 aggregates) rows for students
+        with at least 3 days, ordered by student_id
+    """
+    hours, _, problems, score, confidence, mood, revision, _ = feature_columns()
+    by_student = DailyLog.student_id
+    oldest = (DailyLog.date.asc(), DailyLog.id.asc())
+    newest = (DailyLog.date.desc(), DailyLog.id.desc())
+    postgres = db.get_bind().dialect.name == "postgresql"
+
+    columns = [
+        hours.label("hours"),
+        problems.label("problems"),
+        score.label("score"),
+        confidence.label("confidence"),
+        mood.label("mood"),
+        revision.label("revision"),
+        func.first_value(score).over(partition_by=by_student, order_by=oldest).label("score_first"),
+        func.first_value(score).over(partition_by=by_student, order_by=newest).label("score_last"),
+        func.first_value(mood).over(partition_by=by_student, order_by=oldest).label("mood_first"),
+        func.first_value(mood).over(partition_by=by_student, order_by=newest).label("mood_last"),
+    ]
+    if not postgres:
+        columns += [
+            func.avg(hours).over(partition_by=by_student).label("hours_mean"),
+            func.avg(score).over(partition_by=by_student).label("score_mean"),
+        ]
+    per_log = select(DailyLog.student_id, *columns)
+    if student_ids is not None and len(student_ids) <= MAX_IN_CLAUSE:
+        per_log = per_log.where(DailyLog.student_id.in_(list(student_ids)))
+    if since_log_id is not None:
+        changed = select(DailyLog.student_id).where(DailyLog.id > since_log_id)
+        per_log = per_log.where(DailyLog.student_id.in_(changed))
+    c = per_log.subquery().c
+
+    if postgres:
+        hours_var, score_var = func.var_pop(c.hours), func.var_pop(c.score)
+    else:
+        hours_var = func.avg((c.hours - c.hours_mean) * (c.hours - c.hours_mean))
+        score_var = func.avg((c.score - c.score_mean) * (c.score - c.score_mean))
+
+    n_days = func.count()
+    return (
+        select(
+            c.student_id,
+            n_days,
+            func.avg(c.hours),
+            hours_var,
+            func.avg(c.problems),
+            func.avg(c.score),
+            score_var,
+            func.max(c.score_first),
+            func.max(c.score_last),
+            func.avg(c.confidence),
+            func.avg(c.mood),
+            func.max(c.mood_first),
+            func.max(c.mood_last),
+            func.avg(c.revision),
+        )
+        .group_by(c.student_id)
+        .having(n_days >= 3)
+        .order_by(c.student_id)
+    )
+
+
+def encode_profiles(rows) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Turn `profile_query` rows into extract_student_profile's layout.
+
+    Returns:
+        (student_ids, profiles): an int64 (n,) array and an (n, 11) float32 matrix
+    """
+    if not rows:
+        return np.zeros(0, dtype=np.int64), np.zeros((0, 11), dtype=np.float32)
+    (sid, n, hours_mean, hours_var, problems_mean, score_mean, score_var, score_first,
+     score_last, confidence_mean, mood_mean, mood_first, mood_last, revision_mean) = (
+        np.array(rows, dtype=np.float64).T
+    )
+    # Rounding can leave a constant column's variance a hair below zero
+    hours_std = np.sqrt(np.maximum(hours_var, 0))
+    profiles = np.stack([
+        hours_mean,
+        hours_std,
+        problems_mean,
+        score_mean,
+        np.sqrt(np.maximum(score_var, 0)),
+        (score_last - score_first) / n,
+        confidence_mean,
+        mood_mean,
+        (mood_last - mood_first) / n,
+        revision_mean,
+        1.0 / (hours_std + 1),
+    ], axis=1)
+    return sid.astype(np.int64), profiles.astype(np.float32)
+
+
+def load_cohort_profiles(
+    db: Session, student_ids: Optional[list[int]] = None
+) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Every requested student's clustering profile, aggregated by the database.
+
+    Returns:
+        (student_ids, profiles) ordered by student id; students with fewer
+        than 3 days are omitted
+    """
+    if student_ids is not None and not student_ids:
+        return encode_profiles([])
+    ids, profiles = encode_profiles(db.execute(profile_query(db, student_ids)).all())
+    if student_ids is not None and len(student_ids) > MAX_IN_CLAUSE:
+        keep = np.isin(ids, np.asarray(student_ids, dtype=np.int64))
+        ids, profiles = ids[keep], profiles[keep]
+    return ids, profiles
+
+
+def _assign_styles(centroids: np.ndarray) -> list[int]:
+    """
+    Learning style for each KMeans cluster, from its centroid in raw profile
+    units, checked in the same order as the heuristic fallback: the steepest
+    score trend is the Fast Improver, then the lowest mood Burnout Prone,
+    the most uneven study hours the Crammer, and the rest Consistent.
+    """
+    styles = [1] * len(centroids)
+    remaining = list(range(len(centroids)))
+    rules = ((0, _SCORE_TREND, np.argmax), (3, _MOOD_MEAN, np.argmin), (2, _HOURS_STD, np.argmax))
+    for style, column, pick in rules:
+        if len(remaining) <= 1:
+            break
+        chosen = remaining[int(pick(centroids[remaining, column]))]
+        styles[chosen] = style
+        remaining.remove(chosen)
+    return styles
+
+
+class ClusteringModel:
+    """
+    The fitted clustering behind per-student style lookups.
+
+    `cluster_students` writes the scaler parameters, KMeans centroids and
+    the cluster-to-style mapping to saved_models/clustering.json (mini-batch
+    fits to clustering_minibatch.json). The file is
+    stat'ed on every `get()` and re-read when it changes, so a refit in one
+    worker reaches the others. Assigning a student is then a nearest-centroid
+    lookup over k centroids instead of a refit of the whole cohort.
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path or os.path.join(SAVED_MODEL_DIR, CLUSTERING_FILENAME)
+        self._lock = threading.Lock()
+        self._stamp: Optional[tuple] = None
+        self._fitted: Optional[dict] = None
+
+    def get(self) -> Optional[dict]:
+        """The current artifact with numpy arrays, or None if never fitted."""
+        stamp = self._stat()
+        if stamp != self._stamp:
+            with self._lock:
+                stamp = self._stat()
+                if stamp != self._stamp:
+                    self._fitted = self._read() if stamp is not None else None
+                    self._stamp = stamp
+        return self._fitted
+
+    def save(self, artifact: dict):
+        """Write a new artifact atomically; every process picks it up on its next `get()`."""
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        with open(self.path + ".tmp", "w") as f:
+            json.dump(artifact, f)
+        os.replace(self.path + ".tmp", self.path)
+
+    def assign(self, profile: np.ndarray) -> Optional[tuple[int, str]]:
+        """(style id, artifact version) of the nearest centroid, or None if never fitted."""
+        fitted = self.get()
+        if fitted is None:
+            return None
+        z = (profile - fitted["scaler_mean"]) / fitted["scaler_scale"]
+        label = int(np.argmin(((fitted["centroids"] - z) ** 2).sum(axis=1)))
+        return fitted["cluster_styles"][label], fitted["version"]
+
+    def _stat(self) -> Optional[tuple]:
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        return (st.st_mtime_ns, st.st_size)
+
+    def _read(self) -> Optional[dict]:
+        try:
+            with open(self.path) as f:
+                artifact = json.load(f)
+        except (OSError, json.JSONDecodeError) as e:
+            logger.warning(f"Failed to load clustering artifact: {e}")
+            return None
+        for key in ("scaler_mean", "scaler_scale", "centroids"):
+            artifact[key] = np.array(artifact[key], dtype=np.float64)
+        logger.info(f"✅ Clustering {artifact['version']} loaded ({artifact['n_clusters']} clusters)")
+        return artifact
+
+
+# Singleton instances, one per mode
+_clustering: dict[str, ClusteringModel] = {}
+_clustering_lock = threading.Lock()
+
+
+def get_clustering_model(mode: str = "full") -> ClusteringModel:
+    model = _clustering.get(mode)
+    if model is None:
+        with _clustering_lock:
+            model = _clustering.get(mode)
+            if model is None:
+                filename = MINIBATCH_CLUSTERING_FILENAME if mode == "minibatch" else CLUSTERING_FILENAME
+                model = _clustering[mode] = ClusteringModel(os.path.join(SAVED_MODEL_DIR, filename))
+    return model
+
+
+def resolve_clustering_mode(db: Session, mode: str = CLUSTERING_MODE) -> str:
+    """full or minibatch; auto picks minibatch above MINIBATCH_MIN_STUDENTS students."""
+    if mode != "auto":
+        return mode
+    n_students = db.query(func.count(Student.id)).scalar()
+    return "minibatch" if n_students > MINIBATCH_MIN_STUDENTS else "full"
+
+
+def cluster_students(
+    all_logs: dict[int, np.ndarray],
+    n_clusters: int = 4,
+    store: Optional[ClusteringModel] = None,
+) -> dict:
+    """
+    Cluster students by learning patterns, and store the fit for
+    `get_student_cluster`.
 
     Args:
-        all_logs: dict mapping student_id -> list of daily logs
+        all_logs: dict mapping student_id -> (n_days, 8) feature matrix
         n_clusters: number of clusters
+        store: where to save the fit (the served artifact by default)
 
     Returns:
-        dict with cluster_labels, pca_data, cluster_info
+        dict with cluster_labels, pca_data, cluster_info; clusters are
+        reported as LEARNING_STYLES ids
     """
     student_ids = []
     profiles = []
@@ -71,79 +355,174 @@ def cluster_students(all_logs: dict[int, list[dict]], n_clusters: int = 4) -> di
             student_ids.append(sid)
             profiles.append(profile)
 
-    if len(profiles) < n_clusters:
-        logger.warning(f"Not enough students ({len(profiles)}) for {n_clusters} clusters")
+    return cluster_profiles(student_ids, np.array(profiles).reshape(-1, 11), n_clusters, store)
+
+
+def cluster_profiles(
+    student_ids,
+    X: np.ndarray,
+    n_clusters: int = 4,
+    store: Optional[ClusteringModel] = None,
+) -> dict:
+    """
+    `cluster_students` on ready-made profiles, e.g. from `load_cohort_profiles`.
+
+    Args:
+        student_ids: the id of each profile row
+        X: (n_students, 11) profiles in extract_student_profile's layout
+    """
+    if len(X) < n_clusters:
+        logger.warning(f"Not enough students ({len(X)}) for {n_clusters} clusters")
         return {"cluster_labels": {}, "pca_data": [], "cluster_info": LEARNING_STYLES}
 
-    X = np.array(profiles)
     scaler = StandardScaler()
     X_scaled = scaler.fit_transform(X)
 
     # KMeans clustering
     kmeans = KMeans(n_clusters=n_clusters, random_state=42, n_init=10)
     labels = kmeans.fit_predict(X_scaled)
+    version, cluster_styles = store_fit(
+        scaler, kmeans.cluster_centers_, len(X), store, mode="full"
+    )
 
     # PCA for visualization
     pca = PCA(n_components=2)
     pca_coords = pca.fit_transform(X_scaled)
 
-    # Build results
-    cluster_labels = {int(sid): int(label) for sid, label in zip(student_ids, labels)}
+    logger.info(f"✅ Clustered {len(X)} students into {n_clusters} groups (clustering {version})")
+    return clustering_result(
+        student_ids, np.array(cluster_styles)[labels], pca_coords, pca.explained_variance_ratio_, version
+    )
+
+
+def store_fit(
+    scaler: StandardScaler,
+    centroids: np.ndarray,
+    n_students: int,
+    store: Optional[ClusteringModel] = None,
+    mode: str = "full",
+    **extra,
+) -> tuple[str, list[int]]:
+    """
+    Save a fitted clustering for `get_student_cluster`, versioned by a hash
+    of the fitted parameters.
+
+    Args:
+        centroids: (k, 11) KMeans centroids in scaled profile space
+        store: where to save it (the mode's served artifact by default)
+        mode: full | minibatch, recorded with the fit
+        extra: JSON fields recorded alongside
+
+    Returns:
+        (version, style id of each centroid)
+    """
+    cluster_styles = _assign_styles(centroids * scaler.scale_ + scaler.mean_)
+    fit = {
+        "n_clusters": len(centroids),
+        "scaler_mean": scaler.mean_.tolist(),
+        "scaler_scale": scaler.scale_.tolist(),
+        "centroids": np.asarray(centroids).tolist(),
+        "cluster_styles": cluster_styles,
+    }
+    version = hashlib.sha256(json.dumps(fit, sort_keys=True).encode()).hexdigest()[:12]
+    (store or get_clustering_model(mode)).save({
+        **fit,
+        **extra,
+        "mode": mode,
+        "version": version,
+        "fitted_at": datetime.utcnow().isoformat(),
+        "n_students": n_students,
+    })
+    return version, cluster_styles
+
+
+def clustering_result(
+    student_ids, styles: np.ndarray, coords: np.ndarray, explained_variance, version: str
+) -> dict:
+    """
+    The /admin/clustering payload: per-student style ids, 2-D PCA points
+    and students per style. Points carry only the style id; the style
+    metadata is sent once, in cluster_info.
+    """
+    cluster_labels = {int(sid): int(style) for sid, style in zip(student_ids, styles)}
 
     pca_data = []
     for i, sid in enumerate(student_ids):
         pca_data.append({
             "student_id": int(sid),
-            "x": round(float(pca_coords[i, 0]), 4),
-            "y": round(float(pca_coords[i, 1]), 4),
-            "cluster": int(labels[i]),
-            "style": LEARNING_STYLES.get(int(labels[i]), LEARNING_STYLES[0]),
+            "x": round(float(coords[i, 0]), 4),
+            "y": round(float(coords[i, 1]), 4),
+            "cluster": int(styles[i]),
         })
 
-    logger.info(f"✅ Clustered {len(profiles)} students into {n_clusters} groups")
-
+    style_ids, counts = np.unique(np.asarray(styles, dtype=np.int64), return_counts=True)
     return {
         "cluster_labels": cluster_labels,
         "pca_data": pca_data,
         "cluster_info": LEARNING_STYLES,
-        "explained_variance": [round(float(v), 4) for v in pca.explained_variance_ratio_],
+        "cluster_distribution": {
+            LEARNING_STYLES[int(style)]["name"]: int(n) for style, n in zip(style_ids, counts)
+        },
+        "explained_variance": [round(float(v), 4) for v in explained_variance],
+        "clustering_version": version,
     }
 
 
-def get_student_cluster(student_logs: list[dict], all_logs: dict[int, list[dict]]) -> dict:
-    """Determine which learning style cluster a single student belongs to."""
-    profile = extract_student_profile(student_logs)
-    if profile is None:
-        return {"cluster": 1, "style": LEARNING_STYLES[1]}
+def get_student_cluster(db: Session, student_id: int) -> dict:
+    """
+    Determine which learning style cluster a single student belongs to: the
+    nearest centroid of the last fit in the served mode (CLUSTERING_MODE),
+    or a heuristic on the student's own logs before any fit exists.
 
-    # Get all profiles
-    profiles = []
-    for logs in all_logs.values():
-        p = extract_student_profile(logs)
-        if p is not None:
-            profiles.append(p)
-
-    if len(profiles) < 4:
-        # Heuristic fallback
-        scores = [l.get("mock_score", 50) for l in student_logs]
-        mood = [l.get("mood", 3) for l in student_logs]
-        velocity = (scores[-1] - scores[0]) / max(len(scores), 1) if len(scores) > 1 else 0
-
-        if velocity > 2:
-            return {"cluster": 0, "style": LEARNING_STYLES[0]}
-        elif np.mean(mood) < 2.5:
-            return {"cluster": 3, "style": LEARNING_STYLES[3]}
-        elif np.std([l.get("study_hours", 0) for l in student_logs]) > 3:
-            return {"cluster": 2, "style": LEARNING_STYLES[2]}
-        else:
-            return {"cluster": 1, "style": LEARNING_STYLES[1]}
-
-    X = np.array(profiles + [profile])
-    scaler = StandardScaler()
-    X_scaled = scaler.fit_transform(X)
+    The student's profile is aggregated over their full history by the same
+    query the fit's profiles came from (`load_cohort_profiles`), so it lands
+    in the space the centroids were fitted in.
 
-    kmeans = KMeans(n_clusters=4, random_state=42, n_init=10)
-    labels = kmeans.fit_predict(X_scaled)
+    Returns:
+        dict with cluster (a LEARNING_STYLES id), style and clustering_version
+        (None when the heuristic decided)
+    """
+    ids, profiles = load_cohort_profiles(db, [student_id])
+    if not len(ids):
+        return {"cluster": 1, "style": LEARNING_STYLES[1], "clustering_version": None}
+
+    assigned = get_clustering_model(resolve_clustering_mode(db)).assign(profiles[0])
+    if assigned is None:
+        cluster = _heuristic_cluster(load_student_features(db, student_id)[0])
+        return {"cluster": cluster, "style": LEARNING_STYLES[cluster], "clustering_version": None}
+
+    cluster, version = assigned
+    return {"cluster": cluster, "style": LEARNING_STYLES[cluster], "clustering_version": version}
+
+
+def _heuristic_cluster(student_logs: np.ndarray) -> int:
+    """Style id from simple thresholds, for when no clustering has been fitted."""
+    raw = _log_units(student_logs)
+    scores = raw[:, 3]
+    mood = raw[:, 5]
+    velocity = (scores[-1] - scores[0]) / max(len(scores), 1) if len(scores) > 1 else 0
+
+    if velocity > 2:
+        return 0
+    elif np.mean(mood) < 2.5:
+        return 3
+    elif np.std(raw[:, 0]) > 3:
+        return 2
+    return 1
+
+
+if __name__ == "__main__":
+    from database import SessionLocal
 
-    cluster = int(labels[-1])
-    return {"cluster": cluster, "style": LEARNING_STYLES.get(cluster, LEARNING_STYLES[1])}
+    db = SessionLocal()
+    try:
+        cluster_profiles(*load_cohort_profiles(db))
+    finally:
+        db.close()
+    fitted = get_clustering_model().get()
+    json.dump(
+        {k: v for k, v in fitted.items() if k not in ("scaler_mean", "scaler_scale", "centroids")}
+        if fitted else {"error": "Not enough students to cluster"},
+        sys.stdout, indent=2,
+    )
+    print()
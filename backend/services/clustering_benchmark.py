@@ -0,0 +1,180 @@
+"""
+NeuroGrowth AI - Clustering Benchmark
+Python-side vs SQL-aggregated profiles, full-batch vs streaming mini-batch clustering
+
+Usage (from backend/):
+    python -m services.clustering_benchmark                          # 1k, 10k, 100k students
+    python -m services.clustering_benchmark --students 1000,10000 --days 60 --output bench.json
+"""
+
+import os
+import sys
+import json
+import time
+import queue
+import random
+import argparse
+import tempfile
+import multiprocessing as mp
+from datetime import date, timedelta
+
+import numpy as np
+from sklearn.metrics import adjusted_rand_score
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from models.train_benchmark import COHORT_STYLES, environment, _peak_rss_mb
+
+DEFAULT_SIZES = (1_000, 10_000, 100_000)
+# python: every log row loaded and profiled in Python; full/minibatch: profiles aggregated in SQL
+PATHS = ("python", "full", "minibatch")
+# Distinct generated histories; larger cohorts resample them with jitter
+HISTORY_POOL = 1000
+INSERT_BATCH_ROWS = 50_000
+# Share of the cohort added as new students before timing a mini-batch update
+UPDATE_FRACTION = 0.01
+
+
+def _history_pool(days: int, seed: int) -> list[list[dict]]:
+    from utils.seed import generate_student_logs
+
+    random.seed(seed)
+    return [generate_student_logs(COHORT_STYLES[i % len(COHORT_STYLES)], days=days) for i in range(HISTORY_POOL)]
+
+
+def insert_cohort(engine, pool: list[list[dict]], first_id: int, n_students: int, seed: int):
+    """Insert `n_students` synthetic students' logs, ids from `first_id`, in large batches."""
+    from database import DailyLog
+
+    rng = np.random.default_rng(seed)
+    today = date.today()
+    table = DailyLog.__table__
+    batch = []
+    with engine.begin() as conn:
+        for sid in range(first_id, first_id + n_students):
+            logs = pool[int(rng.integers(len(pool)))]
+            hours_jitter, score_jitter = rng.normal(0, 0.3), rng.normal(0, 2.0)
+            for day, log in enumerate(logs):
+                batch.append({
+                    **log,
+                    "student_id": sid,
+                    "date": today - timedelta(days=len(logs) - day),
+                    "study_hours": round(min(24.0, max(0.0, log["study_hours"] + hours_jitter)), 1),
+                    "mock_score": round(min(100.0, max(0.0, log["mock_score"] + score_jitter)), 1),
+                })
+            if len(batch) >= INSERT_BATCH_ROWS:
+                conn.execute(table.insert(), batch)
+                batch = []
+        if batch:
+            conn.execute(table.insert(), batch)
+
+
+def _run_path(db_path: str, work_dir: str, path: str, n_students: int, pool, seed: int, results):
+    """One benchmark point in a fresh process, so peak RSS is its own."""
+    from services.clustering import ClusteringModel, cluster_students, cluster_profiles, load_cohort_profiles
+    from services.features import load_cohort_features
+    from services.streaming_clustering import cluster_students_streaming
+
+    engine = create_engine(f"sqlite:///{db_path}")
+    db = sessionmaker(bind=engine)()
+    store = ClusteringModel(os.path.join(work_dir, f"{path}.json"))
+    state_path = os.path.join(work_dir, f"{path}.state.joblib")
+
+    baseline_rss = _peak_rss_mb()
+    start = time.perf_counter()
+    if path == "python":
+        result = cluster_students(load_cohort_features(db), store=store)
+    elif path == "full":
+        result = cluster_profiles(*load_cohort_profiles(db), store=store)
+    else:
+        result = cluster_students_streaming(db, refit=True, store=store, state_path=state_path)
+    elapsed = time.perf_counter() - start
+    row = {
+        "path": path,
+        "students": n_students,
+        "elapsed_s": round(elapsed, 3),
+        "students_per_s": round(n_students / elapsed, 1),
+        "baseline_rss_mb": round(baseline_rss, 1),
+        "peak_rss_mb": round(_peak_rss_mb(), 1),
+        "labels": [result["cluster_labels"][sid] for sid in sorted(result["cluster_labels"])],
+    }
+
+    if path == "minibatch":
+        # Fold in a batch of new students instead of refitting (mutates this size's database)
+        n_new = max(1, int(n_students * UPDATE_FRACTION))
+        insert_cohort(engine, pool, n_students + 1, n_new, seed + 1)
+        start = time.perf_counter()
+        cluster_students_streaming(db, store=store, state_path=state_path)
+        row["update_students"] = n_new
+        row["update_s"] = round(time.perf_counter() - start, 3)
+
+    db.close()
+    results.put(row)
+
+
+def run_benchmark(sizes=DEFAULT_SIZES, days: int = 30, seed: int = 1234) -> list[dict]:
+    """Time every path at every cohort size; the mini-batch point runs last as it adds students."""
+    from database import Base
+
+    ctx = mp.get_context("spawn")
+    pool = _history_pool(days, seed)
+    rows = []
+    with tempfile.TemporaryDirectory() as work_dir:
+        for n_students in sizes:
+            db_path = os.path.join(work_dir, f"cohort_{n_students}.db")
+            engine = create_engine(f"sqlite:///{db_path}")
+            Base.metadata.create_all(engine)
+            insert_cohort(engine, pool, 1, n_students, seed)
+            engine.dispose()
+
+            labels = {}
+            for path in PATHS:
+                results = ctx.Queue()
+                process = ctx.Process(
+                    target=_run_path, args=(db_path, work_dir, path, n_students, pool, seed, results)
+                )
+                process.start()
+                # Read before joining: a child cannot exit while its result is unsent
+                row = None
+                while row is None and (process.is_alive() or not results.empty()):
+                    try:
+                        row = results.get(timeout=1)
+                    except queue.Empty:
+                        pass
+                process.join()
+                if row is None or process.exitcode != 0:
+                    rows.append({"path": path, "students": n_students, "error": f"exit code {process.exitcode}"})
+                else:
+                    labels[path] = row.pop("labels")
+                    rows.append(row)
+                print(json.dumps(rows[-1]), file=sys.stderr)
+
+            # Agreement with the full path's learning-style assignments (1.0 = identical)
+            for row in rows[-len(PATHS):]:
+                if row["path"] != "full" and "full" in labels and row["path"] in labels:
+                    row["ari_vs_full"] = round(adjusted_rand_score(labels["full"], labels[row["path"]]), 4)
+    return rows
+
+
+def _int_list(value: str) -> list[int]:
+    return [int(v) for v in value.split(",") if v]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawTextHelpFormatter)
+    parser.add_argument("--students", type=_int_list, default=list(DEFAULT_SIZES))
+    parser.add_argument("--days", type=int, default=30)
+    parser.add_argument("--seed", type=int, default=1234)
+    parser.add_argument("--output", help="also write the report to this file")
+    args = parser.parse_args()
+
+    report = {
+        "environment": environment(),
+        "cohort": {"days": args.days, "seed": args.seed, "history_pool": HISTORY_POOL},
+        "results": run_benchmark(args.students, args.days, args.seed),
+    }
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    json.dump(report, sys.stdout, indent=2)
+    print()
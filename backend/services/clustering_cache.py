@@ -0,0 +1,254 @@
+"""
+NeuroGrowth AI - Clustering Result Cache
+Serves /admin/clustering from memory, refit in the background as new logs arrive
+"""
+
+import os
+import time
+import threading
+from datetime import datetime
+from typing import Optional
+
+from loguru import logger
+from sqlalchemy import select, func
+from sqlalchemy.orm import Session
+
+from database import SessionLocal, DailyLog
+from services.clustering import (
+    CLUSTERING_MODE, cluster_profiles, load_cohort_profiles, resolve_clustering_mode,
+)
+from services.cluster_scatter import ScatterIndex
+from services.streaming_clustering import cluster_students_streaming
+
+# A stale result is refit once this many logs were written since it was computed,
+# or this share of the logs it was computed from, whichever is fewer (at least 1)...
+CLUSTERING_REFRESH_MIN_LOGS = int(os.getenv("CLUSTERING_REFRESH_MIN_LOGS", "200"))
+CLUSTERING_REFRESH_FRACTION = float(os.getenv("CLUSTERING_REFRESH_FRACTION", "0.05"))
+# ...or once it is this old and anything changed at all
+CLUSTERING_CACHE_MAX_AGE_S = float(os.getenv("CLUSTERING_CACHE_MAX_AGE_S", "3600"))
+
+
+def log_watermark(db: Session) -> tuple[int, int]:
+    """(highest DailyLog id, log count): moves on every insert and delete."""
+    high, count = db.execute(select(func.max(DailyLog.id), func.count(DailyLog.id))).one()
+    return int(high or 0), int(count)
+
+
+def count_logs_since(db: Session, log_id: int) -> int:
+    """Logs with an id above `log_id`, i.e. inserted after it."""
+    return int(db.execute(select(func.count(DailyLog.id)).where(DailyLog.id > log_id)).scalar())
+
+
+def compute_clustering(db: Session, mode: str = "auto", refit: bool = False) -> dict:
+    """
+    Fit the clustering for /admin/clustering.
+
+    Args:
+        mode: full | minibatch | auto (minibatch above MINIBATCH_MIN_STUDENTS students)
+        refit: discard the stored mini-batch state first
+    """
+    if resolve_clustering_mode(db, mode) == "minibatch":
+        return cluster_students_streaming(db, refit=refit)
+    return cluster_profiles(*load_cohort_profiles(db))
+
+
+class ClusteringCache:
+    """
+    The last clustering result per mode, stamped with the log table's
+    watermark when it was computed.
+
+    A request whose watermark matches is served from memory. When logs have
+    changed since, the stale result is still served at once, and a refit is
+    started in a background thread once enough new logs have arrived
+    (CLUSTERING_REFRESH_MIN_LOGS, or CLUSTERING_REFRESH_FRACTION of the logs
+    the result was computed from if that is fewer), any were deleted, the
+    result is older than CLUSTERING_CACHE_MAX_AGE_S, or it has no students
+    at all. Only the very first request for a mode (or an explicit refit)
+    waits for the fit; one fit per mode runs at a time.
+
+    The PCA points are kept as a `ScatterIndex` rather than in the result,
+    so requests page and bin them without copying the whole cohort.
+    """
+
+    def __init__(
+        self,
+        refresh_min_logs: int = CLUSTERING_REFRESH_MIN_LOGS,
+        refresh_fraction: float = CLUSTERING_REFRESH_FRACTION,
+        max_age_s: float = CLUSTERING_CACHE_MAX_AGE_S,
+    ):
+        self.refresh_min_logs = refresh_min_logs
+        self.refresh_fraction = refresh_fraction
+        self.max_age_s = max_age_s
+        self._entries: dict[str, dict] = {}
+        self._fit_locks: dict[str, threading.Lock] = {}
+        self._refreshing: set[str] = set()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.refreshes = 0
+
+    def get(
+        self, db: Session, mode: str = CLUSTERING_MODE, refit: bool = False
+    ) -> tuple[dict, ScatterIndex, dict]:
+        """
+        Returns:
+            (result without its per-student fields, PCA points, cache
+            metadata); treat the first two as read-only, they are shared
+        """
+        watermark = log_watermark(db)
+        if not refit:
+            with self._lock:
+                entry = self._entries.get(mode)
+            if entry is not None:
+                drift = self._drift(db, entry, watermark)
+                return entry["result"], entry["scatter"], self._serve(mode, entry, watermark, drift)
+
+        with self._fit_lock(mode):
+            # A concurrent first request may have fitted while this one waited
+            with self._lock:
+                entry = self._entries.get(mode)
+            if refit or entry is None:
+                with self._lock:
+                    self.misses += 1
+                entry = self._fit(db, mode, refit, watermark)
+        drift = self._drift(db, entry, watermark)
+        return entry["result"], entry["scatter"], self._meta(mode, entry, watermark, drift)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "modes": {
+                    mode: {
+                        "watermark_log_id": entry["watermark"][0],
+                        "computed_at": entry["computed_at"],
+                        "fit_s": entry["fit_s"],
+                        "students": len(entry["scatter"]),
+                    }
+                    for mode, entry in self._entries.items()
+                },
+                "refreshing": sorted(self._refreshing),
+                "hits": self.hits,
+                "stale_hits": self.stale_hits,
+                "misses": self.misses,
+                "refreshes": self.refreshes,
+            }
+
+    def _serve(
+        self, mode: str, entry: dict, watermark: tuple[int, int], drift: tuple[int, int]
+    ) -> dict:
+        if entry["watermark"] == watermark:
+            with self._lock:
+                self.hits += 1
+            return self._meta(mode, entry, watermark, drift)
+
+        with self._lock:
+            self.stale_hits += 1
+        new_logs, deleted_logs = drift
+        age = time.time() - entry["computed_ts"]
+        if (
+            new_logs >= self._refresh_threshold(entry)
+            or deleted_logs > 0
+            or age >= self.max_age_s
+            or not len(entry["scatter"])
+        ):
+            self._refresh_async(mode)
+        return self._meta(mode, entry, watermark, drift)
+
+    def _meta(
+        self, mode: str, entry: dict, watermark: tuple[int, int], drift: tuple[int, int]
+    ) -> dict:
+        new_logs, _ = drift
+        with self._lock:
+            refreshing = mode in self._refreshing
+        return {
+            "watermark_log_id": entry["watermark"][0],
+            "current_watermark_log_id": watermark[0],
+            "stale": entry["watermark"] != watermark,
+            "logs_behind": new_logs,
+            "refreshing": refreshing,
+            "computed_at": entry["computed_at"],
+            "fit_s": entry["fit_s"],
+        }
+
+    def _refresh_threshold(self, entry: dict) -> int:
+        """New logs that make `entry` worth refitting; small cohorts move sooner."""
+        computed_from = entry["watermark"][1]
+        return max(1, min(self.refresh_min_logs, int(self.refresh_fraction * computed_from)))
+
+    @staticmethod
+    def _drift(db: Session, entry: dict, watermark: tuple[int, int]) -> tuple[int, int]:
+        """
+        (logs added, logs deleted) since `entry` was computed. Added logs are
+        counted rather than read off the id range, so ids skipped by
+        rolled-back inserts are not drift, and an insert never hides a delete.
+        """
+        if watermark == entry["watermark"]:
+            return 0, 0
+        old_high, old_count = entry["watermark"]
+        added = count_logs_since(db, old_high)
+        # The logs the entry saw all have ids up to old_high; any missing now were deleted
+        return added, max(0, old_count - (watermark[1] - added))
+
+    def _fit_lock(self, mode: str) -> threading.Lock:
+        with self._lock:
+            return self._fit_locks.setdefault(mode, threading.Lock())
+
+    def _fit(self, db: Session, mode: str, refit: bool, watermark: tuple[int, int]) -> dict:
+        """Fit and store an entry; call with the mode's fit lock held."""
+        start = time.perf_counter()
+        result = dict(compute_clustering(db, mode, refit))
+        scatter = ScatterIndex(result.pop("pca_data"))
+        result.pop("cluster_labels")
+        entry = {
+            "result": result,
+            "scatter": scatter,
+            # Read before fitting, so logs written during the fit count as new
+            "watermark": watermark,
+            "computed_ts": time.time(),
+            "computed_at": datetime.utcnow().isoformat(),
+            "fit_s": round(time.perf_counter() - start, 3),
+        }
+        with self._lock:
+            self._entries[mode] = entry
+        return entry
+
+    def _refresh_async(self, mode: str):
+        with self._lock:
+            if mode in self._refreshing:
+                return
+            self._refreshing.add(mode)
+        threading.Thread(
+            target=self._refresh, args=(mode,), name=f"clustering-refresh-{mode}", daemon=True
+        ).start()
+
+    def _refresh(self, mode: str):
+        db = SessionLocal()
+        try:
+            with self._fit_lock(mode):
+                entry = self._fit(db, mode, False, log_watermark(db))
+            with self._lock:
+                self.refreshes += 1
+            logger.info(
+                f"✅ Clustering cache ({mode}) refreshed to log {entry['watermark'][0]} in {entry['fit_s']}s"
+            )
+        except Exception as e:
+            logger.warning(f"Clustering cache refresh ({mode}) failed, serving the stale result: {e}")
+        finally:
+            db.close()
+            with self._lock:
+                self._refreshing.discard(mode)
+
+
+# Singleton instance
+_cache: Optional[ClusteringCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_clustering_cache() -> ClusteringCache:
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = ClusteringCache()
+    return _cache
@@ -0,0 +1,229 @@
+"""
+NeuroGrowth AI - In-Memory Recent Feature Store
+Per-student ring buffers of the last N days, kept current by /log-daily
+"""
+
+import os
+import time
+import threading
+from collections import OrderedDict
+from datetime import date
+from typing import Optional
+
+import numpy as np
+from loguru import logger
+from sqlalchemy.orm import Session
+
+from models.train import SEQUENCE_LENGTH
+from services.features import N_FEATURES, load_student_features, log_stamp
+
+FEATURE_STORE_ENABLED = os.getenv("FEATURE_STORE", "1") == "1"
+FEATURE_STORE_DAYS = int(os.getenv("FEATURE_STORE_DAYS", "30"))
+FEATURE_STORE_MAX_MB = float(os.getenv("FEATURE_STORE_MAX_MB", "64"))
+# Also reload a resident student after this many seconds (0 = never)
+FEATURE_STORE_TTL_S = float(os.getenv("FEATURE_STORE_TTL_S", "0"))
+
+
+class FeatureStore:
+    """
+    Preallocated ring buffers holding each active student's most recent days
+    in the prepare_features encoding, plus the date of each day.
+
+    All buffers live in one (capacity, days, 8) float32 slab sized from
+    `max_mb`; a student occupies one slot. Slots are handed out in LRU
+    order, so inactive students are evicted once the slab is full. A miss
+    cold-loads the last `days` rows from the database.
+
+    Each slot is stamped with the student's (latest DailyLog id, log count)
+    when it is loaded. Every read checks the stamp with one indexed query
+    and reloads on a mismatch, so a log written or deleted by another API
+    process is seen on the next read. `append` keeps the window and its
+    stamp current for writes made here, avoiding that reload. A back-dated
+    log (older than the newest stored day) drops the student so the next
+    read reloads it in date order.
+    """
+
+    def __init__(
+        self,
+        days: int = FEATURE_STORE_DAYS,
+        max_mb: float = FEATURE_STORE_MAX_MB,
+        ttl_s: float = FEATURE_STORE_TTL_S,
+        enabled: bool = FEATURE_STORE_ENABLED,
+    ):
+        self.days = max(days, SEQUENCE_LENGTH)
+        self.ttl_s = ttl_s
+        self.enabled = enabled
+        slot_bytes = self.days * (N_FEATURES * 4 + 4)
+        self.capacity = max(1, int(max_mb * 1024 * 1024) // slot_bytes) if enabled else 0
+
+        # np.zeros maps untouched pages lazily, so the cap is not paid up front
+        self._features = np.zeros((self.capacity, self.days, N_FEATURES), dtype=np.float32)
+        self._dates = np.zeros((self.capacity, self.days), dtype=np.int32)  # date ordinals
+        self._head = np.zeros(self.capacity, dtype=np.int64)  # next write position
+        self._count = np.zeros(self.capacity, dtype=np.int64)
+        self._loaded_at = np.zeros(self.capacity, dtype=np.float64)
+        self._stamps = np.zeros((self.capacity, 2), dtype=np.int64)  # (latest log id, log count)
+
+        self._slots: "OrderedDict[int, int]" = OrderedDict()
+        self._free = list(range(self.capacity - 1, -1, -1))
+        # Students being cold-loaded -> whether a write arrived meanwhile
+        self._loading: dict[int, bool] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.appends = 0
+        self.stale = 0
+
+    # ─── Public API ──────────────────────────────────────────────────────────
+
+    def recent(
+        self,
+        db: Session,
+        student_id: int,
+        n_days: Optional[int] = None,
+        stamp: Optional[tuple[int, int]] = None,
+    ) -> tuple[np.ndarray, np.ndarray]:
+        """
+        A student's last `n_days` (default: all stored days), oldest first.
+
+        Args:
+            stamp: the student's `log_stamp`, when the caller already read it
+
+        Returns:
+            (features, dates): an (n, 8) float32 prepare_features matrix and
+            the matching (n,) array of date ordinals
+        """
+        n_days = self.days if n_days is None else min(n_days, self.days)
+        if not self.enabled:
+            return load_student_features(db, student_id, n_days)
+
+        # Read before loading, so a write landing in between forces a reload next time
+        stamp = log_stamp(db, student_id) if stamp is None else stamp
+        with self._lock:
+            slot = self._slots.get(student_id)
+            if slot is not None:
+                if self._current(slot, stamp):
+                    self._slots.move_to_end(student_id)
+                    self.hits += 1
+                    return self._read(slot, n_days)
+                self.stale += 1
+            self.misses += 1
+            self._loading.setdefault(student_id, False)
+
+        try:
+            features, dates = load_student_features(db, student_id, self.days)
+        except Exception:
+            with self._lock:
+                self._loading.pop(student_id, None)
+            raise
+
+        with self._lock:
+            # Skip caching if a write for this student raced with the load
+            raced = self._loading.pop(student_id, True)
+            if not raced:
+                self._store(student_id, features, dates, stamp)
+        return features[-n_days:], dates[-n_days:]
+
+    def append(self, student_id: int, log_date: date, row: np.ndarray, log_id: int):
+        """Push one newly written day (DailyLog `log_id`) onto a resident student's buffer."""
+        if not self.enabled:
+            return
+        day = log_date.toordinal()
+        with self._lock:
+            if student_id in self._loading:
+                self._loading[student_id] = True
+            slot = self._slots.get(student_id)
+            if slot is None:
+                return
+            head, count = self._head[slot], self._count[slot]
+            if count and day < self._dates[slot, (head - 1) % self.days]:
+                self._drop(student_id)
+                return
+            self._features[slot, head] = row
+            self._dates[slot, head] = day
+            self._head[slot] = (head + 1) % self.days
+            self._count[slot] = min(count + 1, self.days)
+            # A log written elsewhere meanwhile leaves the count short, so the next read reloads
+            high, n_logs = self._stamps[slot]
+            self._stamps[slot] = (max(high, log_id), n_logs + 1)
+            self.appends += 1
+
+    def invalidate(self, student_id: int):
+        with self._lock:
+            if student_id in self._loading:
+                self._loading[student_id] = True
+            self._drop(student_id)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "enabled": self.enabled,
+                "students": len(self._slots),
+                "capacity": self.capacity,
+                "days": self.days,
+                "allocated_mb": round((self._features.nbytes + self._dates.nbytes) / 2**20, 1),
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "appends": self.appends,
+                "stale": self.stale,
+            }
+
+    # ─── Internals (caller holds the lock) ───────────────────────────────────
+
+    def _read(self, slot: int, n_days: int) -> tuple[np.ndarray, np.ndarray]:
+        n = min(int(self._count[slot]), n_days)
+        idx = (self._head[slot] - n + np.arange(n)) % self.days
+        # Fancy indexing copies, so callers never see later ring writes
+        return self._features[slot, idx], self._dates[slot, idx]
+
+    def _store(
+        self, student_id: int, features: np.ndarray, dates: np.ndarray, stamp: tuple[int, int]
+    ):
+        slot = self._slots.get(student_id)
+        if slot is None:
+            if not self._free:
+                _, evicted = self._slots.popitem(last=False)
+                self._free.append(evicted)
+                self.evictions += 1
+            slot = self._free.pop()
+            self._slots[student_id] = slot
+        self._slots.move_to_end(student_id)
+
+        n = len(features)
+        self._features[slot, :n] = features
+        self._dates[slot, :n] = dates
+        self._head[slot] = n % self.days
+        self._count[slot] = n
+        self._loaded_at[slot] = time.monotonic()
+        self._stamps[slot] = stamp
+
+    def _drop(self, student_id: int):
+        slot = self._slots.pop(student_id, None)
+        if slot is not None:
+            self._free.append(slot)
+
+    def _current(self, slot: int, stamp: tuple[int, int]) -> bool:
+        return tuple(self._stamps[slot]) == tuple(stamp) and not self._expired(slot)
+
+    def _expired(self, slot: int) -> bool:
+        return self.ttl_s > 0 and time.monotonic() - self._loaded_at[slot] > self.ttl_s
+
+
+# Singleton instance
+_store: Optional[FeatureStore] = None
+_store_lock = threading.Lock()
+
+
+def get_feature_store() -> FeatureStore:
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = FeatureStore()
+                if _store.enabled:
+                    logger.info(
+                        f"✅ Feature store ready ({_store.capacity} students x {_store.days} days)"
+                    )
+    return _store
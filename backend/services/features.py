@@ -0,0 +1,195 @@
+"""
+NeuroGrowth AI - Columnar Feature Extraction
+Daily logs straight from SQL rows to prepare_features-encoded float32 arrays
+"""
+
+from typing import Optional
+
+import numpy as np
+from sqlalchemy import select, func, case
+from sqlalchemy.orm import Session
+
+from database import DailyLog, SkillType
+from models.train import SEQUENCE_LENGTH, SKILL_MAP, FEATURE_DIVISORS
+
+# Above this many ids a full-table window scan beats a huge IN (...) list
+MAX_IN_CLAUSE = 5000
+
+N_FEATURES = len(FEATURE_DIVISORS)
+
+
+def feature_columns() -> list:
+    """
+    The 8 model inputs as SQL expressions, in prepare_features order.
+
+    Defaults, the revision flag and the skill code are resolved by the
+    database, so every result row is already a tuple of plain numbers.
+    """
+    return [
+        DailyLog.study_hours,
+        func.coalesce(DailyLog.topics_completed, 0),
+        func.coalesce(DailyLog.problems_solved, 0),
+        func.coalesce(DailyLog.mock_score, 50.0),
+        DailyLog.confidence,
+        DailyLog.mood,
+        case((DailyLog.revision_done.is_(True), 1), else_=0),
+        case(
+            *[(DailyLog.skill_practiced == skill, SKILL_MAP[skill.value]) for skill in SkillType],
+            else_=SKILL_MAP["Other"],
+        ),
+    ]
+
+
+def encode_rows(rows) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Stack numeric result rows and apply the prepare_features scaling in one pass.
+
+    Returns:
+        (keys, features): keys holds any leading non-feature columns as an
+        int64 (n_rows, n_keys) array, features is a contiguous
+        (n_rows, 8) float32 matrix built from the trailing 8 columns
+    """
+    if not rows:
+        return np.zeros((0, 0), dtype=np.int64), np.zeros((0, N_FEATURES), dtype=np.float32)
+    raw = np.array(rows, dtype=np.float64)
+    keys = raw[:, :-N_FEATURES].astype(np.int64)
+    features = np.ascontiguousarray(raw[:, -N_FEATURES:] / FEATURE_DIVISORS, dtype=np.float32)
+    return keys, features
+
+
+def encode_log(log: DailyLog) -> np.ndarray:
+    """One freshly written DailyLog as an (8,) feature row, matching feature_columns."""
+    skill = log.skill_practiced.value if log.skill_practiced else "Other"
+    row = (
+        log.study_hours,
+        log.topics_completed or 0,
+        log.problems_solved or 0,
+        50.0 if log.mock_score is None else log.mock_score,
+        log.confidence,
+        log.mood,
+        1 if log.revision_done else 0,
+        SKILL_MAP.get(skill, SKILL_MAP["Other"]),
+    )
+    return encode_rows([row])[1][0]
+
+
+def log_stamp(db: Session, student_id: int) -> tuple[int, int]:
+    """
+    (latest DailyLog id, log count) for one student, read through the
+    student_id index. Moves whenever any process inserts or deletes one of
+    the student's logs.
+    """
+    high, count = db.execute(
+        select(func.max(DailyLog.id), func.count(DailyLog.id)).where(DailyLog.student_id == student_id)
+    ).one()
+    return int(high or 0), int(count)
+
+
+def load_student_features(
+    db: Session, student_id: int, limit: Optional[int] = None
+) -> tuple[np.ndarray, np.ndarray]:
+    """
+    One student's logs, oldest day first.
+
+    Args:
+        limit: keep only the most recent `limit` days
+
+    Returns:
+        (features, dates): an (n_days, 8) feature matrix and the matching
+        (n_days,) int32 array of date ordinals
+    """
+    query = (
+        select(DailyLog.date, *feature_columns())
+        .where(DailyLog.student_id == student_id)
+        .order_by(DailyLog.date.desc(), DailyLog.id.desc())
+    )
+    if limit is not None:
+        query = query.limit(limit)
+    rows = db.execute(query).all()[::-1]
+    features = encode_rows([row[1:] for row in rows])[1]
+    dates = np.array([row[0].toordinal() for row in rows], dtype=np.int32)
+    return features, dates
+
+
+def load_cohort_features(
+    db: Session,
+    student_ids: Optional[list[int]] = None,
+) -> dict[int, np.ndarray]:
+    """
+    Every requested student's full history from a single ordered query.
+
+    Returns:
+        {student_id: (n_days, 8) feature matrix}, oldest day first. The
+        matrices are views into one contiguous array; students without
+        logs are omitted.
+    """
+    query = select(DailyLog.student_id, *feature_columns())
+    if student_ids is not None:
+        if not student_ids:
+            return {}
+        if len(student_ids) <= MAX_IN_CLAUSE:
+            query = query.where(DailyLog.student_id.in_(list(student_ids)))
+    rows = db.execute(
+        query.order_by(DailyLog.student_id, DailyLog.date.asc(), DailyLog.id.asc())
+    ).all()
+    if not rows:
+        return {}
+
+    keys, features = encode_rows(rows)
+    sids = keys[:, 0]
+    starts = np.flatnonzero(np.r_[True, sids[1:] != sids[:-1]])
+    ends = np.r_[starts[1:], len(sids)]
+
+    wanted = None if student_ids is None else set(student_ids)
+    return {
+        int(sids[a]): features[a:b]
+        for a, b in zip(starts, ends)
+        if wanted is None or int(sids[a]) in wanted
+    }
+
+
+def load_recent_windows(
+    db: Session,
+    student_ids: Optional[list[int]] = None,
+    seq_len: int = SEQUENCE_LENGTH,
+) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Fetch every student's last `seq_len` logs in a single query.
+
+    Returns:
+        (windows, lengths) aligned with `student_ids`: windows is a
+        (n_students, seq_len, 8) float32 array in the prepare_features
+        encoding, right-aligned with zero padding in front; lengths holds the
+        number of real days per student.
+    """
+    ids = np.asarray(student_ids, dtype=np.int64)
+    windows = np.zeros((len(ids), seq_len, N_FEATURES), dtype=np.float32)
+    lengths = np.zeros(len(ids), dtype=np.int64)
+    if len(ids) == 0:
+        return windows, lengths
+
+    rn = func.row_number().over(
+        partition_by=DailyLog.student_id,
+        order_by=(DailyLog.date.desc(), DailyLog.id.desc()),
+    ).label("rn")
+    columns = [col.label(f"f{j}") for j, col in enumerate(feature_columns())]
+    ranked = select(DailyLog.student_id, rn, *columns)
+    if len(ids) <= MAX_IN_CLAUSE:
+        ranked = ranked.where(DailyLog.student_id.in_(ids.tolist()))
+    ranked = ranked.subquery()
+    rows = db.execute(select(ranked).where(ranked.c.rn <= seq_len)).all()
+    if not rows:
+        return windows, lengths
+
+    keys, features = encode_rows(rows)
+    sid, rank = keys[:, 0], keys[:, 1]
+
+    order = np.argsort(ids)
+    pos = np.searchsorted(ids, sid, sorter=order)
+    pos = np.clip(pos, 0, len(ids) - 1)
+    row_idx = order[pos]
+    keep = ids[row_idx] == sid  # drop students we were not asked about
+
+    windows[row_idx[keep], seq_len - rank[keep]] = features[keep]
+    np.add.at(lengths, row_idx[keep], 1)
+    return windows, lengths
@@ -0,0 +1,299 @@
+"""
+NeuroGrowth AI - Hyperparameter Sweep
+Trains a grid of StudentGrowthLSTM configurations in parallel on one snapshot
+
+Usage (from backend/):
+    python -m services.hparam_sweep                                  # default grid, latest snapshot
+    python -m services.hparam_sweep --hidden-size 64,128,256 --num-layers 1,2 \\
+        --dropout 0.1,0.3 --lr 0.001,0.0003 --batch-size 32,128 --workers 4
+    python -m services.hparam_sweep --no-register                    # rank only, keep serving model
+"""
+
+import os
+import sys
+import json
+import time
+import uuid
+import shutil
+import argparse
+import itertools
+import multiprocessing as mp
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from typing import Optional
+
+import numpy as np
+import torch
+from loguru import logger
+
+from models.registry import MODEL_FILENAME, SCRIPTED_FILENAME, file_version
+from models.snapshot import TrainingSnapshot, open_snapshot, latest_snapshot
+from models.train import (
+    SAVED_MODEL_DIR, SEQUENCE_LENGTH, OPTIMIZER_FILENAME, save_training_state, train_model,
+)
+
+SWEEP_DIR = os.path.join(SAVED_MODEL_DIR, "sweeps")
+# Configs within this fraction of the best validation loss compete on latency
+SWEEP_LOSS_TOLERANCE = float(os.getenv("SWEEP_LOSS_TOLERANCE", "0.02"))
+SWEEP_EPOCHS = int(os.getenv("SWEEP_EPOCHS", "30"))
+LATENCY_BATCH_SIZES = (1, 64)
+
+ARCHITECTURE_KEYS = ("hidden_size", "num_layers", "dropout")
+TRAINING_KEYS = ("lr", "batch_size")
+DEFAULT_GRID = {
+    "hidden_size": [64, 128],
+    "num_layers": [1, 2],
+    "dropout": [0.3],
+    "lr": [0.001],
+    "batch_size": [32, 128],
+}
+
+
+def expand_grid(grid: dict) -> list[dict]:
+    """Every combination of the grid's values, as one config dict each."""
+    keys = list(grid)
+    return [dict(zip(keys, values)) for values in itertools.product(*(grid[k] for k in keys))]
+
+
+def core_slices(n_workers: int) -> list[list[int]]:
+    """Split the CPUs this process may use into `n_workers` disjoint slices."""
+    if hasattr(os, "sched_getaffinity"):
+        cores = sorted(os.sched_getaffinity(0))
+    else:
+        cores = list(range(os.cpu_count() or 1))
+    per_worker = max(1, len(cores) // n_workers)
+    return [cores[i * per_worker : (i + 1) * per_worker] or cores for i in range(n_workers)]
+
+
+# ─── Worker side ─────────────────────────────────────────────────────────────
+
+def _init_worker(slices):
+    """Pin this pool worker to the next free core slice and size torch's thread pool to it."""
+    try:
+        cores = slices.get_nowait()
+    except Exception:  # a replacement worker after a crash: run unpinned
+        return
+    if hasattr(os, "sched_setaffinity"):
+        os.sched_setaffinity(0, cores)
+    torch.set_num_threads(len(cores))
+
+
+def _latency_ms(model: torch.nn.Module, iters: int = 30) -> dict:
+    """Median forward latency per batch size, at this worker's thread count."""
+    model.eval()
+    latency = {}
+    with torch.no_grad():
+        for b in LATENCY_BATCH_SIZES:
+            x = torch.rand(b, SEQUENCE_LENGTH, model.input_size)
+            model(x)  # warmup
+            times = []
+            for _ in range(iters):
+                start = time.perf_counter()
+                model(x)
+                times.append((time.perf_counter() - start) * 1000)
+            latency[str(b)] = round(float(np.median(times)), 3)
+    return latency
+
+
+def _run_trial(snapshot_id: str, trial_dir: str, config: dict, epochs: int) -> dict:
+    """Train one config into `trial_dir` and measure it."""
+    snapshot = open_snapshot(snapshot_id)
+    architecture = {k: config[k] for k in ARCHITECTURE_KEYS}
+    history = []
+    start = time.perf_counter()
+    try:
+        model = train_model(
+            snapshot,
+            epochs=epochs,
+            lr=config["lr"],
+            batch_size=config["batch_size"],
+            model_config=architecture,
+            output_dir=trial_dir,
+            on_epoch=lambda done, loss, val_loss: history.append((loss, val_loss)),
+        )
+    except Exception as e:
+        return {"config": config, "dir": trial_dir, "error": repr(e)}
+    if model is None or not history:
+        return {"config": config, "dir": trial_dir, "error": "Not enough data for training"}
+
+    val_losses = [v for _, v in history if v is not None]
+    return {
+        "config": config,
+        "dir": trial_dir,
+        "val_loss": round(min(val_losses), 6) if val_losses else None,
+        "train_loss": round(history[-1][0], 6),
+        "epochs_run": len(history),
+        "train_s": round(time.perf_counter() - start, 2),
+        "parameters": sum(p.numel() for p in model.parameters()),
+        "latency_ms": _latency_ms(model),
+        "threads": torch.get_num_threads(),
+    }
+
+
+# ─── Sweep ───────────────────────────────────────────────────────────────────
+
+def rank_trials(trials: list[dict], tolerance: float = SWEEP_LOSS_TOLERANCE) -> list[dict]:
+    """
+    Order trials by validation loss (training loss when nothing could be held
+    out), then batch-1 latency, and mark the winner: the fastest trial whose
+    loss is within `tolerance` of the best one.
+    """
+    ok = [t for t in trials if "error" not in t]
+    if not ok:
+        return trials
+
+    loss = lambda t: t["val_loss"] if t["val_loss"] is not None else t["train_loss"]
+    latency = lambda t: t["latency_ms"][str(LATENCY_BATCH_SIZES[0])]
+    ranked = sorted(ok, key=lambda t: (loss(t), latency(t)))
+    best = loss(ranked[0])
+    contenders = [t for t in ranked if loss(t) <= best * (1 + tolerance)]
+    winner = min(contenders, key=latency)
+    for i, t in enumerate(ranked, start=1):
+        t["rank"] = i
+        t["winner"] = t is winner
+    return ranked + [t for t in trials if "error" in t]
+
+
+def register_winner(trial: dict, snapshot: TrainingSnapshot, sweep_id: str) -> str:
+    """
+    Copy the winning trial's artifacts over the served ones. The weights go
+    last, so the registry's file watch only fires once everything is in place.
+
+    Returns:
+        the new model version
+    """
+    for filename in (SCRIPTED_FILENAME, OPTIMIZER_FILENAME, MODEL_FILENAME):
+        src = os.path.join(trial["dir"], filename)
+        if not os.path.exists(src):
+            continue
+        dst = os.path.join(SAVED_MODEL_DIR, filename)
+        shutil.copyfile(src, dst + ".tmp")
+        os.replace(dst + ".tmp", dst)
+
+    version = file_version(os.path.join(SAVED_MODEL_DIR, MODEL_FILENAME))
+    config = trial["config"]
+    save_training_state(
+        watermark_log_id=snapshot.watermark,
+        mode="sweep",
+        epochs=trial["epochs_run"],
+        students_used=len(snapshot),
+        snapshot_id=snapshot.snapshot_id,
+        sweep_id=sweep_id,
+        model_config={k: config[k] for k in ARCHITECTURE_KEYS},
+        train_config={k: config[k] for k in TRAINING_KEYS},
+        model_version=version,
+    )
+    logger.info(f"✅ Sweep {sweep_id} winner {config} registered as {version}")
+    return version
+
+
+def run_sweep(
+    snapshot: TrainingSnapshot,
+    grid: dict = DEFAULT_GRID,
+    epochs: int = SWEEP_EPOCHS,
+    n_workers: Optional[int] = None,
+    tolerance: float = SWEEP_LOSS_TOLERANCE,
+    register: bool = True,
+) -> dict:
+    """
+    Train every grid config on `snapshot`, one spawned pool worker per core
+    slice. Workers memory-map the same snapshot files, so the training data
+    is shared read-only through the page cache rather than copied per
+    worker. Trial artifacts and the report go to saved_models/sweeps/<id>/.
+    """
+    configs = expand_grid(grid)
+    cpu_count = len(core_slices(1)[0])
+    n_workers = max(1, min(n_workers or cpu_count, len(configs), cpu_count))
+    sweep_id = uuid.uuid4().hex[:12]
+    sweep_path = os.path.join(SWEEP_DIR, sweep_id)
+    os.makedirs(sweep_path)
+    logger.info(f"Sweep {sweep_id}: {len(configs)} configs on {n_workers} workers")
+
+    ctx = mp.get_context("spawn")
+    slices = ctx.Queue()
+    for cores in core_slices(n_workers):
+        slices.put(cores)
+
+    started = time.perf_counter()
+    with ProcessPoolExecutor(
+        max_workers=n_workers, mp_context=ctx, initializer=_init_worker, initargs=(slices,)
+    ) as pool:
+        futures = [
+            pool.submit(_run_trial, snapshot.snapshot_id, os.path.join(sweep_path, str(i)), config, epochs)
+            for i, config in enumerate(configs)
+        ]
+        trials = [f.result() for f in futures]
+
+    ranked = rank_trials(trials, tolerance)
+    winner = next((t for t in ranked if t.get("winner")), None)
+    report = {
+        "sweep_id": sweep_id,
+        "created_at": datetime.utcnow().isoformat(),
+        "snapshot_id": snapshot.snapshot_id,
+        "epochs": epochs,
+        "workers": n_workers,
+        "elapsed_s": round(time.perf_counter() - started, 2),
+        "tolerance": tolerance,
+        "trials": ranked,
+        "registered_version": None,
+    }
+    if register and winner is not None:
+        report["registered_version"] = register_winner(winner, snapshot, sweep_id)
+    with open(os.path.join(sweep_path, "report.json"), "w") as f:
+        json.dump(report, f, indent=2)
+    return report
+
+
+def _list_of(cast):
+    return lambda value: [cast(v) for v in value.split(",") if v]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawTextHelpFormatter)
+    parser.add_argument("--hidden-size", type=_list_of(int), default=DEFAULT_GRID["hidden_size"])
+    parser.add_argument("--num-layers", type=_list_of(int), default=DEFAULT_GRID["num_layers"])
+    parser.add_argument("--dropout", type=_list_of(float), default=DEFAULT_GRID["dropout"])
+    parser.add_argument("--lr", type=_list_of(float), default=DEFAULT_GRID["lr"])
+    parser.add_argument("--batch-size", type=_list_of(int), default=DEFAULT_GRID["batch_size"])
+    parser.add_argument("--epochs", type=int, default=SWEEP_EPOCHS, help="max epochs (early stopping applies)")
+    parser.add_argument("--workers", type=int, help="parallel trials (default: one per core, up to the grid size)")
+    parser.add_argument("--snapshot-id", help="training snapshot to use (default: latest, or export one)")
+    parser.add_argument("--tolerance", type=float, default=SWEEP_LOSS_TOLERANCE)
+    parser.add_argument("--no-register", action="store_true", help="rank only, leave the served model alone")
+    args = parser.parse_args()
+
+    from services.retrain_jobs import RetrainInProgress, get_job_runner
+
+    if args.snapshot_id:
+        snapshot = open_snapshot(args.snapshot_id)
+        if snapshot is None:
+            sys.exit(f"Training snapshot {args.snapshot_id} not found")
+    else:
+        snapshot = latest_snapshot()
+        if snapshot is None:
+            from database import SessionLocal
+            from services.training_snapshot import export_training_snapshot
+
+            db = SessionLocal()
+            try:
+                snapshot = export_training_snapshot(db)
+            finally:
+                db.close()
+
+    grid = {
+        "hidden_size": args.hidden_size,
+        "num_layers": args.num_layers,
+        "dropout": args.dropout,
+        "lr": args.lr,
+        "batch_size": args.batch_size,
+    }
+    try:
+        # Registering replaces the served weights, so keep retrain jobs out meanwhile
+        with get_job_runner().exclusive("hparam-sweep"):
+            report = run_sweep(
+                snapshot, grid, args.epochs, args.workers, args.tolerance, not args.no_register
+            )
+    except RetrainInProgress as e:
+        sys.exit(f"Retraining job {e.job_id} is running, try again when it finishes")
+    json.dump(report, sys.stdout, indent=2)
+    print()
@@ -0,0 +1,120 @@
+"""
+NeuroGrowth AI - Prediction Result Cache
+Skips inference and duplicate Prediction rows when a student's input window is unchanged
+"""
+
+import os
+import threading
+from collections import OrderedDict
+from datetime import date
+from typing import Optional
+
+from loguru import logger
+
+PREDICTION_CACHE_SIZE = int(os.getenv("PREDICTION_CACHE_SIZE", "50000"))
+
+
+class PredictionCache:
+    """
+    Per-student LRU of the last prediction, keyed on (student_id, log
+    stamp, window digest, model version).
+
+    A lookup only hits when the student's current `log_stamp` (latest
+    DailyLog id and log count, read from the database), the digest of their
+    feature window and the served model version all match the stored entry.
+    The stamp moves on every insert or delete whichever process made it, so
+    each API process detects writes it never saw. Log writes handled here
+    that land inside the cached window also drop the entry eagerly.
+    """
+
+    def __init__(self, max_size: int = PREDICTION_CACHE_SIZE):
+        self.max_size = max_size
+        self._data: "OrderedDict[int, dict]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def get(
+        self, student_id: int, log_stamp: tuple[int, int], digest: str, model_version: str
+    ) -> Optional[dict]:
+        with self._lock:
+            entry = self._data.get(student_id)
+            if (
+                entry is None
+                or entry["log_stamp"] != tuple(log_stamp)
+                or entry["digest"] != digest
+                or entry["model_version"] != model_version
+            ):
+                self.misses += 1
+                return None
+            self._data.move_to_end(student_id)
+            self.hits += 1
+            return dict(entry["result"])
+
+    def put(
+        self,
+        student_id: int,
+        log_stamp: tuple[int, int],
+        digest: str,
+        model_version: str,
+        result: dict,
+        window_start: Optional[date],
+        window_full: bool,
+    ):
+        with self._lock:
+            self._data[student_id] = {
+                "log_stamp": tuple(log_stamp),
+                "digest": digest,
+                "model_version": model_version,
+                "result": dict(result),
+                "window_start": window_start,
+                "window_full": window_full,
+            }
+            self._data.move_to_end(student_id)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+
+    def invalidate(self, student_id: int, log_date: Optional[date] = None):
+        """
+        Drop a student's entry if a log written for `log_date` falls inside
+        the cached window (or unconditionally when no date is given).
+        """
+        with self._lock:
+            entry = self._data.get(student_id)
+            if entry is None:
+                return
+            inside = (
+                log_date is None
+                or not entry["window_full"]
+                or entry["window_start"] is None
+                or log_date >= entry["window_start"]
+            )
+            if inside:
+                del self._data[student_id]
+                self.invalidations += 1
+                logger.debug(f"Prediction cache invalidated for student {student_id}")
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "size": len(self._data),
+                "max_size": self.max_size,
+                "hits": self.hits,
+                "misses": self.misses,
+                "invalidations": self.invalidations,
+            }
+
+
+# Singleton instance
+_cache: Optional[PredictionCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_prediction_cache() -> PredictionCache:
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = PredictionCache()
+    return _cache
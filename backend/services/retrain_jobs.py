@@ -0,0 +1,413 @@
+"""
+NeuroGrowth AI - Background Retraining Jobs
+Runs train_model in a separate process with progress, cancellation and a single-flight lock
+"""
+
+import os
+import re
+import json
+import time
+import uuid
+import threading
+import multiprocessing as mp
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Optional
+
+from loguru import logger
+
+try:
+    import fcntl
+except ImportError:  # Windows: only the in-process guard applies
+    fcntl = None
+
+from models.registry import get_registry
+from models.train import SAVED_MODEL_DIR
+
+JOBS_DIR = os.path.join(SAVED_MODEL_DIR, "jobs")
+LOCK_FILE = os.path.join(SAVED_MODEL_DIR, "retrain.lock")
+CHECKPOINT_FILE = os.path.join(SAVED_MODEL_DIR, "checkpoints", "retrain.pt")
+TERMINAL_STATES = ("succeeded", "failed", "cancelled")
+CANCEL_POLL_S = 0.5
+FULL_RETRAIN_EPOCHS = 30
+_JOB_ID = re.compile(r"^[0-9a-f]{12}$")
+
+
+class RetrainInProgress(Exception):
+    """Another retraining job holds the lock."""
+
+    def __init__(self, job_id: Optional[str]):
+        self.job_id = job_id
+        super().__init__(f"Retraining job {job_id} is already running")
+
+
+# ─── Status files (shared by the API process and the job process) ───────────
+
+def _status_path(job_id: str) -> str:
+    return os.path.join(JOBS_DIR, f"{job_id}.json")
+
+
+def _cancel_path(job_id: str) -> str:
+    return os.path.join(JOBS_DIR, f"{job_id}.cancel")
+
+
+def _write_status(job_id: str, status: dict):
+    status["updated_at"] = datetime.utcnow().isoformat()
+    os.makedirs(JOBS_DIR, exist_ok=True)
+    tmp_path = _status_path(job_id) + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(status, f)
+    os.replace(tmp_path, _status_path(job_id))
+
+
+def _read_status(job_id: str) -> Optional[dict]:
+    if not _JOB_ID.match(job_id):
+        return None
+    try:
+        with open(_status_path(job_id)) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+# ─── Job process ─────────────────────────────────────────────────────────────
+
+def _run_job(
+    job_id: str, epochs: Optional[int], mode: str, snapshot_id: Optional[str], resume: bool
+):
+    """
+    Entry point of the spawned training process. The outcome is recorded as
+    `result`; the API process publishes it as `status` once it has reloaded
+    the model and released the lock.
+
+    An incremental job warm-starts from the saved weights and optimizer
+    state and trains only on windows touching logs written after the last
+    run's watermark (the highest DailyLog id it saw). Without a previous
+    run to continue from it falls back to a full retrain. `epochs=None`
+    picks the default for whichever mode actually runs.
+
+    Training reads from a memory-mapped snapshot: a fresh export unless
+    `snapshot_id` names an existing one to reuse.
+
+    Progress is checkpointed every epoch. With `resume`, a checkpoint left by
+    an interrupted job of the same mode is continued on that job's snapshot
+    and epoch count instead of starting over.
+    """
+    from database import SessionLocal
+    from models.registry import MODEL_FILENAME, file_version
+    from models.snapshot import open_snapshot
+    from models.train import (
+        MIN_SEQUENCE_LENGTH, FINETUNE_EPOCHS, FINETUNE_LR, TrainingCancelled, WarmStartUnavailable,
+        train_model, load_checkpoint, load_training_state, save_training_state,
+    )
+    from services.training_snapshot import export_training_snapshot
+
+    status = _read_status(job_id)
+    model_path = os.path.join(SAVED_MODEL_DIR, MODEL_FILENAME)
+
+    def update(**fields):
+        status.update(fields)
+        _write_status(job_id, status)
+
+    try:
+        update(status="loading")
+        # Architecture and optimizer settings carry over from the last run (e.g. a sweep winner)
+        previous = load_training_state() or {}
+        model_config = previous.get("model_config") or {}
+        train_config = previous.get("train_config") or {}
+        watermark = None
+        if mode == "incremental":
+            watermark = previous.get("watermark_log_id")
+            if watermark is None or not os.path.exists(model_path):
+                logger.info(f"Retraining job {job_id}: no previous run to continue, training in full")
+                mode = "full"
+        if epochs is None:
+            epochs = FINETUNE_EPOCHS if mode == "incremental" else FULL_RETRAIN_EPOCHS
+
+        run_id, resumed_from = job_id, 0
+        checkpoint = load_checkpoint(CHECKPOINT_FILE)
+        if checkpoint is not None:
+            run = checkpoint["run"]
+            if (
+                resume
+                and run.get("mode") == mode
+                and snapshot_id in (None, run.get("snapshot_id"))
+                and open_snapshot(run.get("snapshot_id", "")) is not None
+            ):
+                run_id, snapshot_id, epochs = run["job_id"], run["snapshot_id"], run["epochs"]
+                resumed_from = checkpoint["epoch"]
+                logger.info(f"Retraining job {job_id} resumes {run_id} after epoch {resumed_from}")
+            else:
+                os.remove(CHECKPOINT_FILE)
+        update(mode=mode, epochs=epochs, resumed_from_epoch=resumed_from)
+
+        if snapshot_id is not None:
+            snapshot = open_snapshot(snapshot_id)
+            if snapshot is None:
+                update(result="failed", error=f"Training snapshot {snapshot_id} not found")
+                return
+        else:
+            db = SessionLocal()
+            try:
+                snapshot = export_training_snapshot(db)
+            finally:
+                db.close()
+        update(snapshot_id=snapshot.snapshot_id)
+
+        new_rows = None
+        if mode == "incremental":
+            new_rows = snapshot.log_ids > watermark
+            new_logs = int(new_rows.sum())
+            update(new_logs=new_logs)
+            if new_logs == 0:
+                update(result="succeeded", eta_s=0.0, model_version=file_version(model_path))
+                return
+        elif not (snapshot.lengths > MIN_SEQUENCE_LENGTH).any():
+            update(result="failed", error="No training data available")
+            return
+
+        started = time.monotonic()
+        update(status="running", students_used=len(snapshot))
+
+        def on_epoch(done: int, loss: float, val_loss: Optional[float]):
+            elapsed = time.monotonic() - started
+            update(
+                epoch=done,
+                loss=round(loss, 6),
+                val_loss=None if val_loss is None else round(val_loss, 6),
+                elapsed_s=round(elapsed, 1),
+                # Upper bound: early stopping may end the run sooner
+                eta_s=round(elapsed / (done - resumed_from) * (epochs - done), 1),
+            )
+
+        last_poll = [0.0]
+
+        def should_stop() -> bool:
+            now = time.monotonic()
+            if now - last_poll[0] < CANCEL_POLL_S:
+                return False
+            last_poll[0] = now
+            return os.path.exists(_cancel_path(job_id))
+
+        train_kwargs = dict(train_config)
+        if new_rows is not None:
+            train_kwargs.update(warm_start=True, new_rows=new_rows, lr=FINETUNE_LR)
+        model = train_model(
+            snapshot,
+            epochs=epochs,
+            model_config=model_config,
+            on_epoch=on_epoch,
+            should_stop=should_stop,
+            checkpoint_path=CHECKPOINT_FILE,
+            checkpoint_tag={"job_id": run_id, "mode": mode, "snapshot_id": snapshot.snapshot_id},
+            **train_kwargs,
+        )
+        if model is None and mode == "incremental":
+            # The new logs only fall in held-out students or too-short histories:
+            # keep the watermark so they count as new once they can be trained on
+            update(
+                result="succeeded", eta_s=0.0, trained=False,
+                model_version=file_version(model_path),
+            )
+            return
+        if model is None:
+            update(result="failed", error="No training data available")
+            return
+        version = file_version(model_path) if os.path.exists(model_path) else None
+        save_training_state(
+            watermark_log_id=snapshot.watermark,
+            mode=mode,
+            epochs=epochs,
+            students_used=len(snapshot),
+            snapshot_id=snapshot.snapshot_id,
+            new_logs=status.get("new_logs"),
+            model_config=model_config,
+            train_config=train_config,
+            model_version=version,
+        )
+        update(result="succeeded", eta_s=0.0, model_version=version)
+    except TrainingCancelled:
+        # A cancelled run is not worth resuming
+        if os.path.exists(CHECKPOINT_FILE):
+            os.remove(CHECKPOINT_FILE)
+        update(result="cancelled")
+    except WarmStartUnavailable as e:
+        # Keep the served weights and the watermark; only a full run can replace them
+        if os.path.exists(CHECKPOINT_FILE):
+            os.remove(CHECKPOINT_FILE)
+        update(result="failed", error=f"{e}; start a full retrain (mode=full)")
+    except Exception as e:
+        logger.exception(f"Retraining job {job_id} failed")
+        update(result="failed", error=repr(e))
+
+
+# ─── Runner ──────────────────────────────────────────────────────────────────
+
+class RetrainJobRunner:
+    """
+    Starts at most one retraining process at a time.
+
+    The job process exports (or reuses) a training snapshot, trains (in
+    full, or incrementally on logs written since the last run) and
+    atomically replaces the weights file, writing its progress to
+    saved_models/jobs/<job_id>.json after every epoch. The API process
+    holds an exclusive lock on saved_models/retrain.lock for the job's
+    lifetime, so a second start from any API process on the host is
+    refused. Once the job exits the registry is reloaded, and worker
+    processes pick up the new file on their next stat check.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._active: Optional[str] = None
+        self._lock_fd: Optional[int] = None
+        self._ctx = mp.get_context("spawn")
+
+    def start(
+        self,
+        epochs: Optional[int] = None,
+        mode: str = "full",
+        snapshot_id: Optional[str] = None,
+        resume: bool = True,
+    ) -> dict:
+        with self._lock:
+            if self._active is not None:
+                raise RetrainInProgress(self._active)
+            lock_fd = self._acquire_file_lock()
+
+            job_id = uuid.uuid4().hex[:12]
+            status = {
+                "job_id": job_id,
+                "status": "queued",
+                "mode": mode,
+                "epochs": epochs,
+                "epoch": 0,
+                "loss": None,
+                "val_loss": None,
+                "elapsed_s": 0.0,
+                "eta_s": None,
+                "students_used": None,
+                "snapshot_id": snapshot_id,
+                "model_version": None,
+                "error": None,
+                "created_at": datetime.utcnow().isoformat(),
+            }
+            _write_status(job_id, status)
+            if lock_fd is not None:
+                os.ftruncate(lock_fd, 0)
+                os.pwrite(lock_fd, job_id.encode(), 0)
+
+            process = self._ctx.Process(
+                target=_run_job, args=(job_id, epochs, mode, snapshot_id, resume), name=f"retrain-{job_id}", daemon=True
+            )
+            try:
+                process.start()
+            except Exception:
+                self._release_file_lock(lock_fd)
+                raise
+            self._active = job_id
+            self._lock_fd = lock_fd
+
+        threading.Thread(
+            target=self._watch, args=(job_id, process), name=f"retrain-watch-{job_id}", daemon=True
+        ).start()
+        logger.info(f"Retraining job {job_id} started ({mode}, {epochs} epochs)")
+        return status
+
+    def get(self, job_id: str) -> Optional[dict]:
+        return _read_status(job_id)
+
+    def cancel(self, job_id: str) -> Optional[dict]:
+        """Ask a running job to stop; it exits before writing any weights."""
+        status = _read_status(job_id)
+        if status is None or status["status"] in TERMINAL_STATES:
+            return status
+        open(_cancel_path(job_id), "w").close()
+        status["cancel_requested"] = True
+        return status
+
+    def _watch(self, job_id: str, process):
+        process.join()
+        status = _read_status(job_id) or {"job_id": job_id}
+        result = status.pop("result", None)
+        if result is None:
+            result = "failed"
+            status["error"] = f"Training process exited with code {process.exitcode}"
+
+        if result == "succeeded":
+            registry = get_registry()
+            registry.invalidate()
+            registry.get()
+            logger.info(f"✅ Retraining job {job_id} finished, serving {registry.version}")
+        else:
+            logger.warning(f"Retraining job {job_id} ended: {result}")
+
+        try:
+            os.remove(_cancel_path(job_id))
+        except FileNotFoundError:
+            pass
+        with self._lock:
+            self._release_file_lock(self._lock_fd)
+            self._lock_fd = None
+            self._active = None
+
+        # Published last, so a client that sees a final status can start again
+        status["status"] = result
+        _write_status(job_id, status)
+
+    @contextmanager
+    def exclusive(self, holder: str):
+        """
+        Hold the retraining lock for other work that replaces the served
+        weights (a hyperparameter sweep), so it never races a retrain job.
+
+        Raises:
+            RetrainInProgress if a job or another holder has the lock
+        """
+        with self._lock:
+            if self._active is not None:
+                raise RetrainInProgress(self._active)
+            lock_fd = self._acquire_file_lock()
+            self._active = holder
+        if lock_fd is not None:
+            os.ftruncate(lock_fd, 0)
+            os.pwrite(lock_fd, holder.encode(), 0)
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._release_file_lock(lock_fd)
+                self._active = None
+
+    def _acquire_file_lock(self) -> Optional[int]:
+        if fcntl is None:
+            return None
+        os.makedirs(SAVED_MODEL_DIR, exist_ok=True)
+        fd = os.open(LOCK_FILE, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            holder = os.pread(fd, 64, 0).decode().strip() or None
+            os.close(fd)
+            raise RetrainInProgress(holder)
+        return fd
+
+    @staticmethod
+    def _release_file_lock(fd: Optional[int]):
+        if fd is not None:
+            fcntl.flock(fd, fcntl.LOCK_UN)
+            os.close(fd)
+
+
+# Singleton instance
+_runner: Optional[RetrainJobRunner] = None
+_runner_lock = threading.Lock()
+
+
+def get_job_runner() -> RetrainJobRunner:
+    global _runner
+    if _runner is None:
+        with _runner_lock:
+            if _runner is None:
+                _runner = RetrainJobRunner()
+    return _runner
@@ -0,0 +1,214 @@
+"""
+NeuroGrowth AI - Streaming Mini-Batch Clustering
+Profiles aggregated in SQL, streamed in chunks into MiniBatchKMeans + IncrementalPCA
+
+Usage (from backend/):
+    python -m services.streaming_clustering            # fold in new and changed students (fits on first run)
+    python -m services.streaming_clustering --refit    # refit from scratch
+"""
+
+import os
+import sys
+import json
+import argparse
+from typing import Iterator, Optional
+
+import joblib
+import numpy as np
+from loguru import logger
+from sklearn.cluster import MiniBatchKMeans
+from sklearn.decomposition import IncrementalPCA
+from sklearn.preprocessing import StandardScaler
+from sqlalchemy import select, func
+from sqlalchemy.orm import Session
+
+from database import DailyLog
+from models.train import SAVED_MODEL_DIR
+from services.clustering import (
+    LEARNING_STYLES, ClusteringModel, profile_query, encode_profiles, store_fit, clustering_result,
+)
+
+# Estimator state kept between runs so new and changed students are folded in, not refit
+STATE_FILENAME = "clustering_state.joblib"
+CLUSTERING_CHUNK_ROWS = int(os.getenv("CLUSTERING_CHUNK_ROWS", "50000"))
+CLUSTERING_BATCH_STUDENTS = int(os.getenv("CLUSTERING_BATCH_STUDENTS", "4096"))
+
+
+def iter_profile_chunks(
+    db: Session, chunk_rows: int = CLUSTERING_CHUNK_ROWS, since_log_id: Optional[int] = None
+) -> Iterator[tuple[np.ndarray, np.ndarray]]:
+    """
+    Stream every student's clustering profile from the grouped aggregate
+    query (see `profile_query`), `chunk_rows` students at a time (a
+    server-side cursor on PostgreSQL). The logs themselves never leave the
+    database.
+
+    Args:
+        since_log_id: only students with a log above this id
+
+    Yields:
+        (student_ids, profiles) for the students with enough days
+    """
+    query = profile_query(db, since_log_id=since_log_id).execution_options(yield_per=chunk_rows)
+    for rows in db.execute(query).partitions():
+        yield encode_profiles(rows)
+
+
+def load_state(path: Optional[str] = None) -> Optional[dict]:
+    """The saved scaler, MiniBatchKMeans, IncrementalPCA and log watermark, if any."""
+    path = path or os.path.join(SAVED_MODEL_DIR, STATE_FILENAME)
+    try:
+        return joblib.load(path)
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        logger.warning(f"Ignoring unreadable clustering state: {e}")
+        return None
+
+
+def _save_state(state: dict, path: Optional[str] = None):
+    path = path or os.path.join(SAVED_MODEL_DIR, STATE_FILENAME)
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    joblib.dump(state, path + ".tmp")
+    os.replace(path + ".tmp", path)
+
+
+def _batches(
+    chunks: Iterator[tuple[np.ndarray, np.ndarray]], batch_size: int, seed: int = 42
+) -> Iterator[np.ndarray]:
+    """
+    Profiles from `chunks` regrouped into `batch_size` rows (the last batch
+    may be smaller), shuffled within each chunk so a batch is not a run of
+    consecutive ids. Only one chunk is held at a time.
+    """
+    rng = np.random.default_rng(seed)
+    rest = np.zeros((0, 11), dtype=np.float32)
+    for _, profiles in chunks:
+        pending = np.concatenate([rest, profiles[rng.permutation(len(profiles))]])
+        n_full = len(pending) // batch_size * batch_size
+        for start in range(0, n_full, batch_size):
+            yield pending[start : start + batch_size]
+        rest = pending[n_full:]
+    if len(rest):
+        yield rest
+
+
+def cluster_students_streaming(
+    db: Session,
+    n_clusters: int = 4,
+    refit: bool = False,
+    chunk_rows: int = CLUSTERING_CHUNK_ROWS,
+    batch_students: int = CLUSTERING_BATCH_STUDENTS,
+    store: Optional[ClusteringModel] = None,
+    state_path: Optional[str] = None,
+) -> dict:
+    """
+    Scalable counterpart of `cluster_students`.
+
+    Per-student profiles (11 floats each) are aggregated by the database
+    and streamed in `chunk_rows` at a time; at most one chunk is held. On
+    the first run one pass fits the scaler with `partial_fit`, and a second
+    trains MiniBatchKMeans and IncrementalPCA with `partial_fit`,
+    `batch_students` profiles at a time. Later runs reload that state and
+    feed only the students with logs written since the stored DailyLog
+    watermark, new or existing (an existing student's updated profile pulls
+    the centroids towards it). The scaler stays fixed after the first run
+    so the centroids stay comparable; `refit=True` starts over. A last pass
+    assigns and projects every student for the response.
+
+    The fit is saved to the mini-batch artifact, separate from the full
+    fit's, so running one mode never replaces the other's served model.
+
+    Returns:
+        the same payload as `cluster_students`
+    """
+    # Read before streaming, so logs written during the run are fed next time
+    log_watermark = int(db.execute(select(func.max(DailyLog.id))).scalar() or 0)
+
+    state = None if refit else load_state(state_path)
+    if state is not None and "log_watermark" not in state:
+        logger.info("Stored clustering state predates log watermarks, refitting")
+        state = None
+    if state is not None and state["kmeans"].n_clusters != n_clusters:
+        logger.info(f"Stored clustering has {state['kmeans'].n_clusters} clusters, refitting")
+        state = None
+
+    since = None
+    if state is None:
+        scaler = StandardScaler()
+        for _, profiles in iter_profile_chunks(db, chunk_rows):
+            scaler.partial_fit(profiles)
+        n_students = int(np.max(getattr(scaler, "n_samples_seen_", 0)))
+        if n_students < n_clusters:
+            logger.warning(f"Not enough students ({n_students}) for {n_clusters} clusters")
+            return {"cluster_labels": {}, "pca_data": [], "cluster_info": LEARNING_STYLES}
+        state = {
+            "scaler": scaler,
+            "kmeans": MiniBatchKMeans(n_clusters=n_clusters, random_state=42, n_init=3),
+            "ipca": IncrementalPCA(n_components=2),
+            "log_watermark": 0,
+            "n_students": 0,
+        }
+    else:
+        since = state["log_watermark"]
+
+    scaler, kmeans, ipca = state["scaler"], state["kmeans"], state["ipca"]
+    fed = 0
+    # A first batch seeds the centroids, so it needs at least k samples
+    changed = iter_profile_chunks(db, chunk_rows, since_log_id=since)
+    for batch in _batches(changed, max(batch_students, n_clusters)):
+        X_batch = scaler.transform(batch)
+        kmeans.partial_fit(X_batch)
+        if len(batch) >= ipca.n_components:
+            ipca.partial_fit(X_batch)
+        fed += len(batch)
+    state["n_students"] += fed
+    state["log_watermark"] = max(state["log_watermark"], log_watermark)
+    _save_state(state, state_path)
+
+    student_ids, labels, coords = [], [], []
+    for chunk_ids, profiles in iter_profile_chunks(db, chunk_rows):
+        X_scaled = scaler.transform(profiles)
+        student_ids.append(chunk_ids)
+        labels.append(kmeans.predict(X_scaled))
+        coords.append(ipca.transform(X_scaled))
+    student_ids = np.concatenate(student_ids or [np.zeros(0, dtype=np.int64)])
+    labels = np.concatenate(labels or [np.zeros(0, dtype=np.int64)])
+    coords = np.concatenate(coords or [np.zeros((0, 2))])
+
+    version, cluster_styles = store_fit(
+        scaler, kmeans.cluster_centers_, state["n_students"], store,
+        mode="minibatch", log_watermark=state["log_watermark"],
+    )
+    logger.info(
+        f"✅ Mini-batch clustering {version}: {fed} new or changed students folded in, "
+        f"{len(student_ids)} assigned to {n_clusters} groups"
+    )
+    return clustering_result(
+        student_ids, np.array(cluster_styles)[labels], coords,
+        ipca.explained_variance_ratio_, version,
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawTextHelpFormatter)
+    parser.add_argument("--refit", action="store_true", help="discard the stored state and fit from scratch")
+    parser.add_argument("--clusters", type=int, default=4)
+    args = parser.parse_args()
+
+    from database import SessionLocal
+
+    db = SessionLocal()
+    try:
+        result = cluster_students_streaming(db, args.clusters, refit=args.refit)
+    finally:
+        db.close()
+    json.dump(
+        {
+            "clustering_version": result.get("clustering_version"),
+            "students": len(result["cluster_labels"]),
+            "explained_variance": result.get("explained_variance"),
+        },
+        sys.stdout, indent=2,
+    )
+    print()
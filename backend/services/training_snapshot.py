@@ -0,0 +1,133 @@
+"""
+NeuroGrowth AI - Training Snapshot Export
+Streams every DailyLog once into memory-mapped .npy files
+
+Usage (from backend/):
+    python -m services.training_snapshot       # export a snapshot, print its metadata
+"""
+
+import os
+import sys
+import json
+import uuid
+import shutil
+from datetime import datetime
+
+import numpy as np
+from numpy.lib.format import open_memmap
+from loguru import logger
+from sqlalchemy import select, func
+from sqlalchemy.orm import Session
+
+from database import DailyLog
+from models.snapshot import (
+    SNAPSHOT_DIR, FEATURES_FILE, TARGETS_FILE, LOG_IDS_FILE, STUDENTS_FILE,
+    OFFSETS_FILE, META_FILE, TrainingSnapshot, list_snapshots,
+)
+from models.train import compute_targets
+from services.features import N_FEATURES, feature_columns, encode_rows
+
+SNAPSHOT_CHUNK_ROWS = int(os.getenv("TRAINING_SNAPSHOT_CHUNK_ROWS", "20000"))
+SNAPSHOT_KEEP = int(os.getenv("TRAINING_SNAPSHOT_KEEP", "3"))
+
+
+def export_training_snapshot(
+    db: Session,
+    snapshot_dir: str = SNAPSHOT_DIR,
+    chunk_rows: int = SNAPSHOT_CHUNK_ROWS,
+    keep: int = SNAPSHOT_KEEP,
+) -> TrainingSnapshot:
+    """
+    Write every student's logs to a new snapshot directory.
+
+    All logs are read by one query ordered by (student_id, date, id) and
+    fetched `chunk_rows` at a time (a server-side cursor on PostgreSQL), so
+    memory stays flat however large the table is. Each chunk is encoded
+    straight into the features memmap; targets are then filled in student
+    by student from the memmap. The directory is renamed into place only
+    once complete, and all but the newest `keep` snapshots are removed.
+
+    Returns:
+        The new snapshot, opened read-only
+    """
+    # Fix the row set up front: logs written during the export are left for the next one
+    capacity, watermark = db.execute(select(func.count(DailyLog.id), func.max(DailyLog.id))).one()
+    watermark = watermark or 0
+
+    snapshot_id = uuid.uuid4().hex[:12]
+    tmp_path = os.path.join(snapshot_dir, f"{snapshot_id}.tmp")
+    os.makedirs(tmp_path)
+
+    # np.memmap cannot map an empty file, so an empty table still gets one spare row
+    size = max(capacity, 1)
+    features = open_memmap(
+        os.path.join(tmp_path, FEATURES_FILE), "w+", np.float32, (size, N_FEATURES)
+    )
+    log_ids = open_memmap(os.path.join(tmp_path, LOG_IDS_FILE), "w+", np.int64, (size,))
+    row_students = np.empty(size, dtype=np.int64)
+
+    query = (
+        select(DailyLog.student_id, DailyLog.id, *feature_columns())
+        .where(DailyLog.id <= watermark)
+        .order_by(DailyLog.student_id, DailyLog.date.asc(), DailyLog.id.asc())
+        .execution_options(yield_per=chunk_rows)
+    )
+    n = 0
+    for rows in db.execute(query).partitions():
+        keys, chunk = encode_rows(rows)
+        # A transaction that committed a lower id after the count may overflow by a few rows
+        take = min(len(chunk), size - n)
+        features[n : n + take] = chunk[:take]
+        log_ids[n : n + take] = keys[:take, 1]
+        row_students[n : n + take] = keys[:take, 0]
+        n += take
+    if n < capacity:
+        logger.info(f"Snapshot {snapshot_id}: {capacity - n} logs disappeared during export")
+
+    sids = row_students[:n]
+    starts = np.flatnonzero(np.r_[True, sids[1:] != sids[:-1]]) if n else np.zeros(0, np.int64)
+    offsets = np.r_[starts, n].astype(np.int64)
+    np.save(os.path.join(tmp_path, STUDENTS_FILE), sids[starts])
+    np.save(os.path.join(tmp_path, OFFSETS_FILE), offsets)
+
+    targets = open_memmap(os.path.join(tmp_path, TARGETS_FILE), "w+", np.float32, (size, 5))
+    for a, b in zip(offsets[:-1], offsets[1:]):
+        targets[a:b] = compute_targets(features[a:b])
+
+    for array in (features, log_ids, targets):
+        array.flush()
+    del features, log_ids, targets
+
+    meta = {
+        "snapshot_id": snapshot_id,
+        "created_at": datetime.utcnow().isoformat(),
+        "rows": int(n),
+        "students": int(len(starts)),
+        "watermark_log_id": int(watermark),
+    }
+    with open(os.path.join(tmp_path, META_FILE), "w") as f:
+        json.dump(meta, f, indent=2)
+    path = os.path.join(snapshot_dir, snapshot_id)
+    os.rename(tmp_path, path)
+    logger.info(f"✅ Training snapshot {snapshot_id}: {n} logs, {len(starts)} students")
+
+    prune_snapshots(snapshot_dir, keep)
+    return TrainingSnapshot(path)
+
+
+def prune_snapshots(snapshot_dir: str = SNAPSHOT_DIR, keep: int = SNAPSHOT_KEEP):
+    """Delete all but the newest `keep` snapshots (open memmaps stay readable)."""
+    for meta in list_snapshots(snapshot_dir)[max(keep, 1):]:
+        shutil.rmtree(os.path.join(snapshot_dir, meta["snapshot_id"]), ignore_errors=True)
+
+
+if __name__ == "__main__":
+    from database import SessionLocal
+
+    db = SessionLocal()
+    try:
+        snapshot = export_training_snapshot(db)
+    finally:
+        db.close()
+    json.dump(snapshot.meta, sys.stdout, indent=2)
+    print()
@@ -0,0 +1,62 @@
+"""
+Scripted and int8 StudentGrowthLSTM artifacts against the eager model,
+on full windows and on mixed-length (packed) batches.
+
+Run from backend/:
+    python -m pytest tests
+"""
+
+import pytest
+import torch
+
+from models.dl_model import OUTPUT_KEYS, get_model
+from models.export import script_model
+from models.quantization import quantize_model
+from models.train import SEQUENCE_LENGTH
+
+# TorchScript runs the same float kernels as eager; only op fusion reorders arithmetic
+SCRIPTED_ATOL = 1e-5
+# Int8 weights move raw outputs by ~1e-3 on this model (up to ~3e-3 measured on
+# trained weights); 1e-2 leaves headroom while still catching a broken packed path
+QUANTIZED_ATOL = 1e-2
+
+
+@pytest.fixture(scope="module")
+def model():
+    torch.manual_seed(0)
+    model = get_model(hidden_size=32)
+    model.eval()
+    return model
+
+
+@pytest.fixture(scope="module")
+def batch():
+    generator = torch.Generator().manual_seed(0)
+    x = torch.rand(16, SEQUENCE_LENGTH, 8, generator=generator)
+    lengths = torch.randint(1, SEQUENCE_LENGTH + 1, (16,), generator=generator)
+    # Always cover both extremes of the packed path
+    lengths[0], lengths[1] = SEQUENCE_LENGTH, 1
+    # Right-aligned windows: zero the padding in front of each history
+    for i, n in enumerate(lengths.tolist()):
+        x[i, : SEQUENCE_LENGTH - n] = 0
+    return x, lengths
+
+
+def _max_diff(reference: dict, other: dict) -> float:
+    return max(float((reference[k] - other[k]).abs().max()) for k in OUTPUT_KEYS)
+
+
+@pytest.mark.parametrize("packed", [False, True], ids=["full", "mixed_lengths"])
+def test_scripted_matches_eager(model, batch, packed):
+    args = batch if packed else batch[:1]
+    scripted = script_model(model)
+    with torch.no_grad():
+        assert _max_diff(model(*args), scripted(*args)) <= SCRIPTED_ATOL
+
+
+@pytest.mark.parametrize("packed", [False, True], ids=["full", "mixed_lengths"])
+def test_quantized_matches_eager(model, batch, packed):
+    args = batch if packed else batch[:1]
+    quantized = quantize_model(model)
+    with torch.no_grad():
+        assert _max_diff(model(*args), quantized(*args)) <= QUANTIZED_ATOL
@@ -44,6 +44,7 @@ export const logsAPI = {
 export const predictionAPI = {
     predict: (studentId) => api.get(`/predict/${studentId}`),
     simulate: (data) => api.post('/simulate', data),
+    simulateGrid: (data) => api.post('/simulate/grid', data),
 };
 
 // ─── Roadmap ─────────────────────────────────────────────────
@@ -65,10 +66,12 @@ export const dashboardAPI = {
 // ─── Admin ───────────────────────────────────────────────────
 export const adminAPI = {
     getStudents: () => api.get('/admin/students'),
-    getClustering: () => api.get('/admin/clustering'),
+    getClustering: (params = {}) => api.get('/admin/clustering', { params }),
     getRiskHeatmap: () => api.get('/admin/risk-heatmap'),
     getPerformanceDistribution: () => api.get('/admin/performance-distribution'),
-    retrain: () => api.post('/admin/retrain'),
+    retrain: (mode = 'full') => api.post(`/admin/retrain?mode=${mode}`),
+    getRetrainJob: (jobId) => api.get(`/admin/retrain/${jobId}`),
+    cancelRetrain: (jobId) => api.post(`/admin/retrain/${jobId}/cancel`),
 };
 
 // ─── Attach convenience methods to default api instance ──────
@@ -83,6 +86,7 @@ api.getLogsByStudent = logsAPI.getByStudent;
 
 api.predict = predictionAPI.predict;
 api.simulate = predictionAPI.simulate;
+api.simulateGrid = predictionAPI.simulateGrid;
 
 api.generateRoadmap = roadmapAPI.generate;
 api.getRoadmap = roadmapAPI.get;
@@ -97,5 +101,7 @@ api.getClustering = adminAPI.getClustering;
 api.getRiskHeatmap = adminAPI.getRiskHeatmap;
 api.getPerformanceDistribution = adminAPI.getPerformanceDistribution;
 api.retrain = adminAPI.retrain;
+api.getRetrainJob = adminAPI.getRetrainJob;
+api.cancelRetrain = adminAPI.cancelRetrain;
 
 export default api;